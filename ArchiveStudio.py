@@ -20,12 +20,19 @@ from util.SettingsWindow import SettingsWindow
 from util.Settings import Settings
 from util.ImageHandler import ImageHandler
 from util.ProjectIO import ProjectIO
+from util.FileCache import ImageFileCache
+from util.PageTable import compact_page_table, enable_copy_on_write, page_table_bytes, page_table_memory, set_cell
+from util.Autosave import AutosaveManager
+from util.VersionHistory import VersionHistory
+from util.ProjectVolumes import VolumeManager
 from util.ExportFunctions import ExportManager
 from util.AdvancedDiffHighlighting import highlight_text_differences
 from util.AIFunctions import AIFunctionsHandler
 from util.ErrorLogger import log_error
 from util.NamesAndPlaces import NamesAndPlacesHandler
 from util.Highlights import HighlightHandler # <--- Added Import
+from util.JobPlanner import JobPlanner
+from util.PageAnalysis import PageAnalyzer
 
 class App(TkinterDnD.Tk):
 
@@ -33,8 +40,12 @@ class App(TkinterDnD.Tk):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+
+        # Snapshots of main_df taken for saves, jobs and exports share its data until either side writes
+        enable_copy_on_write()
         
-        self.title("Archive Studio 1.2.2") # Set the window title
+        self.base_title = "Archive Studio 1.2.2"
+        self.title(self.base_title) # Set the window title
         self.link_nav = 0
         self.geometry("1200x800")
 
@@ -61,6 +72,7 @@ class App(TkinterDnD.Tk):
         self.highlight_changes_var = tk.BooleanVar()
         self.highlight_errors_var = tk.BooleanVar()
         self.skip_completed_pages = tk.BooleanVar(value=True)  # Default to skipping completed pages
+        self.process_stale_only = tk.BooleanVar(value=False)  # Reprocess only pages whose inputs changed since last run
         self.relevance_var = tk.StringVar() # Added for relevance dropdown
         self.text_font_size = 20  # Default font size for text display
 
@@ -253,6 +265,19 @@ class App(TkinterDnD.Tk):
         # Initialize ProjectIO
         self.project_io = ProjectIO(self)
 
+        # Initialize the images directory listing used for file existence checks
+        self.image_files = ImageFileCache(self)
+
+        # Initialize change tracking and background saves
+        self.autosave = AutosaveManager(self)
+        self.autosave.start()
+
+        # Initialize the per-page version history
+        self.history = VersionHistory(self)
+
+        # Initialize multi-volume collection handling
+        self.volumes = VolumeManager(self)
+
         # Initialize the export manager
         self.export_manager = ExportManager(self)
 
@@ -265,6 +290,12 @@ class App(TkinterDnD.Tk):
         # Initialize the Highlight Handler <<<<<<<<<<<<<<<<<<<<<< NEW
         self.highlight_handler = HighlightHandler(self)
 
+        # Initialize the Job Planner (dry-run estimates for AI jobs)
+        self.job_planner = JobPlanner(self)
+
+        # Initialize the Page Analyzer (local blank/non-text page detection)
+        self.page_analyzer = PageAnalyzer(self)
+
         # Variables to store last selected dropdown values <--- ADDED
         self.last_selected_format_preset = None
         self.last_selected_chunking_strategy = None
@@ -311,13 +342,24 @@ class App(TkinterDnD.Tk):
         self.recent_menu = tk.Menu(self.file_menu, tearoff=0)
         self.file_menu.add_cascade(label="Open Recent Projects", menu=self.recent_menu)
         self.update_recent_projects_menu()
+
+        # Multi-volume collections submenu
+        self.volumes_menu = tk.Menu(self.file_menu, tearoff=0)
+        self.file_menu.add_cascade(label="Volumes", menu=self.volumes_menu)
+        self.volumes_menu.add_command(label="New Multi-Volume Collection...", command=lambda: self.volumes.create_collection())
+        self.volumes_menu.add_command(label="Switch Volume...", command=lambda: self.volumes.show_volumes_window())
+        self.volumes_menu.add_separator()
+        self.volumes_menu.add_command(label="New Empty Volume...", command=lambda: self.volumes.new_volume())
+        self.volumes_menu.add_command(label="Add Project Folder as Volume...", command=lambda: self.volumes.add_existing_project())
         
         self.file_menu.add_command(label="Save Project", command=self.project_io.save_project)
         self.file_menu.add_command(label="Save Project As", command=self.project_io.save_project_as)
+        self.file_menu.add_command(label="Export Legacy Project File (.pbf)...", command=self.project_io.export_legacy_project_file)
         self.file_menu.add_separator()
         self.file_menu.add_command(label="Import PDF...", command=self.import_pdf)
         self.file_menu.add_command(label="Import Images from Folder...", command=lambda: self.open_folder("Images without Text"))
         self.file_menu.add_command(label="Import Text and Images...", command=lambda: self.open_folder("With Text"))
+        self.file_menu.add_command(label="Rescan Images Folder", command=self.rescan_images_directory)
         self.file_menu.add_separator()
         self.file_menu.add_command(label="Export Text...", command=self.export_manager.export_menu)
         self.file_menu.add_command(label="Export CSV...", command=self.export_manager.show_csv_export_options)
@@ -334,6 +376,7 @@ class App(TkinterDnD.Tk):
         self.edit_menu.add_separator()
         self.edit_menu.add_command(label="Undo", command=self.undo)
         self.edit_menu.add_command(label="Redo", command=self.redo)
+        self.edit_menu.add_command(label="Version History...", command=lambda: self.history.show_history_window())
         self.edit_menu.add_separator()
         self.edit_menu.add_command(label="Cut",
             command=lambda: self.text_display.event_generate("<<Cut>>"))
@@ -346,6 +389,7 @@ class App(TkinterDnD.Tk):
         self.edit_menu.add_command(label="Rotate Image Counter-clockwise", command=lambda: self.rotate_image(90))
         self.edit_menu.add_command(label="Auto-get Rotation (Current Page)", command=lambda: self.ai_functions_handler.ai_function(all_or_one_flag="Current Page", ai_job="Auto_Rotate"))
         self.edit_menu.add_command(label="Auto-get Rotation (All Pages)", command=lambda: self.ai_functions_handler.ai_function(all_or_one_flag="All Pages", ai_job="Auto_Rotate"))
+        self.edit_menu.add_command(label="Find Duplicate Pages...", command=self.page_analyzer.show_duplicate_pages_window)
         self.edit_menu.add_separator()
         self.edit_menu.add_command(label="Revert Current Page", command=self.data_operations.revert_current_page)
         self.edit_menu.add_command(label="Revert All Pages", command=self.data_operations.revert_all_pages)
@@ -364,6 +408,7 @@ class App(TkinterDnD.Tk):
         # Page mode options
         mode_menu.add_radiobutton(label="Current Page", variable=self.process_mode, value="Current Page")
         mode_menu.add_radiobutton(label="All Pages", variable=self.process_mode, value="All Pages")
+        mode_menu.add_radiobutton(label="All Volumes", variable=self.process_mode, value="All Volumes")
         mode_menu.add_separator()
 
         # Skip/Redo toggle as checkbutton
@@ -373,13 +418,22 @@ class App(TkinterDnD.Tk):
             onvalue=True,
             offvalue=False
         )
+        mode_menu.add_checkbutton(
+            label="Process Stale Pages Only",
+            variable=self.process_stale_only,
+            onvalue=True,
+            offvalue=False
+        )
 
         self.process_menu.add_cascade(label="Processing Mode", menu=mode_menu)
+        self.process_menu.add_command(label="Estimate Job...", command=lambda: self.job_planner.create_job_plan_window())
         self.process_menu.add_separator()
         self.process_menu.add_command(label="Recognize Text",
                                      command=lambda: self.ai_functions_handler.ai_function(all_or_one_flag=self.process_mode.get(), ai_job="HTR"))
         self.process_menu.add_command(label="Correct Text",
                                      command=lambda: self.ai_functions_handler.ai_function(all_or_one_flag=self.process_mode.get(), ai_job="Correct_Text"))
+        self.process_menu.add_command(label="Recognize and Correct Text",
+                                     command=lambda: self.ai_functions_handler.ai_function(all_or_one_flag=self.process_mode.get(), ai_job="HTR_Correct"))
         self.process_menu.add_command(label="Format Text",
                                      command=lambda: self.ai_functions_handler.ai_function(all_or_one_flag=self.process_mode.get(), ai_job="Format_Text"))
         self.process_menu.add_separator()
@@ -441,6 +495,8 @@ class App(TkinterDnD.Tk):
             label="Find Relevant Documents",
             command=self.create_find_relevant_documents_window # <-- uses ai_functions_handler internally
         )
+        self.tools_menu.add_separator()
+        self.tools_menu.add_command(label="Page Table Memory Report...", command=self.create_page_table_memory_window)
 
     def create_key_bindings(self):
         # Navigation bindings
@@ -549,6 +605,54 @@ class App(TkinterDnD.Tk):
 
 # Create Secondary Windows
 
+    def create_page_table_memory_window(self):
+        """Show the memory held by each column of the page table, with an option to compact it."""
+        window = tk.Toplevel(self)
+        window.title("Page Table Memory")
+        window.geometry("620x460")
+
+        summary_var = tk.StringVar()
+        compaction_note = {"text": ""}
+        tk.Label(window, textvariable=summary_var, justify=tk.LEFT).pack(anchor="w", padx=10, pady=10)
+
+        tree_frame = tk.Frame(window)
+        tree_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        columns = ("Column", "Type", "Filled", "Distinct", "Memory")
+        tree = ttk.Treeview(tree_frame, columns=columns, show="headings")
+        for column, width in [("Column", 200), ("Type", 80), ("Filled", 80), ("Distinct", 80), ("Memory", 100)]:
+            tree.heading(column, text=column)
+            tree.column(column, width=width)
+        tree.pack(fill="both", expand=True, side="left")
+        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
+        scrollbar.pack(side="right", fill="y")
+        tree.config(yscrollcommand=scrollbar.set)
+
+        def populate():
+            tree.delete(*tree.get_children())
+            report = sorted(page_table_memory(self.main_df), key=lambda entry: entry["bytes"], reverse=True)
+            for entry in report:
+                tree.insert("", "end", values=(entry["column"], entry["dtype"], entry["filled"], entry["distinct"],
+                                               f"{entry['bytes'] / 1024:,.1f} KB"))
+            total = sum(entry["bytes"] for entry in report)
+            summary_var.set(f"{len(self.main_df)} pages, {len(report)} columns, about {total / (1024 * 1024):,.2f} MB in total.\n"
+                            f"Shared values are counted once; text still on disk (lazy loading) is not counted."
+                            + compaction_note["text"])
+
+        def compact():
+            bytes_before = page_table_bytes(self.main_df)
+            compacted = compact_page_table(self.main_df)
+            bytes_after = page_table_bytes(self.main_df)
+            compaction_note["text"] = (f"\nCompacted {len(compacted)} column(s): {bytes_before / (1024 * 1024):,.2f} MB before, "
+                                       f"{bytes_after / (1024 * 1024):,.2f} MB after.")
+            self.error_logging(f"Compacted {len(compacted)} page table columns: {bytes_before} bytes before, {bytes_after} after", level="INFO")
+            populate()
+
+        populate()
+        button_frame = tk.Frame(window)
+        button_frame.pack(pady=(0, 10))
+        tk.Button(button_frame, text="Compact Now", command=compact).pack(side="left", padx=5)
+        tk.Button(button_frame, text="Close", command=window.destroy).pack(side="left", padx=5)
+
     def create_find_relevant_documents_window(self):
         """Create a window for finding relevant documents using AI analysis"""
         # Create the window
@@ -1154,6 +1258,17 @@ class App(TkinterDnD.Tk):
         self.update_separation_menu_state("normal")
 
         # Clear project and image directories
+        if hasattr(self, 'project_io'):
+            self.project_io.close_project_store()
+        if hasattr(self, 'autosave'):
+            self.autosave.clear()
+            self.title(self.base_title)
+        if hasattr(self, 'history'):
+            self.history.clear()
+        if hasattr(self, 'volumes'):
+            self.volumes.close()
+        if hasattr(self, 'image_files'):
+            self.image_files.invalidate()
         self.initialize_temp_directory()
         # Reset the page counter
         self.page_counter = 0
@@ -1259,7 +1374,7 @@ class App(TkinterDnD.Tk):
             if current_display_val != "None":
                 text = self.data_operations.clean_text(self.text_display.get("1.0", tk.END))
                 if current_display_val in ["Original_Text", "Corrected_Text", "Formatted_Text", "Translation", "Separated_Text"]:
-                    self.main_df.loc[self.page_counter, current_display_val] = text
+                    self.data_operations.store_edit(self.page_counter, current_display_val, text)
         # --- End Save ---
 
         # Store the current display type
@@ -1285,7 +1400,7 @@ class App(TkinterDnD.Tk):
         # Update the Text_Toggle in the DataFrame AFTER potentially changing pages
         # Ensure page_counter is valid before accessing main_df
         if not self.main_df.empty and self.page_counter < len(self.main_df) and selected_display != "None":
-            self.main_df.at[self.page_counter, 'Text_Toggle'] = selected_display
+            self.data_operations.store_edit(self.page_counter, 'Text_Toggle', selected_display)
         # Load text is now called within refresh_display
         # self.load_text() # Removed - handled by refresh_display
         # self.counter_update() # Removed - handled by load_text inside refresh_display
@@ -1293,7 +1408,11 @@ class App(TkinterDnD.Tk):
     def counter_update(self):
         total_images = len(self.main_df) -1 # Index is 0-based
 
-        if total_images >= 0:
+        # In a multi-volume collection the counter shows the page's global position
+        volume_text = self.volumes.counter_text(self.page_counter, len(self.main_df)) if hasattr(self, 'volumes') else None
+        if volume_text:
+            self.page_counter_var.set(volume_text)
+        elif total_images >= 0:
             self.page_counter_var.set(f"{self.page_counter + 1} / {total_images + 1}")
         else:
             self.page_counter_var.set("0 / 0")
@@ -1323,7 +1442,7 @@ class App(TkinterDnD.Tk):
                 # Use get_full_path to resolve relative paths
                 image_path = self.get_full_path(image_path)
 
-                if not os.path.exists(image_path):
+                if not self.image_files.exists(image_path):
                     messagebox.showerror("Error", f"Image file not found: {image_path}")
                     return
 
@@ -1393,10 +1512,10 @@ class App(TkinterDnD.Tk):
                 if current_display != "None":
                     text = self.data_operations.clean_text(self.text_display.get("1.0", tk.END))
                     if current_display in ["Original_Text", "Corrected_Text", "Formatted_Text", "Translation", "Separated_Text"]:
-                        self.main_df.loc[self.page_counter, current_display] = text
+                        self.data_operations.store_edit(self.page_counter, current_display, text)
 
                 if hasattr(self, 'relevance_var') and 'Relevance' in self.main_df.columns:
-                     self.main_df.loc[self.page_counter, 'Relevance'] = self.relevance_var.get()
+                     self.data_operations.store_edit(self.page_counter, 'Relevance', self.relevance_var.get())
 
             # Navigate
             self.page_counter = next_index
@@ -1440,7 +1559,7 @@ class App(TkinterDnD.Tk):
                 image_path_abs = self.get_full_path(image_path_to_display)
 
                 # Load the new image
-                if image_path_abs and os.path.exists(image_path_abs):
+                if image_path_abs and self.image_files.exists(image_path_abs):
                     self.current_image_path = image_path_abs
                     self.image_handler.load_image(self.current_image_path)
 
@@ -1480,6 +1599,7 @@ class App(TkinterDnD.Tk):
                 new_rows_df = pd.DataFrame(new_rows_list)
                 # Concatenate with the main DataFrame
                 self.main_df = pd.concat([self.main_df, new_rows_df], ignore_index=True)
+                self.autosave.mark_structure_changed()
 
                 # Set text display to "None" before refreshing the display
                 self.text_display_var.set("None")
@@ -1492,6 +1612,9 @@ class App(TkinterDnD.Tk):
 
                 self.refresh_display()
 
+                # Hash the new pages so near-duplicates can be found
+                self.page_analyzer.update_image_hashes()
+
                 # Add auto-rotation if enabled in settings using the handler
                 if hasattr(self, 'settings') and getattr(self.settings, 'check_orientation', False):
                     # First rotation pass
@@ -1630,6 +1753,7 @@ class App(TkinterDnD.Tk):
 
         # Create DataFrame from list
         self.main_df = pd.DataFrame(new_rows_list)
+        self.autosave.mark_structure_changed()
 
         # Load the first image and its text.
         if len(self.main_df) > 0:
@@ -1711,6 +1835,7 @@ class App(TkinterDnD.Tk):
 
         # Create DataFrame
         self.main_df = pd.DataFrame(new_rows_list)
+        self.autosave.mark_structure_changed()
 
         # Load the first image and text file
         if len(self.main_df) > 0:
@@ -1735,6 +1860,8 @@ class App(TkinterDnD.Tk):
 
         # Ensure there is at least one row and that the page counter is valid.
         index = self.page_counter
+        # A lazily opened project reads a page's text when the page is shown
+        self.project_io.ensure_text_loaded(indices=[index])
         row_data = self.main_df.loc[index]
         current_toggle = row_data.get('Text_Toggle', "None")
 
@@ -1893,11 +2020,11 @@ class App(TkinterDnD.Tk):
             self.data_operations.update_df()
             
             # Open the project using ProjectIO
-            project_name = os.path.basename(project_path)
-            project_file = os.path.join(project_path, f"{project_name}.pbf")
             images_directory = os.path.join(project_path, "images")
 
-            if not os.path.exists(project_file) or not os.path.exists(images_directory):
+            # A multi-volume collection has its volume index at the top instead of a project file
+            is_collection = self.volumes.is_collection(project_path)
+            if not is_collection and (not self.project_io.has_project_file(project_path) or not os.path.exists(images_directory)):
                 messagebox.showerror("Error", "Invalid project directory. Missing project file or images directory.")
                 return
 
@@ -2038,6 +2165,11 @@ class App(TkinterDnD.Tk):
             messagebox.showwarning("Invalid Files",
                 f"The following files/paths were not processed because they are not valid image or PDF files:\n\n{invalid_files_str}")
 
+    def rescan_images_directory(self):
+        """Re-list the images directory, e.g. after images were added or removed outside the application."""
+        self.image_files.refresh()
+        self.refresh_display()
+
     def get_full_path(self, path):
         """ Resolves a potentially relative path to an absolute path based on the project directory. """
         # If the path isn't a string or is empty, return it as is.
@@ -2098,6 +2230,20 @@ class App(TkinterDnD.Tk):
             # Save any pending changes before quitting using DataOperations
             self.data_operations.update_df()
 
+            # Write out tracked changes and wait for queued saves to reach disk
+            self.autosave.autosave()
+            self.autosave.wait_until_idle()
+            try:
+                self.volumes.save_index()
+            except Exception as e:
+                self.error_logging(f"Failed to save the volume index on close: {e}", level="WARNING")
+
+            # Persist recorded API latency so job estimates improve across sessions
+            try:
+                self.settings.save_settings()
+            except Exception as e:
+                self.error_logging(f"Failed to save settings on close: {e}", level="WARNING")
+
             self.quit()
             self.destroy() # Ensure window closes fully
 
@@ -2133,7 +2279,7 @@ class App(TkinterDnD.Tk):
 
             # Save the text to the appropriate column based on CURRENT display type
             if current_toggle in ["Original_Text", "Corrected_Text", "Formatted_Text", "Translation", "Separated_Text"]:
-                self.main_df.loc[index, current_toggle] = text
+                self.data_operations.store_edit(index, current_toggle, text)
 
         # Determine available text types
         has_separated = pd.notna(row_data.get('Separated_Text')) and row_data.get('Separated_Text', "").strip()
@@ -2147,7 +2293,7 @@ class App(TkinterDnD.Tk):
         available_toggles = [t for t in toggle_order if locals()[f'has_{t.split("_")[0].lower()}']]
 
         if not available_toggles: # If no text available at all
-             self.main_df.loc[index, 'Text_Toggle'] = "None"
+             self.data_operations.store_edit(index, 'Text_Toggle', "None")
              self.load_text()
              return
 
@@ -2162,7 +2308,7 @@ class App(TkinterDnD.Tk):
         next_idx = (current_idx + 1) % len(available_toggles)
         next_toggle = available_toggles[next_idx]
 
-        self.main_df.loc[index, 'Text_Toggle'] = next_toggle
+        self.data_operations.store_edit(index, 'Text_Toggle', next_toggle)
         self.load_text()
 
         # Apply highlighting based on toggle states without mutual exclusivity
@@ -2288,7 +2434,7 @@ class App(TkinterDnD.Tk):
             image_path_abs = self.get_full_path(image_path_to_display) if image_path_to_display else ""
 
             # --- Load Image ---
-            if image_path_abs and os.path.exists(image_path_abs):
+            if image_path_abs and self.image_files.exists(image_path_abs):
                 self.current_image_path = image_path_abs # Keep track of the currently displayed absolute path
                 self.image_handler.load_image(self.current_image_path)
             else:
@@ -2355,7 +2501,7 @@ class App(TkinterDnD.Tk):
         }
 
         # Update the Text_Toggle in the DataFrame
-        self.main_df.at[index, 'Text_Toggle'] = display_map[selected]
+        self.data_operations.store_edit(index, 'Text_Toggle', display_map[selected])
 
         # Clear error highlights if switching to a text version they don't apply to
         if 'Errors_Source' in self.main_df.columns:
@@ -2529,6 +2675,7 @@ class App(TkinterDnD.Tk):
                 rotated_img = img.rotate(correction_angle, expand=True)
                  # Save back to the original path (overwrite)
                 rotated_img.save(image_path_abs, "JPEG", quality=95) # Assume JPEG, adjust if needed
+            self.image_files.note_written(image_path_abs)
 
             # If the currently viewed page was rotated, reload its image in the canvas
             if index == self.page_counter:
@@ -2553,7 +2700,8 @@ class App(TkinterDnD.Tk):
             # --- MODIFIED --- Force update Text_Toggle if new text exists
             new_text = self.main_df.loc[index, updated_column_name]
             if pd.notna(new_text) and str(new_text).strip():
-                self.main_df.loc[index, 'Text_Toggle'] = updated_column_name
+                set_cell(self.main_df, index, 'Text_Toggle', updated_column_name)
+                self.autosave.mark_dirty(index, 'Text_Toggle')
                 self.error_logging(f"Forced Text_Toggle for index {index} to {updated_column_name}", level="INFO")
             # --- END MODIFIED ---
 
@@ -2582,7 +2730,7 @@ class App(TkinterDnD.Tk):
 
         # Update the 'Relevance' column in the DataFrame for the current row
         if 'Relevance' in self.main_df.columns:
-            self.main_df.loc[index, 'Relevance'] = selected_relevance
+            self.data_operations.store_edit(index, 'Relevance', selected_relevance)
 
 # Function Handlers
 
@@ -2773,6 +2921,7 @@ class App(TkinterDnD.Tk):
 
                     # Recreate the DataFrame
                     self.main_df = pd.DataFrame(new_rows_list)
+                    self.autosave.mark_structure_changed()
 
                     # Clean up pass_images directory
                     for file in edited_images: # Use the list we already have
@@ -4,8 +4,11 @@
 # the AI functions for the application.
 
 import asyncio
+import json
 import os
 import re
+import threading
+import time
 import traceback
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
@@ -14,8 +17,18 @@ from tkinter import messagebox, TclError
 import pandas as pd
 from PIL import Image, ImageOps
 
+from util.JobPlanner import estimate_image_tokens, estimate_text_tokens
+from util.NameBlocking import block_variants, format_collation_lines, shard_blocks, split_blocks
+from util.PageTable import set_cell, snapshot_page_table
+from util.Provenance import PROVENANCE_COLUMN, TRACKED_JOB_TARGETS, hash_file, hash_text, is_stale, record_provenance
+
 # Assuming settings and other necessary imports are handled by the main app instance
 
+# Structured Identify_Errors: per-request token budget, page cap and pages repeated between windows
+ERROR_WINDOW_TOKEN_BUDGET = 60000
+ERROR_WINDOW_MAX_PAGES = 20
+ERROR_WINDOW_OVERLAP = 1
+
 
 class AIFunctionsHandler:
     def __init__(self, app_instance):
@@ -26,6 +39,8 @@ class AIFunctionsHandler:
         # Temporary attributes for passing selections between windows/functions
         self.temp_selected_source = None
         self.temp_format_preset = None
+        # Guards settings.api_latency_stats, which worker threads update concurrently
+        self._latency_lock = threading.Lock()
 
     async def process_api_request(self, system_prompt, user_prompt, temp, image_data,
                                     text_to_process, val_text, engine, index,
@@ -37,7 +52,8 @@ class AIFunctionsHandler:
                 self.app.error_logging(f"API Handler not initialized for index {index}", level="ERROR")
                 return "Error: API Handler not ready", index
 
-            return await self.app.api_handler.route_api_call(
+            start_time = time.monotonic()
+            result = await self.app.api_handler.route_api_call(
                 engine=engine,
                 system_prompt=system_prompt,
                 user_prompt=user_prompt,
@@ -50,6 +66,8 @@ class AIFunctionsHandler:
                 job_type=ai_job, # Pass job_type for potential API handler logic
                 job_params=job_params # Pass job_params
             )
+            self.record_api_latency(engine, time.monotonic() - start_time)
+            return result
 
         except Exception as e:
             self.app.error_logging(f"API Error during processing for index {index}, job {ai_job}", f"{e}", level="ERROR")
@@ -57,8 +75,30 @@ class AIFunctionsHandler:
             # REMOVED traceback.print_exc()
             return "Error", index
 
+    def record_api_latency(self, engine, seconds, max_samples=50):
+        """
+        Fold one request's wall time into a running average per model.
+        The average covers at most the last max_samples requests so it tracks recent API speed.
+        """
+        if not hasattr(self.app, 'settings'):
+            return
+        with self._latency_lock:
+            stats = getattr(self.app.settings, 'api_latency_stats', None)
+            if not isinstance(stats, dict):
+                stats = {}
+                self.app.settings.api_latency_stats = stats
+            entry = stats.get(engine, {"avg_seconds": 0.0, "samples": 0})
+            samples = min(int(entry.get("samples", 0)) + 1, max_samples)
+            avg_seconds = float(entry.get("avg_seconds", 0.0))
+            avg_seconds += (seconds - avg_seconds) / samples
+            stats[engine] = {"avg_seconds": round(avg_seconds, 3), "samples": samples}
+
     def ai_function(self, all_or_one_flag="All Pages", ai_job="HTR", batch_size=None, selected_metadata_preset=None, export_text_source=None, show_final_message=True):
         """ Main function to orchestrate AI jobs """
+        # Outside a multi-volume collection, All Volumes is the same as All Pages
+        if all_or_one_flag == "All Volumes" and not self.app.volumes.is_open():
+            all_or_one_flag = "All Pages"
+
         # If export_text_source is provided (when called from export), set it as temp_selected_source
         # This ensures the existing logic for text source selection works correctly
         if export_text_source:
@@ -66,8 +106,14 @@ class AIFunctionsHandler:
             self.app.error_logging(f"Using export-provided text source: {export_text_source}", level="DEBUG")
 
         # Special handling for the new structured Identify_Errors
-        if ai_job == "Identify_Errors":
-            return self.process_identify_errors_structured(all_or_one_flag)
+        if ai_job == "Identify_Errors" and all_or_one_flag != "All Volumes":
+            history_operation = self.app.history.begin(f"Identify_Errors ({all_or_one_flag})",
+                                                       indices=[self.app.page_counter] if all_or_one_flag == "Current Page" else None,
+                                                       columns=self.job_text_columns(ai_job))
+            try:
+                return self.process_identify_errors_structured(all_or_one_flag)
+            finally:
+                self.app.history.end(history_operation)
 
         # Check if we should show preset/source selection windows (moved check here)
         # Skip window if triggered by export (export_text_source is provided)
@@ -98,6 +144,29 @@ class AIFunctionsHandler:
                 # via process_ai_with_selected_source
                 return
 
+        # Run the job on each volume of the collection in turn, with the choices made above
+        if all_or_one_flag == "All Volumes":
+            selections = {name: getattr(self, name) for name in
+                          ("temp_selected_source", "temp_format_preset", "temp_format_additional_info", "temp_htr_preset")
+                          if hasattr(self, name)}
+
+            def run_volume():
+                # Each run clears the temporary selections when it finishes
+                for name, value in selections.items():
+                    setattr(self, name, value)
+                self.ai_function("All Pages", ai_job, batch_size, selected_metadata_preset, export_text_source,
+                                 show_final_message=False)
+
+            self.app.volumes.for_each_volume(run_volume, ai_job)
+            for name in selections:
+                if hasattr(self, name):
+                    delattr(self, name)
+            return
+
+        # Jobs read and write text across pages; read the job's columns a lazily opened project deferred
+        text_columns = self.job_text_columns(ai_job, getattr(self, 'temp_selected_source', None), selected_metadata_preset)
+        self.app.project_io.ensure_text_loaded(text_columns, indices=[self.app.page_counter] if all_or_one_flag == "Current Page" else None)
+
         # If batch_size wasn't passed, get it from job parameters
         if batch_size is None:
              job_params_setup = self.setup_job_parameters(ai_job)
@@ -106,6 +175,11 @@ class AIFunctionsHandler:
         self.app.toggle_button_state()
         error_count = 0
         processed_indices = set()
+        flagged_pages = {} # Pages the local classifier marked blank/non-text
+        cheap_model_indices = set()
+        blank_handling = getattr(self.app.settings, 'blank_page_handling', "Off")
+        locally_oriented = [] # Auto_Rotate pages resolved by the local estimator
+        duplicate_of = {} # duplicate index -> representative index whose results it receives
         batch_df = pd.DataFrame() # Initialize empty DataFrame
         total_rows = 0
         processed_rows = 0
@@ -115,6 +189,11 @@ class AIFunctionsHandler:
         if ai_job == "Format_Text":
             additional_info = getattr(self, 'temp_format_additional_info', None)
 
+        # Record the run's changes so it can be reverted from the version history
+        history_operation = self.app.history.begin(f"{ai_job} ({all_or_one_flag})",
+                                                   indices=[self.app.page_counter] if all_or_one_flag == "Current Page" else None,
+                                                   columns=text_columns)
+
         try:
             # --- Chunk_Text Handling ---
             if ai_job == "Chunk_Text":
@@ -198,152 +277,40 @@ class AIFunctionsHandler:
 
             responses_dict = {}
             futures_to_index = {}
+            fused_fallback_indices = [] # Pages whose fused HTR_Correct response failed validation
+            source_hashes = {} # index -> hash of the image/text each request was built from
+            params_by_index = {} # index -> job parameters its request used (differs for cheap-model pages)
             # processed_rows = 0 # Moved initialization up
             # total_rows = 0     # Moved initialization up
 
-            # Get the Skip Completed Pages toggle value
-            skip_completed = self.app.skip_completed_pages.get()
-
-            # --- Determine Batch DataFrame (batch_df) ---
-            # Logic to determine which rows go into batch_df based on ai_job, all_or_one_flag, and skip_completed
-            # This involves checking if the source data exists and if the target data is missing (if skip_completed)
-
             # Use the selected source if available (set by create_text_source_window -> process_ai_with_selected_source)
             selected_source = getattr(self, 'temp_selected_source', None)
 
-            if ai_job == "HTR":
-                target_col = 'Original_Text'
-                if all_or_one_flag == "Current Page":
-                    row_idx = self.app.page_counter
-                    if row_idx < len(self.app.main_df):
-                         # Process if skipping is off OR if target is empty
-                         if not skip_completed or pd.isna(self.app.main_df.loc[row_idx, target_col]) or not self.app.main_df.loc[row_idx, target_col].strip():
-                              batch_df = self.app.main_df.loc[[row_idx]]
-                         else: messagebox.showinfo("Skip", f"Page {row_idx+1} already has {target_col}.")
-                    else: messagebox.showerror("Error", "Invalid page index.")
-                else: # All Pages
-                     source_check_df = self.app.main_df[(self.app.main_df['Image_Path'].notna()) & (self.app.main_df['Image_Path'] != '')]
-                     if skip_completed:
-                          batch_df = source_check_df[source_check_df[target_col].isna() | (source_check_df[target_col] == '')]
-                     else: batch_df = source_check_df
-            elif ai_job == "Correct_Text":
-                 target_col = 'Corrected_Text'
-                 source_col = selected_source or 'Original_Text' # Default source if not specified
-                 if all_or_one_flag == "Current Page":
-                      row_idx = self.app.page_counter
-                      if row_idx < len(self.app.main_df):
-                           row_data = self.app.main_df.loc[row_idx]
-                           if pd.notna(row_data.get(source_col)) and row_data.get(source_col, "").strip():
-                                if not skip_completed or pd.isna(row_data.get(target_col)) or not row_data.get(target_col, "").strip():
-                                     batch_df = self.app.main_df.loc[[row_idx]]
-                                else: messagebox.showinfo("Skip", f"Page {row_idx+1} already has {target_col}.")
-                           else: messagebox.showinfo("Skip", f"Page {row_idx+1} has no source text in '{source_col}'.")
-                      else: messagebox.showerror("Error", "Invalid page index.")
-                 else: # All Pages
-                      source_check_df = self.app.main_df[self.app.main_df[source_col].notna() & (self.app.main_df[source_col] != '')]
-                      if skip_completed:
-                           batch_df = source_check_df[source_check_df[target_col].isna() | (source_check_df[target_col] == '')]
-                      else: batch_df = source_check_df
-            elif ai_job == "Format_Text":
-                target_col = 'Formatted_Text'
-                source_col = selected_source # Rely on selection window default or user choice
-                if not source_col: source_col = 'Corrected_Text' # Fallback default if window skipped somehow
-                if all_or_one_flag == "Current Page":
-                    row_idx = self.app.page_counter
-                    if row_idx < len(self.app.main_df):
-                        row_data = self.app.main_df.loc[row_idx]
-                        actual_source_found = ""
-                        # Find best source: Use selected source first, then Corrected, then Original
-                        if selected_source and pd.notna(row_data.get(selected_source)) and row_data.get(selected_source,"").strip():
-                            actual_source_found = selected_source
-                        elif pd.notna(row_data.get('Corrected_Text')) and row_data.get('Corrected_Text',"").strip():
-                             actual_source_found = 'Corrected_Text'
-                        elif pd.notna(row_data.get('Original_Text')) and row_data.get('Original_Text',"").strip():
-                             actual_source_found = 'Original_Text'
-
-                        if actual_source_found:
-                             if not skip_completed or pd.isna(row_data.get(target_col)) or not row_data.get(target_col, "").strip():
-                                 batch_df = self.app.main_df.loc[[row_idx]]
-                             else: messagebox.showinfo("Skip", f"Page {row_idx+1} already has {target_col}.")
-                        else: messagebox.showinfo("Skip", f"Page {row_idx+1} has no source text (Selected/Corrected/Original).")
-                    else: messagebox.showerror("Error", "Invalid page index.")
-                else: # All Pages
-                     def find_format_source(row):
-                          if selected_source and pd.notna(row.get(selected_source)) and row.get(selected_source,"").strip(): return True
-                          if pd.notna(row.get('Corrected_Text')) and row.get('Corrected_Text',"").strip(): return True
-                          if pd.notna(row.get('Original_Text')) and row.get('Original_Text',"").strip(): return True
-                          return False
-                     source_check_df = self.app.main_df[self.app.main_df.apply(find_format_source, axis=1)]
-                     if skip_completed:
-                          batch_df = source_check_df[source_check_df[target_col].isna() | (source_check_df[target_col] == '')]
-                     else: batch_df = source_check_df
-            elif ai_job == "Translation":
-                target_col = 'Translation'
-                source_col = selected_source # Source MUST be selected for Translation via window
-                if not source_col:
-                     messagebox.showerror("Error", "Text source for translation not selected.")
-                     self.app.toggle_button_state()
-                     return
-                if all_or_one_flag == "Current Page":
-                     row_idx = self.app.page_counter
-                     if row_idx < len(self.app.main_df):
-                          row_data = self.app.main_df.loc[row_idx]
-                          if pd.notna(row_data.get(source_col)) and row_data.get(source_col, "").strip():
-                               if not skip_completed or pd.isna(row_data.get(target_col)) or not row_data.get(target_col, "").strip():
-                                    batch_df = self.app.main_df.loc[[row_idx]]
-                               else: messagebox.showinfo("Skip", f"Page {row_idx+1} already has {target_col}.")
-                          else: messagebox.showinfo("Skip", f"Page {row_idx+1} has no source text in '{source_col}'.")
-                     else: messagebox.showerror("Error", "Invalid page index.")
-                else: # All Pages
-                     source_check_df = self.app.main_df[self.app.main_df[source_col].notna() & (self.app.main_df[source_col] != '')]
-                     if skip_completed:
-                          batch_df = source_check_df[source_check_df[target_col].isna() | (source_check_df[target_col] == '')]
-                     else: batch_df = source_check_df
-            elif ai_job == "Get_Names_and_Places":
-                 target_col = ['People', 'Places'] # Multiple target cols
-                 # Assume source is always best available text, skip_completed doesn't apply
-                 if all_or_one_flag == "Current Page":
-                      row_idx = self.app.page_counter
-                      if row_idx < len(self.app.main_df): batch_df = self.app.main_df.loc[[row_idx]]
-                      else: messagebox.showerror("Error", "Invalid page index.")
-                 else: # All Pages
-                      batch_df = self.app.main_df.copy() # Process all rows
-            elif ai_job == "Auto_Rotate":
-                 target_col = None # No text target column
-                 # Process all rows with images, skip_completed doesn't apply
-                 source_check_df = self.app.main_df[(self.app.main_df['Image_Path'].notna()) & (self.app.main_df['Image_Path'] != '')]
-                 if all_or_one_flag == "Current Page":
-                     row_idx = self.app.page_counter
-                     if row_idx in source_check_df.index: batch_df = self.app.main_df.loc[[row_idx]]
-                     else: messagebox.showinfo("Skip", f"Page {row_idx+1} has no image path.")
-                 else: # All Pages
-                      batch_df = source_check_df
-            elif ai_job == "Metadata":
-                target_col = None # No single target, updates multiple cols
-                source_col = selected_source # Source MUST be selected via window
-                if not source_col:
-                     messagebox.showerror("Error", "Text source for metadata extraction not selected.")
-                     self.app.toggle_button_state()
-                     return
-                if all_or_one_flag == "Current Page":
-                     row_idx = self.app.page_counter
-                     if row_idx < len(self.app.main_df):
-                          row_data = self.app.main_df.loc[row_idx]
-                          if pd.notna(row_data.get(source_col)) and row_data.get(source_col, "").strip():
-                               batch_df = self.app.main_df.loc[[row_idx]]
-                          else: messagebox.showinfo("Skip", f"Page {row_idx+1} has no source text in '{source_col}'.")
-                     else: messagebox.showerror("Error", "Invalid page index.")
-                else: # All Pages
-                     batch_df = self.app.main_df[self.app.main_df[source_col].notna() & (self.app.main_df[source_col] != '')]
-            else: # Default case or unrecognized job
-                messagebox.showerror("Error", f"Unrecognized AI Job type: {ai_job}")
-                batch_df = pd.DataFrame() # Ensure empty DF
+            # --- Determine Batch DataFrame (batch_df): the same selection the job planner estimates ---
+            selection = self.select_pages(ai_job, all_or_one_flag, selected_source)
+            if selection["error"]:
+                messagebox.showerror("Error", selection["message"])
+                return
+            batch_df = selection["batch_df"]
+            target_col = selection["target_col"]
+            stale_only = selection["stale_only"]
+            skip_completed = selection["skip_completed"]
+            flagged_pages = selection["flagged_pages"]
+            cheap_model_indices = selection["cheap_model_indices"]
+            duplicate_of = selection["duplicate_of"]
+            locally_oriented = selection["locally_oriented"]
 
             # --- Check if any rows to process ---
             total_rows = len(batch_df) # Assign value to total_rows here
             if total_rows == 0:
                 info_message = "No pages need processing for this task."
-                if skip_completed:
+                if selection["message"]:
+                    info_message = selection["message"]
+                elif locally_oriented:
+                    info_message = f"All {len(locally_oriented)} page(s) were oriented locally without API calls."
+                elif stale_only:
+                    info_message = "All applicable pages are up to date with their source text, preset and model."
+                elif skip_completed:
                     job_name = ai_job.replace('_', ' ')
                     if target_col and isinstance(target_col, str):
                          info_message = f"All applicable pages already have content in '{target_col}' or lack source data."
@@ -365,14 +332,19 @@ class AIFunctionsHandler:
             with ThreadPoolExecutor(max_workers=batch_size) as executor:
                 # Submit all tasks first
                 for index, row_data in batch_df.iterrows():
+                    # Pages flagged blank/non-text go to the cheaper model when configured
+                    row_job_params = job_params
+                    if index in cheap_model_indices:
+                        row_job_params = self.cheap_model_params(job_params)
+
                     # Get images based on the job type and parameters
-                    images_data = self.get_images_for_job(ai_job, index, row_data, job_params)
+                    images_data = self.get_images_for_job(ai_job, index, row_data, row_job_params)
 
                     # Determine text_to_process based on the job
                     text_to_process = ""
                     source_col_used = None
 
-                    if ai_job in ["HTR", "Auto_Rotate"]:
+                    if ai_job in ["HTR", "HTR_Correct", "Auto_Rotate"]:
                         text_to_process = '' # No text input needed
                     
                     elif ai_job in ["Correct_Text", "Translation", "Identify_Errors", "Metadata"]:
@@ -407,7 +379,7 @@ class AIFunctionsHandler:
                     text_to_process = str(text_to_process) if pd.notna(text_to_process) else ""
 
                     # Skip if text_to_process is empty for jobs that require it
-                    if not text_to_process.strip() and ai_job not in ["HTR", "Auto_Rotate"]:
+                    if not text_to_process.strip() and ai_job not in ["HTR", "HTR_Correct", "Auto_Rotate"]:
                         self.app.error_logging(f"Skipping index {index} for job {ai_job} due to empty source text ('{source_col_used}')", level="WARNING")
                         # Mark as processed for progress bar logic
                         processed_indices.add(index)
@@ -415,6 +387,11 @@ class AIFunctionsHandler:
                         self.app.progress_bar.update_progress(processed_rows, total_rows)
                         continue
 
+                    # Remember what the output is derived from, for provenance
+                    if ai_job in TRACKED_JOB_TARGETS:
+                        source_hashes[index] = self.get_provenance_source_hash(ai_job, row_data, selected_source)
+                        params_by_index[index] = row_job_params
+
                     # Print the prompt
                     # REMOVED print(f"System Prompt: {job_params['system_prompt']}")
                     # REMOVED print(f"User Prompt: {job_params['user_prompt']}")
@@ -429,11 +406,11 @@ class AIFunctionsHandler:
                             image_data=images_data,
                             text_to_process=text_to_process, # Send formatted text to AI
                             val_text=job_params['val_text'],
-                            engine=job_params['engine'],
+                            engine=row_job_params['engine'],
                             index=index,
-                            is_base64=not "gemini" in job_params.get('engine','').lower(),
+                            is_base64=not "gemini" in row_job_params.get('engine','').lower(),
                             ai_job=ai_job,
-                            job_params=job_params
+                            job_params=row_job_params
                         )
                     )
                     futures_to_index[future] = index
@@ -465,6 +442,16 @@ class AIFunctionsHandler:
                             processed_rows += 1 # Increment processed_rows here
                             self.app.progress_bar.update_progress(processed_rows, total_rows)
 
+                        # Fused HTR + correction: queue failed or invalid pages for separate calls
+                        if ai_job == "HTR_Correct":
+                            if response == "Error" or not self.app.data_operations.update_df_with_fused_htr_response(index, response):
+                                self.app.error_logging(f"Fused HTR_Correct response failed validation for index {index}, queuing fallback", level="WARNING")
+                                fused_fallback_indices.append(index)
+                            else:
+                                record_provenance(self.app.main_df, index, ai_job, source_hashes.get(index, ""), params_by_index.get(index, job_params))
+                                self.app.autosave.mark_dirty(index, PROVENANCE_COLUMN)
+                            continue
+
                         # Process the response if there is no error
                         if response == "Error":
                             error_count += 1
@@ -481,6 +468,9 @@ class AIFunctionsHandler:
                                 # This function now handles different jobs internally
                                 # Call the method on the DataOperations instance via self.app
                                 self.app.data_operations.update_df_with_ai_job_response(ai_job, index, response)
+                                if ai_job in TRACKED_JOB_TARGETS:
+                                    record_provenance(self.app.main_df, index, ai_job, source_hashes.get(index, ""), params_by_index.get(index, job_params))
+                                    self.app.autosave.mark_dirty(index, PROVENANCE_COLUMN)
 
                     except Exception as e:
                          error_count += 1
@@ -493,6 +483,13 @@ class AIFunctionsHandler:
                             processed_rows += 1 # Increment processed_rows here
                             self.app.progress_bar.update_progress(processed_rows, total_rows)
 
+            # --- Fallback to separate HTR and Correct_Text calls for failed fused pages ---
+            if fused_fallback_indices:
+                error_count += self.process_fused_htr_fallback(sorted(fused_fallback_indices), batch_size)
+
+            if duplicate_of:
+                self.copy_results_to_duplicates(ai_job, duplicate_of, job_params, selected_source, params_by_index)
+
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred in ai_function orchestration: {str(e)}")
             self.app.error_logging(f"Error in ai_function orchestration for job {ai_job}: {str(e)}", level="ERROR")
@@ -500,6 +497,7 @@ class AIFunctionsHandler:
 
 
         finally:
+            self.app.history.end(history_operation)
             # --- Cleanup ---
             # Close progress window if it exists and wasn't for Chunk_Text
             if ai_job != "Chunk_Text" and 'progress_window' in locals() and progress_window.winfo_exists():
@@ -533,6 +531,218 @@ class AIFunctionsHandler:
                      messagebox.showinfo("Processing Complete", f"Successfully processed {processed_rows}/{total_rows} applicable pages.")
                 # If total_rows was 0 initially, the 'No Work Needed' message was already shown.
 
+            # Let the user review pages the local classifier flagged
+            if show_final_message and flagged_pages:
+                self.app.page_analyzer.show_flagged_pages_window(flagged_pages, blank_handling)
+
+    def select_pages(self, ai_job, all_or_one_flag, selected_source=None, dry_run=False):
+        """
+        Decide which pages a job sends to the model. ai_function and the job
+        planner both use this, so estimates match what a run does. In order:
+        pages with the job's source (image or text), then Skip Completed Pages
+        or Process Stale Only, blank/non-text page handling, duplicate skipping
+        and the local orientation estimate. With dry_run, pages the orientation
+        estimator is confident about are counted but not rotated.
+
+        Returns:
+            dict: batch_df (pages to send), target_col, stale_only, skip_completed,
+                  candidates (pages with source), skipped_completed, skipped_stale,
+                  flagged_pages, cheap_model_indices, duplicate_of, locally_oriented,
+                  error and message (why the selection is empty, or None).
+        """
+        main_df = self.app.main_df
+        stale_only = self.app.process_stale_only.get() and ai_job in TRACKED_JOB_TARGETS
+        skip_completed = self.app.skip_completed_pages.get() and not stale_only
+        blank_handling = getattr(self.app.settings, 'blank_page_handling', "Off")
+        target_col = {
+            "HTR": 'Original_Text',
+            "HTR_Correct": 'Corrected_Text', # Fused job writes both columns; a page is complete once it has Corrected_Text
+            "Correct_Text": 'Corrected_Text',
+            "Format_Text": 'Formatted_Text',
+            "Translation": 'Translation',
+            "Get_Names_and_Places": ['People', 'Places'],
+        }.get(ai_job)
+        selection = {
+            "batch_df": main_df.iloc[0:0], "target_col": target_col, "stale_only": stale_only, "skip_completed": skip_completed,
+            "candidates": 0, "skipped_completed": 0, "skipped_stale": 0, "flagged_pages": {}, "cheap_model_indices": set(),
+            "duplicate_of": {}, "locally_oriented": [], "error": False, "message": None,
+        }
+
+        def has_text(df, column):
+            if not column or column not in df.columns:
+                return pd.Series(False, index=df.index)
+            return df[column].notna() & (df[column].astype(str).str.strip() != '')
+
+        if ai_job in ["Translation", "Metadata"] and not selected_source:
+            selection.update(error=True, message=f"Text source for {'translation' if ai_job == 'Translation' else 'metadata extraction'} not selected.")
+            return selection
+
+        if all_or_one_flag == "Current Page":
+            page = self.app.page_counter
+            if main_df.empty or page >= len(main_df):
+                selection.update(error=True, message="Invalid page index.")
+                return selection
+            df = main_df.loc[[page]]
+        elif ai_job == "Get_Names_and_Places":
+            df = snapshot_page_table(main_df)
+        else:
+            df = main_df
+
+        # Pages with the job's source
+        if ai_job in ["HTR", "HTR_Correct", "Auto_Rotate"]:
+            candidates = df[has_text(df, 'Image_Path')]
+            missing = "no image path"
+        elif ai_job == "Format_Text":
+            # Same source priority as the Format_Text submission logic
+            candidates = df[has_text(df, selected_source) | has_text(df, 'Corrected_Text') | has_text(df, 'Original_Text')]
+            missing = "no source text (Selected/Corrected/Original)"
+        elif ai_job in ["Correct_Text", "Translation", "Metadata"]:
+            source_col = selected_source or 'Original_Text'
+            candidates = df[has_text(df, source_col)]
+            missing = f"no source text in '{source_col}'"
+        elif ai_job == "Get_Names_and_Places":
+            candidates = df # Best available text is found per page
+            missing = ""
+        else:
+            selection.update(error=True, message=f"Unrecognized AI Job type: {ai_job}")
+            return selection
+        selection["candidates"] = len(candidates)
+        if candidates.empty and all_or_one_flag == "Current Page":
+            selection["message"] = f"Page {self.app.page_counter + 1} has {missing}."
+            return selection
+
+        batch_df = candidates
+        if skip_completed and isinstance(target_col, str):
+            batch_df = candidates[~has_text(candidates, target_col)]
+            selection["skipped_completed"] = len(candidates) - len(batch_df)
+            if batch_df.empty and all_or_one_flag == "Current Page":
+                selection["message"] = f"Page {self.app.page_counter + 1} already has {target_col}."
+
+        # --- Local blank/non-text page detection before HTR (no API calls) ---
+        cheap_model_indices = set()
+        if ai_job in ["HTR", "HTR_Correct"] and all_or_one_flag == "All Pages" and blank_handling != "Off" and not batch_df.empty:
+            flagged_pages = self.app.page_analyzer.classify_pages(batch_df)
+            selection["flagged_pages"] = flagged_pages
+            if blank_handling == "Skip":
+                batch_df = batch_df.drop(index=list(flagged_pages))
+            elif blank_handling == "Cheap Model":
+                cheap_model_indices = set(flagged_pages)
+
+        # --- Keep only pages whose inputs, preset, prompt or model changed ---
+        if stale_only and not batch_df.empty:
+            stale_params = self.setup_job_parameters(ai_job)
+            cheap_params = self.cheap_model_params(stale_params)
+            stale_mask = [
+                is_stale(row_data, ai_job, self.get_provenance_source_hash(ai_job, row_data, selected_source),
+                         cheap_params if index in cheap_model_indices else stale_params)
+                for index, row_data in batch_df.iterrows()
+            ]
+            self.app.error_logging(f"Process Stale Only: {sum(stale_mask)} of {len(batch_df)} pages are stale for {ai_job}", level="INFO")
+            selection["skipped_stale"] = len(batch_df) - sum(stale_mask)
+            batch_df = batch_df[stale_mask]
+        selection["cheap_model_indices"] = cheap_model_indices.intersection(batch_df.index)
+
+        # --- Near-duplicate pages: process one representative, copy its results later ---
+        if ai_job in TRACKED_JOB_TARGETS and all_or_one_flag == "All Pages" and getattr(self.app.settings, 'skip_duplicate_pages', False) and not batch_df.empty:
+            selection["duplicate_of"] = self.find_duplicate_pages(ai_job, batch_df, selected_source)
+            batch_df = batch_df.drop(index=list(selection["duplicate_of"]))
+
+        # --- Local orientation estimate; only low-confidence pages go to the model ---
+        if ai_job == "Auto_Rotate" and getattr(self.app.settings, 'local_orientation_detection', True) and not batch_df.empty:
+            selection["locally_oriented"] = self.apply_local_orientation(batch_df, dry_run=dry_run)
+            batch_df = batch_df.drop(index=selection["locally_oriented"])
+
+        selection["batch_df"] = batch_df
+        return selection
+
+    def cheap_model_params(self, job_params):
+        """Job parameters for a page flagged blank/non-text and sent to the cheaper model."""
+        return dict(job_params, engine=getattr(self.app.settings, 'blank_page_model', job_params.get('engine', '')))
+
+    def find_duplicate_pages(self, ai_job, batch_df, selected_source=None):
+        """
+        Find pages in batch_df that are near-duplicates of an earlier page in it.
+        Text jobs also require identical source text, and jobs that attach
+        neighbouring pages are not deduplicated since their context differs.
+
+        Returns:
+            dict: duplicate index -> representative index.
+        """
+        job_params = self.setup_job_parameters(ai_job)
+        if job_params.get('use_images') and (int(job_params.get('num_prev_images', 0)) or int(job_params.get('num_after_images', 0))):
+            return {}
+
+        duplicate_of = {}
+        for representative, members in self.app.page_analyzer.find_duplicate_groups(batch_df).items():
+            if ai_job in ["HTR", "HTR_Correct"]:
+                duplicate_of.update({index: representative for index in members})
+                continue
+            # Same image is not enough for text jobs; the text being processed must match too
+            first_by_source = {}
+            for index in [representative] + members:
+                source_hash = self.get_provenance_source_hash(ai_job, self.app.main_df.loc[index], selected_source)
+                if not source_hash:
+                    continue
+                if source_hash in first_by_source:
+                    duplicate_of[index] = first_by_source[source_hash]
+                else:
+                    first_by_source[source_hash] = index
+
+        if duplicate_of:
+            self.app.error_logging(f"Duplicate pages: {len(duplicate_of)} page(s) will receive results from a representative page for {ai_job}", level="INFO")
+        return duplicate_of
+
+    def copy_results_to_duplicates(self, ai_job, duplicate_of, job_params, selected_source=None, params_by_index=None):
+        """
+        Copy a job's output columns from each representative page to its duplicates.
+        Each duplicate gets its own provenance record (hashed from its own image or
+        text) that names the page its results were copied from. params_by_index
+        gives the job parameters a representative's request used, where they
+        differ from job_params (pages sent to the cheap model).
+        """
+        columns = [col for col in TRACKED_JOB_TARGETS.get(ai_job, []) if col in self.app.main_df.columns]
+        copied = 0
+        for index, representative in duplicate_of.items():
+            target_value = self.app.main_df.at[representative, columns[0]] if columns else ""
+            if pd.isna(target_value) or not str(target_value).strip():
+                continue # Representative failed; leave the duplicate for a later run
+            for col in columns:
+                self.app.main_df.at[index, col] = self.app.main_df.at[representative, col]
+            if 'Text_Toggle' in self.app.main_df.columns:
+                set_cell(self.app.main_df, index, 'Text_Toggle', self.app.main_df.at[representative, 'Text_Toggle'])
+            source_hash = self.get_provenance_source_hash(ai_job, self.app.main_df.loc[index], selected_source)
+            record_provenance(self.app.main_df, index, ai_job, source_hash, (params_by_index or {}).get(representative, job_params),
+                              copied_from=int(representative) + 1)
+            self.app.autosave.mark_dirty(index, columns + ['Text_Toggle', PROVENANCE_COLUMN])
+            copied += 1
+        self.app.error_logging(f"Copied {ai_job} results to {copied} duplicate page(s)", level="INFO")
+        if self.app.page_counter in duplicate_of:
+            self.app.refresh_display()
+
+    def apply_local_orientation(self, batch_df, dry_run=False):
+        """
+        Rotate pages whose orientation the local estimator is confident about
+        (with dry_run, only find them).
+
+        Returns:
+            list: indices handled locally (rotated or already upright), which
+                  should not be sent to the model.
+        """
+        threshold = float(getattr(self.app.settings, 'local_orientation_confidence', 0.6))
+        estimates = self.app.page_analyzer.estimate_orientations(batch_df)
+        handled = []
+        for index, estimate in estimates.items():
+            if estimate["angle"] is None or estimate["confidence"] < threshold:
+                continue
+            if estimate["angle"] != 0 and not dry_run:
+                success, error_message = self.app.image_handler.rotate_image(estimate["path"], estimate["angle"])
+                if not success:
+                    self.app.error_logging(f"Local rotation failed for index {index}: {error_message}", level="ERROR")
+                    continue # Let the model try this page
+            handled.append(index)
+        self.app.error_logging(f"Local orientation: {len(handled)} of {len(batch_df)} pages resolved without API calls (threshold {threshold})", level="INFO")
+        return handled
+
     def setup_job_parameters(self, ai_job, selected_metadata_preset=None):
         """Set up parameters for different AI jobs based on settings"""
         self.app.error_logging(f"Setting up job parameters for {ai_job}", level="DEBUG")
@@ -622,6 +832,7 @@ class AIFunctionsHandler:
                  format_preset_name = getattr(self, 'temp_format_preset', None)
                  preset = next((p for p in self.app.settings.format_presets if p.get('name') == format_preset_name), None)
                  if preset:
+                      params['preset_name_used'] = format_preset_name
                       params.update({
                          "temp": float(preset.get('temperature', 0.2)),
                          "val_text": preset.get('val_text', "Formatted Text:"),
@@ -653,6 +864,7 @@ class AIFunctionsHandler:
                      preset = next((p for p in self.app.settings.function_presets if p.get('name') == ai_job), None)
                  
                  if preset:
+                     params['preset_name_used'] = preset.get('name', ai_job)
                      params.update({
                          "temp": float(preset.get('temperature', 0.7)),
                          "val_text": preset.get('val_text', ''),
@@ -664,9 +876,10 @@ class AIFunctionsHandler:
                          "num_prev_images": int(preset.get("num_prev_images", 0)),
                          "num_after_images": int(preset.get("num_after_images", 0)),
                          "thinking_budget": preset.get('thinking_budget', '128'),
+                         "crop_to_content": preset.get('crop_to_content', False),
                      })
                      # Override use_images specifically for HTR and Auto_Rotate if not set in preset
-                     if ai_job in ["HTR", "Auto_Rotate"] and not preset.get('use_images'):
+                     if ai_job in ["HTR", "HTR_Correct", "Auto_Rotate"] and not preset.get('use_images'):
                           params['use_images'] = True # These jobs typically NEED images
 
                  else:
@@ -678,6 +891,10 @@ class AIFunctionsHandler:
                      elif ai_job == "Correct_Text":
                           params['system_prompt'] = "Correct spelling and grammar errors in the following text from a historical document."
                           params['user_prompt'] = "Text:\n{text_to_process}"
+                     elif ai_job == "HTR_Correct":
+                          params['system_prompt'] = "Transcribe the text from the image exactly as written, then correct your transcription against the image. Respond only with a JSON object with the keys 'transcription' and 'corrected_text'."
+                          params['user_prompt'] = "Transcribe and correct this page. Respond only with the JSON object."
+                          params['use_images'] = True
                      elif ai_job == "Auto_Rotate":
                           params['system_prompt'] = "Analyze the image and identify the bounding box coordinates for the first line of text you encounter (including titles, headers, etc.). Output ONLY a JSON list containing a single JSON object with keys 'box_2d' (a list of four numbers: [y_min, x_min, y_max, x_max] normalized 0-1000) and 'label' (e.g., 'first_line'). Example: [{'box_2d': [100, 50, 150, 800], 'label': 'first_line'}]"
                           params['user_prompt'] = "Provide the bounding box for the first line of text in the image in the specified JSON format."
@@ -700,6 +917,54 @@ class AIFunctionsHandler:
              # REMOVED traceback.print_exc()
              return params # Return defaults on error
 
+    def job_text_columns(self, ai_job, selected_source=None, selected_metadata_preset=None):
+        """
+        Text columns a job reads or writes: its source column(s) and the columns
+        it fills. None for jobs that may fall back to any text column
+        (Chunk_Text, Get_Names_and_Places) or are not listed here.
+        """
+        sources = {
+            "HTR": [],
+            "HTR_Correct": [],
+            "Auto_Rotate": [],
+            "Identify_Errors": ['Original_Text'],
+            "Correct_Text": [selected_source or 'Original_Text'],
+            "Translation": [selected_source or 'Corrected_Text'],
+            "Metadata": [selected_source or 'Corrected_Text'],
+            # Same source priority as the Format_Text submission logic
+            "Format_Text": [selected_source, 'Corrected_Text', 'Original_Text'],
+        }
+        if ai_job not in sources:
+            return None
+        columns = [col for col in sources[ai_job] if col] + TRACKED_JOB_TARGETS.get(ai_job, [])
+        if ai_job == "Metadata":
+            # Metadata headers may name text columns such as Summary or Notes
+            headers = self.setup_job_parameters(ai_job, selected_metadata_preset=selected_metadata_preset).get('headers', [])
+            columns += [header.replace(' ', '_') for header in headers] + list(headers)
+        return list(dict.fromkeys(columns))
+
+    def get_provenance_source_hash(self, ai_job, row_data, selected_source=None):
+        """
+        Hash the input a tracked job derives its output from: the page image for
+        HTR jobs, otherwise the source text column the job would read.
+        """
+        if ai_job in ["HTR", "HTR_Correct"]:
+            image_path = row_data.get('Image_Path', "")
+            if isinstance(image_path, list):
+                return hash_text(";".join(hash_file(self.app.get_full_path(p)) for p in image_path))
+            return hash_file(self.app.get_full_path(image_path)) if image_path else ""
+
+        if ai_job == "Format_Text":
+            # Same source priority as the Format_Text submission logic
+            for col in [selected_source, 'Corrected_Text', 'Original_Text']:
+                if col and pd.notna(row_data.get(col)) and str(row_data.get(col, "")).strip():
+                    return hash_text(row_data.get(col))
+            return ""
+
+        source_col = selected_source or ('Original_Text' if ai_job == "Correct_Text" else 'Corrected_Text')
+        source_text = row_data.get(source_col, "")
+        return hash_text(source_text if pd.notna(source_text) else "")
+
     def get_images_for_job(self, ai_job, index, row_data, job_params):
         """
         Get and prepare images for AI job processing. Returns a list suitable for APIHandler.
@@ -719,7 +984,7 @@ class AIFunctionsHandler:
                     prev_img_rel = self.app.main_df.loc[prev_index].get('Image_Path', "")
                     if prev_img_rel:
                         prev_img_abs = self.app.get_full_path(prev_img_rel)
-                        if prev_img_abs and os.path.exists(prev_img_abs):
+                        if prev_img_abs and self.app.image_files.exists(prev_img_abs):
                             prev_indices.append((prev_img_abs, offset))
             # Label logic for previous images
             if len(prev_indices) == 1:
@@ -735,7 +1000,7 @@ class AIFunctionsHandler:
                     self.app.error_logging(f"Empty primary image path at index {index}", level="WARNING")
                 else:
                     current_image_abs = self.app.get_full_path(current_image_rel)
-                    if not current_image_abs or not os.path.exists(current_image_abs):
+                    if not current_image_abs or not self.app.image_files.exists(current_image_abs):
                         self.app.error_logging(f"Primary image file not found at index {index}: {current_image_abs}", level="WARNING")
                     else:
                         images_to_prepare.append((current_image_abs, "Current Page:"))
@@ -749,7 +1014,7 @@ class AIFunctionsHandler:
                     next_img_rel = self.app.main_df.loc[next_index].get('Image_Path', "")
                     if next_img_rel:
                         next_img_abs = self.app.get_full_path(next_img_rel)
-                        if next_img_abs and os.path.exists(next_img_abs):
+                        if next_img_abs and self.app.image_files.exists(next_img_abs):
                             next_indices.append((next_img_abs, offset))
             # Label logic for next images
             if len(next_indices) == 1:
@@ -758,6 +1023,10 @@ class AIFunctionsHandler:
                 for img_abs, offset in next_indices:
                     images_to_prepare.append((img_abs, f"Next Page +{offset}:"))
 
+            # Send only the cached text-region crop when the preset asks for it
+            if job_params.get("crop_to_content", False):
+                images_to_prepare = [(self.app.page_analyzer.get_content_crop(img_abs), label) for img_abs, label in images_to_prepare]
+
             # Debug print for image context
             print(f"[DEBUG] Images for index {index}, job {ai_job}: {[{'path': p, 'label': l} for p, l in images_to_prepare]}")
 
@@ -784,9 +1053,10 @@ class AIFunctionsHandler:
 
     def collate_names_and_places(self, unique_names, unique_places):
         """
-        Gather unique names & places (now passed as arguments), call the LLM for normalization, and
-        store the raw 'Response:' text in self.collated_names_raw and
-        self.collated_places_raw. Does NOT do final replacements.
+        Gather unique names & places (now passed as arguments), group likely spelling
+        variants locally, and send only the ambiguous groups to the LLM in parallel
+        shards. The merged results are stored as raw 'Response:' text in
+        self.collated_names_raw and self.collated_places_raw. Does NOT do final replacements.
         """
         try:
             # Initialize default values (ensure they exist on self)
@@ -804,118 +1074,121 @@ class AIFunctionsHandler:
                 self.app.progress_bar.close_progress_window()
                 return
 
-            # --- Prepare API Call ---
-            tasks = []
-            if unique_names:
-                tasks.append(("names", unique_names, "Collate_Names"))
-            if unique_places:
-                tasks.append(("places", unique_places, "Collate_Places"))
+            # --- Local blocking: variants that can't be the same entity never reach the model ---
+            merged = {"names": {}, "places": {}}
+            sent_to_llm = {"names": [], "places": []}
+            tasks = [] # (label, shard_items, preset_name)
+            for label, items, preset_name in [("names", unique_names, "Collate_Names"), ("places", unique_places, "Collate_Places")]:
+                if not items:
+                    continue
+                resolved, ambiguous = split_blocks(block_variants(items))
+                merged[label].update(resolved)
+                for shard in shard_blocks(ambiguous):
+                    tasks.append((label, shard, preset_name))
+                    sent_to_llm[label].extend(shard)
+                self.app.error_logging(f"Collation {label}: {len(resolved)} group(s) resolved locally, "
+                                       f"{len(ambiguous)} ambiguous group(s) in {sum(1 for t in tasks if t[0] == label)} request(s)", level="INFO")
 
             self.app.progress_bar.update_progress(35, 100)
 
             # --- Execute API Calls ---
-            results = {}
-            with ThreadPoolExecutor(max_workers=2) as executor: # Can run names/places in parallel
-                futures_to_label = {}
-                for label, items, preset_name in tasks:
-                    self.app.error_logging(f"Preparing {label} task with {len(items)} items", level="DEBUG")
-                    text_for_llm = "\n".join(items)
-                    # Get the correct preset for this label
-                    preset = next((p for p in self.app.settings.analysis_presets if p.get('name') == preset_name), None)
-                    if not preset:
-                        self.app.error_logging(f"{preset_name} analysis preset not found in settings. Using safe defaults.", level="ERROR")
-                        # Safe fallback defaults
-                        preset = {
-                            'model': "gemini-2.5-pro-preview-03-25",
-                            'temperature': 0.2,
-                            'general_instructions': f"Collate {label}.",
-                            'specific_instructions': f'Collate the following list of {label}.\\n\\nList:\\n{{text_for_llm}}',
-                            'val_text': '',
-                            'use_images': False,
-                            'current_image': "No",
-                            'num_prev_images': "0",
-                            'num_after_images': "0",
-                            'thinking_budget': "128"
-                        }
-                    system_message = preset.get('general_instructions', '')
-                    temp = float(preset.get('temperature', 0.2))
-                    engine = preset.get('model', self.app.settings.model_list[0] if self.app.settings.model_list else 'default')
-                    val_text = preset.get('val_text', '')
-                    use_images = preset.get('use_images', False)
-                    current_image = preset.get('current_image', "No")
-                    num_prev_images = int(preset.get('num_prev_images', 0))
-                    num_after_images = int(preset.get('num_after_images', 0))
-                    thinking_budget = preset.get('thinking_budget', '128')
-                    user_prompt_template = preset.get('specific_instructions', '')
-                    user_prompt_text = user_prompt_template.replace("{text_for_llm}", text_for_llm)
-
-                    future = executor.submit(
-                        asyncio.run,
-                        self.process_api_request(
-                            system_prompt=system_message,
-                            user_prompt=user_prompt_text,
-                            temp=temp,
-                            image_data=[],
-                            text_to_process="", # Input is in the user prompt
-                            val_text=val_text,
-                            engine=engine,
-                            index=0, # Index not relevant for this task
-                            is_base64=False, # No images
-                            ai_job="Collation", # Custom job type for logging/debugging
-                            job_params={
-                                'use_images': use_images,
-                                'current_image': current_image,
-                                'num_prev_images': num_prev_images,
-                                'num_after_images': num_after_images,
-                                'thinking_budget': thinking_budget
+            failed_shards = 0
+            if tasks:
+                batch_size = max(1, int(getattr(self.app.settings, 'batch_size', 50) or 1))
+                with ThreadPoolExecutor(max_workers=min(batch_size, len(tasks))) as executor:
+                    futures_to_label = {}
+                    for label, items, preset_name in tasks:
+                        self.app.error_logging(f"Preparing {label} shard with {len(items)} items", level="DEBUG")
+                        text_for_llm = "\n".join(items)
+                        # Get the correct preset for this label
+                        preset = next((p for p in self.app.settings.analysis_presets if p.get('name') == preset_name), None)
+                        if not preset:
+                            self.app.error_logging(f"{preset_name} analysis preset not found in settings. Using safe defaults.", level="ERROR")
+                            # Safe fallback defaults
+                            preset = {
+                                'model': "gemini-2.5-pro-preview-03-25",
+                                'temperature': 0.2,
+                                'general_instructions': f"Collate {label}.",
+                                'specific_instructions': f'Collate the following list of {label}.\\n\\nList:\\n{{text_for_llm}}',
+                                'val_text': '',
+                                'use_images': False,
+                                'current_image': "No",
+                                'num_prev_images': "0",
+                                'num_after_images': "0",
+                                'thinking_budget': "128"
                             }
+                        system_message = preset.get('general_instructions', '')
+                        temp = float(preset.get('temperature', 0.2))
+                        engine = preset.get('model', self.app.settings.model_list[0] if self.app.settings.model_list else 'default')
+                        val_text = preset.get('val_text', '')
+                        use_images = preset.get('use_images', False)
+                        current_image = preset.get('current_image', "No")
+                        num_prev_images = int(preset.get('num_prev_images', 0))
+                        num_after_images = int(preset.get('num_after_images', 0))
+                        thinking_budget = preset.get('thinking_budget', '128')
+                        user_prompt_template = preset.get('specific_instructions', '')
+                        user_prompt_text = user_prompt_template.replace("{text_for_llm}", text_for_llm)
+
+                        future = executor.submit(
+                            asyncio.run,
+                            self.process_api_request(
+                                system_prompt=system_message,
+                                user_prompt=user_prompt_text,
+                                temp=temp,
+                                image_data=[],
+                                text_to_process="", # Input is in the user prompt
+                                val_text=val_text,
+                                engine=engine,
+                                index=0, # Index not relevant for this task
+                                is_base64=False, # No images
+                                ai_job="Collation", # Custom job type for logging/debugging
+                                job_params={
+                                    'use_images': use_images,
+                                    'current_image': current_image,
+                                    'num_prev_images': num_prev_images,
+                                    'num_after_images': num_after_images,
+                                    'thinking_budget': thinking_budget
+                                }
+                            )
                         )
-                    )
-                    futures_to_label[future] = label
-
-                # Process results as they complete
-                progress_base = 35
-                progress_per_task = (95 - progress_base) / len(tasks) if tasks else 0
-                for i, future in enumerate(as_completed(futures_to_label)):
-                    label = futures_to_label[future]
-                    try:
-                        response, _ = future.result(timeout=180) # Extended timeout
-                        results[label] = response
-                        self.app.error_logging(f"Received {label} collation response (length: {len(response)})", level="DEBUG")
-                        # Log a snippet
-                        self.app.error_logging(f"Response snippet ({label}): {response[:200]}...", level="DEBUG")
-                    except Exception as e:
-                        self.app.error_logging(f"Error getting result for {label} collation: {str(e)}", level="ERROR")
-                        results[label] = f"Error: Collation failed - {e}" # Store error message
-
-                    # Update progress
-                    current_progress = progress_base + (i + 1) * progress_per_task
-                    self.app.progress_bar.update_progress(int(current_progress), 100)
-
-
-            # Store raw results (including potential errors)
-            self.collated_names_raw = results.get("names", "")
-            self.collated_places_raw = results.get("places", "")
+                        futures_to_label[future] = label
+
+                    # Merge shard results as they complete
+                    progress_base = 35
+                    progress_per_task = (95 - progress_base) / len(tasks)
+                    for i, future in enumerate(as_completed(futures_to_label)):
+                        label = futures_to_label[future]
+                        try:
+                            response, _ = future.result(timeout=180) # Extended timeout
+                            if response == "Error":
+                                raise ValueError("API call failed")
+                            self.app.error_logging(f"Received {label} collation shard (length: {len(response)})", level="DEBUG")
+                            for correct, variants in self.app.names_places_handler.parse_collation_response(response).items():
+                                existing = merged[label].get(correct, [])
+                                merged[label][correct] = sorted(set(existing + variants), key=str.lower)
+                        except Exception as e:
+                            failed_shards += 1
+                            self.app.error_logging(f"Error getting result for {label} collation shard: {str(e)}", level="ERROR")
+
+                        # Update progress
+                        current_progress = progress_base + (i + 1) * progress_per_task
+                        self.app.progress_bar.update_progress(int(current_progress), 100)
+
+            # Store merged results in the raw format the collation window reads
+            self.collated_names_raw = format_collation_lines(merged["names"])
+            self.collated_places_raw = format_collation_lines(merged["places"])
+
+            if failed_shards:
+                messagebox.showwarning("Collation Incomplete",
+                    f"{failed_shards} of {len(tasks)} collation request(s) failed. Some spelling variants were not grouped.")
 
             # --- Verification ---
-            missing_names = []
-            missing_places = []
-            if unique_names:
-                 names_dict = self.app.names_places_handler.parse_collation_response(self.collated_names_raw)
-                 output_name_variants = set(var for sublist in names_dict.values() for var in sublist)
-                 output_name_variants.update(names_dict.keys())
-                 missing_names = [name for name in unique_names if name not in output_name_variants]
-                 if missing_names:
-                     self.app.error_logging(f"Warning: {len(missing_names)} names might be missing from collation output (e.g., {missing_names[:5]})", level="WARNING")
-
-            if unique_places:
-                 places_dict = self.app.names_places_handler.parse_collation_response(self.collated_places_raw)
-                 output_place_variants = set(var for sublist in places_dict.values() for var in sublist)
-                 output_place_variants.update(places_dict.keys())
-                 missing_places = [place for place in unique_places if place not in output_place_variants]
-                 if missing_places:
-                     self.app.error_logging(f"Warning: {len(missing_places)} places might be missing from collation output (e.g., {missing_places[:5]})", level="WARNING")
-
+            for label in ["names", "places"]:
+                output_variants = set(var for sublist in merged[label].values() for var in sublist)
+                output_variants.update(merged[label].keys())
+                missing = [item for item in sent_to_llm[label] if item not in output_variants]
+                if missing:
+                    self.app.error_logging(f"Warning: {len(missing)} {label} sent for collation were not grouped by the model (e.g., {missing[:5]})", level="WARNING")
 
         except Exception as e:
             self.app.error_logging(f"Critical error in collate_names_and_places: {str(e)}", level="ERROR")
@@ -1200,6 +1473,7 @@ class AIFunctionsHandler:
                                 )
                                 # Update the Translation field directly in the DataFrame
                                 self.app.main_df.loc[index, 'Translation'] = separated_text
+                                self.app.autosave.mark_dirty(index, 'Translation')
                                 self.app.error_logging(f"Updated Translation for index {index} with separators.", level="DEBUG")
 
                                 # Update display ONLY if this is the current page and Translation was showing
@@ -1352,6 +1626,7 @@ class AIFunctionsHandler:
                      # Ensure type compatibility (convert value if needed, though should be string)
                      try:
                           self.app.main_df.at[index, column_name] = str(clean_value)
+                          self.app.autosave.mark_dirty(index, column_name)
                           fields_updated += 1
                           self.app.error_logging(f"Updated column '{column_name}' with value: '{clean_value}' for index {index}", level="DEBUG")
                      except Exception as e_update:
@@ -1439,6 +1714,75 @@ class AIFunctionsHandler:
             # Clean up temp vars if ai_function wasn't called or errored immediately
             if hasattr(self, 'temp_htr_preset'): delattr(self, 'temp_htr_preset')
 
+    def process_fused_htr_fallback(self, indices, batch_size):
+        """
+        Re-runs pages whose fused HTR_Correct response failed validation as two
+        separate requests: HTR into Original_Text, then Correct_Text on that transcription.
+        Returns the number of pages that still failed.
+        """
+        error_count = 0
+        self.app.error_logging(f"Running separate HTR/Correct_Text fallback for {len(indices)} page(s)", level="INFO")
+
+        for ai_job in ["HTR", "Correct_Text"]:
+            job_params = self.setup_job_parameters(ai_job)
+            futures_to_index = {}
+            failed_indices = []
+            source_hashes = {} # index -> hash of the input the output derives from, for provenance
+
+            with ThreadPoolExecutor(max_workers=batch_size) as executor:
+                for index in indices:
+                    row_data = self.app.main_df.loc[index]
+                    text_to_process = ""
+                    if ai_job == "Correct_Text":
+                        text_to_process = row_data.get('Original_Text', "")
+                        text_to_process = str(text_to_process) if pd.notna(text_to_process) else ""
+                        if not text_to_process.strip():
+                            failed_indices.append(index)
+                            continue
+
+                    images_data = self.get_images_for_job(ai_job, index, row_data, job_params)
+                    source_hashes[index] = self.get_provenance_source_hash(ai_job, row_data, "Original_Text" if ai_job == "Correct_Text" else None)
+                    future = executor.submit(
+                        asyncio.run,
+                        self.process_api_request(
+                            system_prompt=job_params['system_prompt'],
+                            user_prompt=job_params['user_prompt'],
+                            temp=job_params['temp'],
+                            image_data=images_data,
+                            text_to_process=text_to_process,
+                            val_text=job_params['val_text'],
+                            engine=job_params['engine'],
+                            index=index,
+                            is_base64=not "gemini" in job_params.get('engine','').lower(),
+                            ai_job=ai_job,
+                            job_params=job_params
+                        )
+                    )
+                    futures_to_index[future] = index
+
+                for future in as_completed(futures_to_index):
+                    index = futures_to_index[future]
+                    try:
+                        response, _ = future.result()
+                        if response == "Error":
+                            failed_indices.append(index)
+                            self.app.error_logging(f"Fallback {ai_job} failed for index {index}", level="ERROR")
+                        else:
+                            self.app.data_operations.update_df_with_ai_job_response(ai_job, index, response)
+                            record_provenance(self.app.main_df, index, ai_job, source_hashes.get(index, ""), job_params)
+                            self.app.autosave.mark_dirty(index, PROVENANCE_COLUMN)
+                    except Exception as e:
+                        failed_indices.append(index)
+                        self.app.error_logging(f"Error processing fallback {ai_job} result for index {index}: {str(e)}", level="ERROR")
+
+            # Pages that could not be transcribed cannot be corrected either
+            error_count += len(failed_indices)
+            indices = [i for i in indices if i not in failed_indices]
+            if not indices:
+                break
+
+        return error_count
+
     def update_df_with_chunk_result(self, index, separated_text, source_text_type):
         """
         Update the DataFrame with the chunked text result (text with separators).
@@ -1458,7 +1802,8 @@ class AIFunctionsHandler:
             # Always store the response in Separated_Text
             self.app.main_df.loc[index, 'Separated_Text'] = separated_text
             # Set the toggle to Separated_Text so it becomes the default view
-            self.app.main_df.loc[index, 'Text_Toggle'] = "Separated_Text"
+            set_cell(self.app.main_df, index, 'Text_Toggle', "Separated_Text")
+            self.app.autosave.mark_dirty(index, ['Separated_Text', 'Text_Toggle'])
             
             # --- ADDED --- Call UI update handler
             self.app.update_display_after_ai(index, 'Separated_Text')
@@ -1478,7 +1823,14 @@ class AIFunctionsHandler:
 
     def process_relevance_search(self, criteria_text, selected_source, mode):
         """Process relevance search based on user criteria"""
+        history_operation = None
         try:
+            # The criteria are matched against page text a lazily opened project may not have read yet
+            self.app.project_io.ensure_text_loaded(["Original_Text", "Corrected_Text", "Formatted_Text", "Translation", "Separated_Text"],
+                                                   indices=[self.app.page_counter] if mode == "Current Page" else None)
+            history_operation = self.app.history.begin(f"Relevance ({mode})",
+                                                       indices=[self.app.page_counter] if mode == "Current Page" else None)
+
             # Toggle buttons during processing
             self.app.toggle_button_state()
 
@@ -1561,7 +1913,8 @@ class AIFunctionsHandler:
                             relevance_match = re.search(r'Relevance:\s*(Relevant|Partially Relevant|Irrelevant|Uncertain)', response, re.IGNORECASE)
                             if relevance_match:
                                 relevance_value = relevance_match.group(1)
-                                self.app.main_df.loc[index, 'Relevance'] = relevance_value
+                                set_cell(self.app.main_df, index, 'Relevance', relevance_value)
+                                self.app.autosave.mark_dirty(index, 'Relevance')
                                 self.app.error_logging(f"Set relevance for index {index}: {relevance_value}", level="DEBUG")
 
                                 # Show relevance section if we have results
@@ -1599,13 +1952,17 @@ class AIFunctionsHandler:
             self.app.error_logging(f"Critical error in process_relevance_search: {str(e)}", level="ERROR")
             messagebox.showerror("Error", f"An error occurred during relevance analysis: {str(e)}")
         finally:
+            self.app.history.end(history_operation)
             # Always restore button state
             if hasattr(self.app, 'button1') and self.app.button1['state'] == "disabled":
                 self.app.toggle_button_state()
 
     def process_identify_errors_structured(self, all_or_one_flag="All Pages"):
         """
-        New structured approach for Identify_Errors that sends all images and expects JSON response
+        Structured approach for Identify_Errors. Pages are split into overlapping
+        windows that fit a token budget; each window's texts and images are sent as
+        one request, windows run concurrently, and the per-window JSON results are
+        merged with duplicates from overlapping pages removed.
         """
         try:
             # Toggle buttons during processing
@@ -1620,7 +1977,7 @@ class AIFunctionsHandler:
             # Setup progress window
             progress_title = f"Identifying Errors ({'Current Page' if all_or_one_flag == 'Current Page' else 'All Pages'})..."
             progress_window, progress_bar, progress_label = self.app.progress_bar.create_progress_window(progress_title)
-            self.app.progress_bar.update_progress(10, 100)
+            self.app.progress_bar.update_progress(0, 100)
 
             # Determine which rows to process - only those with Original_Text
             if all_or_one_flag == "Current Page":
@@ -1640,144 +1997,145 @@ class AIFunctionsHandler:
                     self.app.main_df['Original_Text'].notna() & 
                     (self.app.main_df['Original_Text'] != '')
                 ]
+            batch_df = batch_df[batch_df['Original_Text'].str.strip() != '']
 
-            total_rows = len(batch_df)
-            if total_rows == 0:
+            if batch_df.empty:
                 messagebox.showinfo("No Data", "No pages have Original_Text to analyze for errors.")
                 return
 
-            self.app.progress_bar.update_progress(20, 100)
+            engine = preset.get('model', self.app.settings.model_list[0] if self.app.settings.model_list else 'gemini-2.0-flash')
+            is_base64_needed = "gemini" not in engine.lower()
+            use_images = preset.get('use_images', True)
 
-            # Collect ALL images in the project (not just the ones being processed)
-            all_images_data = []
-            for index, row in self.app.main_df.iterrows():
-                image_path_rel = row.get('Image_Path', "")
-                if image_path_rel:
-                    image_path_abs = self.app.get_full_path(image_path_rel)
-                    if image_path_abs and os.path.exists(image_path_abs):
-                        all_images_data.append((image_path_abs, f"Page {index + 1}:"))
-
-            self.app.error_logging(f"Collected {len(all_images_data)} images for structured error identification", level="DEBUG")
-            self.app.progress_bar.update_progress(40, 100)
-
-            # Prepare the images for the API call
-            engine_name = preset.get('model', self.app.settings.model_list[0] if self.app.settings.model_list else 'gemini-2.0-flash').lower()
-            is_base64_needed = "gemini" not in engine_name
-
-            prepared_images = self.app.api_handler.prepare_image_data(
-                all_images_data,
-                engine_name,
-                is_base64_needed
-            )
-
-            self.app.progress_bar.update_progress(50, 100)
-
-            # Create JSON structure for the text data
-            json_data = []
+            # Estimate what each page costs in a request so windows stay within budget
+            page_images = {}
+            page_tokens = {}
             for index, row_data in batch_df.iterrows():
-                original_text = row_data.get('Original_Text', "")
-                if original_text.strip():  # Only include non-empty text
-                    json_data.append({
-                        "Index": int(index),
-                        "Text": original_text.strip()
-                    })
-
-            if not json_data:
-                messagebox.showinfo("No Data", "No valid Original_Text found to process.")
-                return
-
-            # Convert to JSON string
-            import json
-            json_text = json.dumps(json_data, indent=2, ensure_ascii=False)
-
-            # Replace specific_instructions with our JSON structure
-            user_prompt = f"A list of JSON objects where each object contains Index (the row number) and Text (containing the text from Original_Text). Analyze each text for errors and return a list of JSON objects with Index, Error text, and Correction fields.\n\n{json_text}"
+                tokens = estimate_text_tokens(row_data.get('Original_Text', "")) + 20 # JSON wrapping
+                image_path_rel = row_data.get('Image_Path', "")
+                if use_images and isinstance(image_path_rel, str) and image_path_rel:
+                    image_path_abs = self.app.get_full_path(image_path_rel)
+                    if image_path_abs and self.app.image_files.exists(image_path_abs):
+                        page_images[index] = image_path_abs
+                        tokens += estimate_image_tokens(engine, image_path_abs)
+                page_tokens[index] = tokens
 
-            self.app.progress_bar.update_progress(60, 100)
+            windows = self.build_error_windows(list(batch_df.index), page_tokens)
+            self.app.error_logging(f"Structured error identification: {len(batch_df)} pages in {len(windows)} window(s)", level="INFO")
 
-            # Make the API call with structured output
             job_params = {
                 'thinking_budget': preset.get('thinking_budget', '128'),
                 'structured_output': True  # Enable structured output
             }
+            batch_size = max(1, int(getattr(self.app.settings, 'batch_size', 50) or 1))
+
+            # Map: each window is one request; results are keyed by window number
+            window_results = {}
+            failed_windows = 0
+            completed = 0
+            with ThreadPoolExecutor(max_workers=min(batch_size, len(windows))) as executor:
+                futures = {}
+                for window_number, window in enumerate(windows):
+                    json_text = json.dumps([{"Index": int(index), "Text": batch_df.at[index, 'Original_Text'].strip()} for index in window],
+                                           indent=2, ensure_ascii=False)
+                    user_prompt = f"A list of JSON objects where each object contains Index (the row number) and Text (containing the text from Original_Text). Analyze each text for errors and return a list of JSON objects with Index, Error text, and Correction fields.\n\n{json_text}"
+                    images = [(page_images[index], f"Page {index + 1}:") for index in window if index in page_images]
+                    prepared_images = self.app.api_handler.prepare_image_data(images, engine.lower(), is_base64_needed) if images else None
+                    future = executor.submit(
+                        asyncio.run,
+                        self.process_api_request(
+                            system_prompt=preset.get('general_instructions', ''),
+                            user_prompt=user_prompt,
+                            temp=float(preset.get('temperature', 0.2)),
+                            image_data=prepared_images,
+                            text_to_process="",  # Empty since our data is in user_prompt
+                            val_text="",  # Empty since we expect structured JSON
+                            engine=engine,
+                            index=window_number,
+                            is_base64=is_base64_needed,
+                            ai_job="Identify_Errors_Structured",
+                            job_params=job_params
+                        )
+                    )
+                    futures[future] = window_number
 
-            # Submit API request
-            response, _ = asyncio.run(self.process_api_request(
-                system_prompt=preset.get('general_instructions', ''),
-                user_prompt=user_prompt,
-                temp=float(preset.get('temperature', 0.2)),
-                image_data=prepared_images,
-                text_to_process="",  # Empty since our data is in user_prompt
-                val_text="",  # Empty since we expect structured JSON
-                engine=preset.get('model', self.app.settings.model_list[0] if self.app.settings.model_list else 'gemini-2.0-flash'),
-                index=0,  # Not relevant for this call
-                is_base64=is_base64_needed,
-                ai_job="Identify_Errors_Structured",
-                job_params=job_params
-            ))
-
-            self.app.progress_bar.update_progress(80, 100)
-
-            if response == "Error":
+                for future in as_completed(futures):
+                    window_number = futures[future]
+                    completed += 1
+                    self.app.progress_bar.update_progress(int(completed / len(windows) * 90), 100)
+                    try:
+                        response, _ = future.result()
+                        if response == "Error":
+                            raise ValueError("API call failed")
+                        window_results[window_number] = self.parse_identify_errors_response(response)
+                    except Exception as e:
+                        failed_windows += 1
+                        self.app.error_logging(f"Error identification window {window_number + 1}/{len(windows)} failed: {str(e)}", level="ERROR")
+
+            if not window_results:
                 messagebox.showerror("Error", "API call failed for error identification.")
                 return
 
-            # Parse the structured JSON response
-            try:
-                # Try to extract JSON from the response
-                response_data = None
-                
-                # First try parsing the entire response as JSON
-                try:
-                    response_data = json.loads(response)
-                except json.JSONDecodeError:
-                    # Try to find JSON within the response text
-                    json_match = re.search(r'\[.*\]', response, re.DOTALL)
-                    if json_match:
-                        response_data = json.loads(json_match.group(0))
-                    else:
-                        raise ValueError("No valid JSON found in response")
+            # Reduce: keep each window's results for its own pages only, drop repeats from overlaps
+            errors_by_index = {}
+            corrections_by_index = {}
+            for window_number in sorted(window_results):
+                window_pages = set(windows[window_number])
+                for result in window_results[window_number]:
+                    try:
+                        index = int(result['Index'])
+                    except (KeyError, TypeError, ValueError):
+                        continue
+                    error_text = str(result.get('Error text', '') or '').strip()
+                    if index not in window_pages or not error_text:
+                        continue
+                    page_errors = errors_by_index.setdefault(index, [])
+                    if error_text.lower() not in [existing.lower() for existing in page_errors]:
+                        page_errors.append(error_text)
+                        # One correction per kept error (blank if none given) so the two cells stay aligned
+                        corrections_by_index.setdefault(index, []).append(str(result.get('Correction', '') or '').strip())
+
+            for index, page_errors in errors_by_index.items():
+                if index in self.app.main_df.index:
+                    # Semicolon-separated, as the error highlighter expects
+                    self.app.main_df.loc[index, 'Errors'] = "; ".join(page_errors)
+                    self.app.main_df.loc[index, 'Errors_Source'] = 'Original_Text'
+                    if 'Correction' in self.app.main_df.columns:
+                        corrections = corrections_by_index[index]
+                        self.app.main_df.loc[index, 'Correction'] = "; ".join(corrections) if any(corrections) else ""
+                    self.app.autosave.mark_dirty(index, ['Errors', 'Errors_Source', 'Correction'])
+                    self.app.error_logging(f"Updated errors for index {index}: {page_errors[0][:50]}...", level="DEBUG")
+
+            # Pages checked by a successful window that now report no errors lose any earlier results
+            checked_pages = set()
+            for window_number in window_results:
+                checked_pages.update(windows[window_number])
+            for index in checked_pages - set(errors_by_index):
+                if index not in self.app.main_df.index:
+                    continue
+                stale_columns = [column for column in ['Errors', 'Errors_Source', 'Correction']
+                                 if column in self.app.main_df.columns and pd.notna(self.app.main_df.at[index, column])
+                                 and str(self.app.main_df.at[index, column]).strip()]
+                if stale_columns:
+                    for column in stale_columns:
+                        self.app.main_df.loc[index, column] = ""
+                    self.app.autosave.mark_dirty(index, stale_columns)
+                    self.app.error_logging(f"Cleared earlier errors for index {index}: none found this time", level="DEBUG")
+
+            # Refresh display if we're viewing one of the processed pages
+            if self.app.page_counter in batch_df.index:
+                self.app.load_text()
 
-                if not isinstance(response_data, list):
-                    raise ValueError("Response is not a list of objects")
+            self.app.progress_bar.update_progress(100, 100)
 
-                # Process each error result
-                processed_count = 0
-                for result in response_data:
-                    if isinstance(result, dict) and 'Index' in result:
-                        index = int(result['Index'])
-                        error_text = result.get('Error text', '')
-                        correction = result.get('Correction', '')
-                        
-                        # Update the DataFrame
-                        if index in self.app.main_df.index:
-                            # Store both error and correction (you might want to add a Correction column to your DF)
-                            if error_text.strip():
-                                self.app.main_df.loc[index, 'Errors'] = error_text.strip()
-                                self.app.main_df.loc[index, 'Errors_Source'] = 'Original_Text'
-                                
-                                # If your DF has a Correction column, store it there
-                                if 'Correction' in self.app.main_df.columns and correction.strip():
-                                    self.app.main_df.loc[index, 'Correction'] = correction.strip()
-                                
-                                processed_count += 1
-                                self.app.error_logging(f"Updated errors for index {index}: {error_text[:50]}...", level="DEBUG")
-
-                self.app.progress_bar.update_progress(90, 100)
-
-                # Refresh display if we're viewing one of the processed pages
-                if self.app.page_counter in batch_df.index:
-                    self.app.load_text()
-
-                self.app.progress_bar.update_progress(100, 100)
-
-                # Show completion message
+            # Show completion message
+            if failed_windows:
+                messagebox.showwarning("Error Identification Incomplete",
+                    f"Identified errors in {len(errors_by_index)} pages. {failed_windows} of {len(windows)} request(s) failed; "
+                    "pages in those requests were not checked.")
+            else:
                 messagebox.showinfo("Error Identification Complete", 
-                    f"Successfully identified errors in {processed_count} pages using structured analysis.")
-
-            except (json.JSONDecodeError, ValueError, KeyError) as e:
-                self.app.error_logging(f"Failed to parse structured response: {str(e)}\nResponse: {response}", level="ERROR")
-                messagebox.showerror("Error", f"Failed to parse AI response as structured JSON: {str(e)}")
+                    f"Successfully identified errors in {len(errors_by_index)} pages using structured analysis.")
 
         except Exception as e:
             self.app.error_logging(f"Critical error in process_identify_errors_structured: {str(e)}", level="ERROR")
@@ -1791,4 +2149,50 @@ class AIFunctionsHandler:
                 pass
             
             if hasattr(self.app, 'button1') and self.app.button1['state'] == "disabled":
-                self.app.toggle_button_state()
\ No newline at end of file
+                self.app.toggle_button_state()
+
+    def build_error_windows(self, indices, page_tokens,
+                            token_budget=ERROR_WINDOW_TOKEN_BUDGET,
+                            max_pages=ERROR_WINDOW_MAX_PAGES,
+                            overlap=ERROR_WINDOW_OVERLAP):
+        """
+        Split page indices into consecutive windows that fit token_budget, each
+        repeating the last `overlap` pages of the previous window so errors that
+        span a page break are seen with their context.
+
+        Returns:
+            list: lists of page indices, one per request.
+        """
+        windows = []
+        start = 0
+        while start < len(indices):
+            window = []
+            tokens = 0
+            position = start
+            while position < len(indices) and len(window) < max_pages:
+                cost = page_tokens.get(indices[position], 0)
+                if window and tokens + cost > token_budget:
+                    break
+                window.append(indices[position])
+                tokens += cost
+                position += 1
+            windows.append(window)
+            if position >= len(indices):
+                break
+            # Always advance by at least one page, even if the window is smaller than the overlap
+            start = max(start + 1, position - overlap)
+        return windows
+
+    def parse_identify_errors_response(self, response):
+        """Parse one structured Identify_Errors response into a list of result dicts."""
+        try:
+            response_data = json.loads(response)
+        except json.JSONDecodeError:
+            # Try to find JSON within the response text
+            json_match = re.search(r'\[.*\]', response, re.DOTALL)
+            if not json_match:
+                raise ValueError("No valid JSON found in response")
+            response_data = json.loads(json_match.group(0))
+        if not isinstance(response_data, list):
+            raise ValueError("Response is not a list of objects")
+        return [result for result in response_data if isinstance(result, dict)]
\ No newline at end of file
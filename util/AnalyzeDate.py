@@ -8,6 +8,28 @@ import re
 from typing import List, Tuple, Callable, Optional
 import asyncio
 import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Earlier rows copied alongside a row for its prompt (the CHECK retry reads up to ten)
+CONTEXT_WINDOW_ROWS = 10
+
+_MONTH = r'(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec)[a-z]*\.?'
+# A full date written out in the text (day, month and year), e.g. "3rd May 1850",
+# "May 3, 1850", "3/5/1850" or "1850-05-03"
+_EXPLICIT_DATE = (
+    rf'\b\d{{1,2}}(?:st|nd|rd|th)?\s+(?:of\s+)?{_MONTH},?\s+\d{{4}}\b'
+    rf'|\b{_MONTH}\s+\d{{1,2}}(?:st|nd|rd|th)?,?\s+\d{{4}}\b'
+    r'|\b\d{1,2}[/.-]\d{1,2}[/.-]\d{4}\b'
+    r'|\b\d{4}-\d{2}-\d{2}\b')
+EXPLICIT_DATE_PATTERN = re.compile(_EXPLICIT_DATE, re.IGNORECASE)
+# A dateline giving the place as well, at the start of a line: "Quebec, 3rd May 1850",
+# "Fort William this 3 May 1850" (the comma or "this" keeps "Received 3 May 1850" out)
+DATELINE_PLACE_PATTERN = re.compile(
+    rf"^\s*[A-Z][\w'.-]*(?:[ -](?:[A-Z][\w'.-]*|de|du|la|le|on|upon))*(?:\s*,\s*|\s+this\s+)(?:this\s+|the\s+)*(?:{_EXPLICIT_DATE})",
+    re.MULTILINE)
+# Required headers a dateline can supply
+PLACE_HEADERS = {"Place", "Creation_Place", "Place_of_Creation"}
 
 class DateAnalyzer:
     def __init__(self, api_handler, settings):
@@ -33,7 +55,8 @@ class DateAnalyzer:
         
     async def process_dataframe(self, subject_df):
         """
-        Process each row in the dataframe sequentially to extract dates
+        Extract dates for every row, running rows concurrently where they don't
+        depend on the row before them
         
         Args:
             subject_df: DataFrame with columns 'Page', 'Text', and 'Date'
@@ -91,64 +114,72 @@ class DateAnalyzer:
                     df[header] = ""
                     self.log(f"Added missing column for {header} to dataframe")
             
-            # Process each row sequentially
+            # Work out which rows need analysis and what each one waits for. A row
+            # reads its predecessor's fields as context, so it only starts straight
+            # away when its own text supplies every required header (or it follows
+            # a row that needs no analysis); the rest start as soon as their
+            # predecessor is filled.
             total_rows = len(df)
             processed_rows = 0
             
             # Track field updates for logging
             field_updates = {header: 0 for header in required_headers}
             
+            needs_analysis = []
             for index, row in df.iterrows():
-                try:
-                    self.log(f"Processing row {index}")
-                    current_text = row['Text'] if not pd.isna(row['Text']) else ""
-                    
-                    # Skip if the text is empty or if Date is already populated
-                    if not current_text:
-                        self.log(f"Skipping row {index}: empty text")
-                        
-                    elif df.at[index, 'Date'] and not pd.isna(df.at[index, 'Date']):
-                        self.log(f"Skipping row {index}: date already populated ({df.at[index, 'Date']})")
-                        
-                    else:
-                        # Extract date, place, and other fields for current row
-                        date_value, place_value, all_fields = await self._process_row(df, index)
-                        
-                        # Update the dataframe with all extracted fields
-                        for field, value in all_fields.items():
-                            if field in df.columns and value:
-                                df.at[index, field] = value
-                                field_updates[field] = field_updates.get(field, 0) + 1
-                                self.log(f"Updated {field}: {value} for row {index}")
+                current_text = row['Text'] if not pd.isna(row['Text']) else ""
+                if not current_text:
+                    self.log(f"Skipping row {index}: empty text")
+                elif df.at[index, 'Date'] and not pd.isna(df.at[index, 'Date']):
+                    self.log(f"Skipping row {index}: date already populated ({df.at[index, 'Date']})")
+                else:
+                    needs_analysis.append(index)
+                    continue
+                processed_rows += 1
+            if self.progress_callback and processed_rows:
+                self.progress_callback(processed_rows, total_rows)
+            
+            pending = set(needs_analysis)
+            ready = deque()
+            waiting = {}  # predecessor index -> the row waiting on it
+            for index in needs_analysis:
+                position = df.index.get_loc(index)
+                predecessor = df.index[position - 1] if position > 0 else None
+                if predecessor in pending and not self._is_self_contained(df.at[index, 'Text'], required_headers):
+                    waiting[predecessor] = index
+                else:
+                    ready.append(index)
+            self.log(f"{len(needs_analysis)} rows to analyze: {len(ready)} ready now, {len(waiting)} waiting on the previous row")
+            
+            if needs_analysis:
+                loop = asyncio.get_running_loop()
+                max_workers = max(1, min(int(getattr(self.settings, 'batch_size', 50) or 1), len(needs_analysis)))
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    running = {}
+                    while ready or running:
+                        while ready and len(running) < max_workers:
+                            index = ready.popleft()
+                            # Hand the worker its own copy of the rows it reads for context
+                            context_df = self._context_rows(df, index)
+                            future = loop.run_in_executor(executor, asyncio.run, self._process_row(context_df, index))
+                            running[future] = index
                         
-                        # Also update Date and Place fields for backward compatibility
-                        if date_value:
-                            self.log(f"Found date for row {index}: {date_value}")
-                            df.at[index, 'Date'] = date_value
-                            field_updates['Date'] = field_updates.get('Date', 0) + 1
+                        done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                        for future in done:
+                            index = running.pop(future)
+                            try:
+                                self._apply_row_result(df, index, future.result(), field_updates)
+                            except Exception as e:
+                                self.log(f"Error processing row {index}: {str(e)}")
+                                self.log(traceback.format_exc())
                             
-                        if place_value:
-                            self.log(f"Found place for row {index}: {place_value}")
-                            df.at[index, 'Creation_Place'] = place_value
-                            df.at[index, 'Place'] = place_value
-                            field_updates['Creation_Place'] = field_updates.get('Creation_Place', 0) + 1
-                            field_updates['Place'] = field_updates.get('Place', 0) + 1
-                    
-                    # Update progress after each row
-                    processed_rows += 1
-                    if self.progress_callback:
-                        self.progress_callback(processed_rows, total_rows)
-                        
-                except Exception as e:
-                    self.log(f"Error processing row {index}: {str(e)}")
-                    self.log(traceback.format_exc())
-                    
-                    # Still update progress even if there was an error
-                    processed_rows += 1
-                    if self.progress_callback:
-                        self.progress_callback(processed_rows, total_rows)
-                    
-                    continue
+                            # Update progress after each row, even if there was an error
+                            processed_rows += 1
+                            if self.progress_callback:
+                                self.progress_callback(processed_rows, total_rows)
+                            
+                            if index in waiting:
+                                ready.append(waiting.pop(index))
             
             # Log field update summary
             update_summary = []
@@ -168,13 +199,63 @@ class DateAnalyzer:
             self.log(traceback.format_exc())
             return subject_df  # Return original if we failed
     
+    def _has_explicit_date(self, text):
+        """Whether the text states a full date itself, so it needs no earlier entry for context"""
+        if not isinstance(text, str):
+            return False
+        return bool(EXPLICIT_DATE_PATTERN.search(text))
+    
+    def _is_self_contained(self, text, required_headers):
+        """
+        Whether the text supplies every required header itself, so its row needs
+        no earlier entry for context: a full date, and a dateline place when a
+        place is required. Any other required header is only known from context.
+        """
+        if not self._has_explicit_date(text):
+            return False
+        other_headers = {header for header in required_headers if header != "Date"}
+        if not other_headers:
+            return True
+        if not other_headers <= PLACE_HEADERS:
+            return False
+        return bool(DATELINE_PLACE_PATTERN.search(text))
+    
+    def _context_rows(self, df, current_index):
+        """Copy of the current row and the earlier rows its prompts can refer back to"""
+        position = df.index.get_loc(current_index)
+        return df.iloc[max(0, position - CONTEXT_WINDOW_ROWS):position + 1].copy()
+    
+    def _apply_row_result(self, df, index, result, field_updates):
+        """Write the fields extracted for one row back into the dataframe"""
+        date_value, place_value, all_fields = result
+        
+        # Update the dataframe with all extracted fields
+        for field, value in all_fields.items():
+            if field in df.columns and value:
+                df.at[index, field] = value
+                field_updates[field] = field_updates.get(field, 0) + 1
+                self.log(f"Updated {field}: {value} for row {index}")
+        
+        # Also update Date and Place fields for backward compatibility
+        if date_value:
+            self.log(f"Found date for row {index}: {date_value}")
+            df.at[index, 'Date'] = date_value
+            field_updates['Date'] = field_updates.get('Date', 0) + 1
+            
+        if place_value:
+            self.log(f"Found place for row {index}: {place_value}")
+            df.at[index, 'Creation_Place'] = place_value
+            df.at[index, 'Place'] = place_value
+            field_updates['Creation_Place'] = field_updates.get('Creation_Place', 0) + 1
+            field_updates['Place'] = field_updates.get('Place', 0) + 1
+    
     async def _process_row(self, df, current_index):
         """Process a single row to determine its date and other required fields
         
         Returns:
             Tuple of (date_value, place_value, all_fields_dict) where all_fields_dict contains all extracted fields
         """
-        row = df.iloc[current_index]
+        row = df.loc[current_index]
         
         # Already has a date, no need to process
         if row['Date'] and row['Date'].strip():
@@ -291,10 +372,6 @@ class DateAnalyzer:
                     formatting_function=True
                 )
                 
-                # Update our progress callback if provided
-                if self.progress_callback:
-                    self.progress_callback(current_index + 1, len(df))
-                
                 # Process the response
                 if api_response:
                     self.log(f"API response for row {current_index}: {api_response[:100]}...")
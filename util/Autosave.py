@@ -0,0 +1,169 @@
+# util/Autosave.py
+
+# This file contains the AutosaveManager class, which is used to handle
+# change tracking and background project saves for the application.
+
+import queue
+import threading
+import time
+import traceback
+from tkinter import messagebox
+
+
+class AutosaveManager:
+    """
+    Tracks which pages (and which of their columns) changed since the last save,
+    and writes projects on a background thread. Autosaves run on an interval or
+    after a number of changes; a database project then only rewrites its dirty
+    pages. The Tk thread only takes the snapshot; serializing and writing happen
+    on the writer thread, one save at a time and in order.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.dirty_pages = {}  # index -> set of changed columns, or None when the whole page changed
+        self.structure_changed = False  # pages added, removed or reordered since the last save
+        self.changes_since_save = 0
+        self._paused = 0
+        self._timer_id = None
+        self._autosave_requested = False
+        self._pending_writes = 0
+        self._poll_id = None
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._writer = threading.Thread(target=self._run_writer, daemon=True)
+        self._writer.start()
+
+    # Change tracking
+
+    def mark_dirty(self, index, columns=None):
+        """Record that a page changed. columns is a column name, a list of names, or None for the whole page."""
+        if self._paused:
+            return
+        if columns is not None:
+            # The value just written replaces any text still deferred on disk
+            self.app.project_io.release_deferred_text(columns, [index])
+        if columns is None or (index in self.dirty_pages and self.dirty_pages[index] is None):
+            self.dirty_pages[index] = None
+        else:
+            self.dirty_pages.setdefault(index, set()).update([columns] if isinstance(columns, str) else columns)
+        self._note_change()
+
+    def mark_structure_changed(self):
+        """Record that pages were added, removed or reordered, so the next save writes the whole project."""
+        if self._paused:
+            return
+        self.structure_changed = True
+        self._note_change()
+
+    def has_unsaved_changes(self):
+        return bool(self.dirty_pages) or self.structure_changed
+
+    def clear(self):
+        """Forget tracked changes, e.g. after a project was opened or written in full."""
+        self.dirty_pages = {}
+        self.structure_changed = False
+        self.changes_since_save = 0
+
+    def pause(self):
+        """Hold autosaves and ignore changes while main_df is temporarily swapped for another frame."""
+        self._paused += 1
+
+    def resume(self):
+        self._paused = max(0, self._paused - 1)
+
+    def _note_change(self):
+        self.changes_since_save += 1
+        threshold = int(getattr(self.app.settings, 'autosave_change_threshold', 0) or 0)
+        if threshold and self.changes_since_save >= threshold and not self._autosave_requested:
+            # Save from the event loop rather than from inside whoever made the change
+            self._autosave_requested = True
+            self.app.after(1, self.autosave)
+
+    # Scheduling
+
+    def start(self):
+        """Start the autosave interval timer."""
+        if self._timer_id is not None:
+            self.app.after_cancel(self._timer_id)
+        interval = max(5, int(getattr(self.app.settings, 'autosave_interval', 60) or 60))
+        self._timer_id = self.app.after(interval * 1000, self._on_timer)
+
+    def _on_timer(self):
+        self._timer_id = None
+        self.autosave()
+        self.start()
+
+    def autosave(self):
+        """Queue a save of the tracked changes if autosave is on and the project has a home on disk."""
+        self._autosave_requested = False
+        if self._paused or not getattr(self.app.settings, 'autosave_enabled', False):
+            return
+        if not self.has_unsaved_changes() or not self.app.project_io.can_autosave():
+            return
+        try:
+            # Capture text typed into the editor since the last page change
+            self.app.data_operations.update_df()
+            dirty_pages = None if self.structure_changed else dict(self.dirty_pages)
+            job = self.app.project_io.build_save_job(dirty_pages)
+        except Exception as e:
+            self.app.error_logging(f"Autosave could not snapshot the project: {e}", level="ERROR")
+            return
+        self.submit(job, manual=False)
+
+    # Writing
+
+    def submit(self, job, manual=False):
+        """
+        Queue a save job (a callable run on the writer thread that returns a short
+        description) and clear the tracked changes it covers. If it fails, the
+        changes are tracked again so the next save retries them.
+        """
+        covered = (self.dirty_pages, self.structure_changed)
+        self.clear()
+        self._pending_writes += 1
+        self._jobs.put((job, manual, covered))
+        if self._poll_id is None:
+            self._poll_id = self.app.after(200, self._poll_results)
+
+    def wait_until_idle(self):
+        """Block until every queued save has been written (used before switching projects or quitting)."""
+        self._jobs.join()
+        self._poll_results(reschedule=False)
+
+    def _run_writer(self):
+        while True:
+            job, manual, covered = self._jobs.get()
+            started = time.perf_counter()
+            try:
+                description = job()
+                self._results.put((True, manual, covered, f"{description} in {time.perf_counter() - started:.2f}s"))
+            except Exception as e:
+                self._results.put((False, manual, covered, f"{e}\n{traceback.format_exc()}"))
+            finally:
+                self._jobs.task_done()
+
+    def _poll_results(self, reschedule=True):
+        """Report finished saves on the Tk thread."""
+        self._poll_id = None
+        while True:
+            try:
+                success, manual, covered, message = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._pending_writes -= 1
+            if success:
+                self.app.error_logging(f"{'Saved' if manual else 'Autosaved'} project: {message}", level="INFO")
+                self.app.title(f"{self.app.base_title} - Saved {time.strftime('%H:%M')}")
+            else:
+                # Track the unsaved pages again so the next save retries them
+                dirty_pages, structure_changed = covered
+                for index, columns in dirty_pages.items():
+                    self.mark_dirty(index, None if columns is None else list(columns))
+                if structure_changed:
+                    self.mark_structure_changed()
+                self.app.error_logging(f"{'Save' if manual else 'Autosave'} failed: {message}", level="ERROR")
+                if manual:
+                    messagebox.showerror("Error", f"Failed to save project: {message.splitlines()[0]}")
+        if reschedule and self._pending_writes > 0:
+            self._poll_id = self.app.after(200, self._poll_results)
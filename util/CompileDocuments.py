@@ -106,6 +106,8 @@ class CompileDocuments:
                 
     def compile_documents(self, force_recompile=True):
         try:
+            # Compiled documents carry every text column
+            self.parent.project_io.ensure_text_loaded()
             # Fetch the latest main_df from the parent
             self.main_df = self.parent.main_df
             
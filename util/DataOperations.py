@@ -9,6 +9,10 @@ from tkinter import messagebox, END # Added END
 import re # Added for apply_collation_dict and natural_sort_key
 import shutil # Added for delete_current_image and process_edited_single_image
 import json # Added for determine_rotation_from_box
+from concurrent.futures import ProcessPoolExecutor
+
+from util.JSONExtraction import extract_json_from_response
+from util.PageTable import set_cell
 
 # Helper function for natural sorting (needed by process_edited_single_image)
 def natural_sort_key(s):
@@ -16,6 +20,47 @@ def natural_sort_key(s):
     return [int(text) if text.isdigit() else text.lower()
             for text in re.split(r'([0-9]+)', s)]
 
+# Collation replacements switch to a process pool above this many pages
+COLLATION_POOL_MIN_ROWS = 2000
+
+# Compiled collation matchers cached per worker process, keyed on the pattern string
+_collation_pattern_cache = {}
+
+def build_collation_matcher(coll_dict):
+    """
+    Compile a collation dict into one case-insensitive, whole-word alternation
+    pattern plus a lookup from casefolded variant to its correct term. Longer
+    variants come first so they win over their prefixes; if a variant is listed
+    under several correct terms, the first one wins.
+
+    Returns:
+        tuple: (pattern string or '', lookup dict)
+    """
+    lookup = {}
+    pattern_variants = []
+    for correct_term, variants in coll_dict.items():
+        for variant in variants:
+            if variant and variant.casefold() not in lookup:
+                lookup[variant.casefold()] = correct_term
+                pattern_variants.append(variant)
+    if not lookup:
+        return "", {}
+    escaped_variants = sorted((re.escape(variant) for variant in pattern_variants), key=len, reverse=True)
+    return r'\b(' + '|'.join(escaped_variants) + r')\b', lookup
+
+def apply_collation_to_texts(pattern_str, lookup, texts):
+    """
+    Replace every collation variant in each text in a single pass.
+    Module-level so chunks of pages can run in a process pool.
+    """
+    pattern = _collation_pattern_cache.get(pattern_str)
+    if pattern is None:
+        pattern = re.compile(pattern_str, re.IGNORECASE)
+        _collation_pattern_cache.clear() # Only the current dict is ever needed
+        _collation_pattern_cache[pattern_str] = pattern
+    replace = lambda match: lookup.get(match.group(0).casefold(), match.group(0))
+    return [pattern.sub(replace, text) for text in texts]
+
 class DataOperations:
     def __init__(self, app_instance):
         """
@@ -116,7 +161,11 @@ class DataOperations:
             "Relevance",
             "Document_Type", "Author", "Correspondent", "Correspondent_Place", "Date", "Creation_Place", "Summary",
             # Add any other columns used by AI functions or other parts
-            "Document_No", "Citation", "Temp_Data_Analysis", "Data_Analysis", "Query_Data", "Query_Memory", "Notes"
+            "Document_No", "Citation", "Temp_Data_Analysis", "Data_Analysis", "Query_Data", "Query_Memory", "Notes",
+            # Per-cell provenance of AI-generated text (JSON per page)
+            "Provenance",
+            # Perceptual hash of the page image for duplicate detection
+            "Image_Hash"
         ]
         # Ensure uniqueness
         all_columns = sorted(list(set(all_columns)))
@@ -272,6 +321,18 @@ class DataOperations:
                 if errors:
                     highlight_errors_flag = True
 
+            # Track the page for autosave (Metadata writes its own columns as it parses them)
+            job_columns = {
+                "HTR": ['Original_Text', 'Text_Toggle'],
+                "Correct_Text": ['Corrected_Text', 'Text_Toggle'],
+                "Format_Text": ['Formatted_Text', 'Text_Toggle'],
+                "Translation": ['Translation', 'Text_Toggle'],
+                "Get_Names_and_Places": ['People', 'Places'],
+                "Identify_Errors": ['Errors', 'Errors_Source'],
+            }
+            if ai_job in job_columns:
+                self.app.autosave.mark_dirty(index, job_columns[ai_job])
+
             # --- Generic Highlight and Refresh Logic (Now runs AFTER potential DF updates) ---
 
             # Set highlight flags based on results (only for certain job types)
@@ -295,6 +356,50 @@ class DataOperations:
             messagebox.showerror("Error", f"Failed to update DataFrame for index {index}: {str(e)}")
             self.app.error_logging(f"Failed to update DataFrame for index {index}: {str(e)}")
 
+    def update_df_with_fused_htr_response(self, index, response):
+        """
+        Parse a fused HTR_Correct response and write both Original_Text and Corrected_Text.
+
+        Returns:
+            bool: True if both fields were present and written, False if the response
+                  failed validation (the caller then falls back to separate calls).
+        """
+        if self.app.main_df.empty or index >= len(self.app.main_df):
+            self.app.error_logging(f"Skipping fused HTR update for invalid index {index}", level="WARNING")
+            return False
+
+        parsed = extract_json_from_response(str(response) if response is not None else "", self.app.error_logging)
+        # Some models wrap the object in a single-element list
+        if isinstance(parsed, list) and len(parsed) == 1:
+            parsed = parsed[0]
+        if not isinstance(parsed, dict):
+            self.app.error_logging(f"Fused HTR response for index {index} is not a JSON object", level="WARNING")
+            return False
+
+        transcription = str(parsed.get('transcription') or "").strip()
+        corrected_text = str(parsed.get('corrected_text') or "").strip()
+        if not transcription or not corrected_text:
+            self.app.error_logging(f"Fused HTR response for index {index} is missing transcription or corrected_text", level="WARNING")
+            return False
+
+        try:
+            self.app.main_df.loc[index, 'Original_Text'] = transcription
+            self.app.main_df.loc[index, 'Corrected_Text'] = corrected_text
+            self.app.autosave.mark_dirty(index, ['Original_Text', 'Corrected_Text', 'Text_Toggle'])
+            # Show the corrected version, matching the two-step workflow's end state
+            self.app.update_display_after_ai(index, 'Corrected_Text')
+            return True
+        except Exception as e:
+            self.app.error_logging(f"Failed to write fused HTR response for index {index}: {str(e)}")
+            return False
+
+    def store_edit(self, index, column, value):
+        """Write a user edit into main_df, tracking the page for autosave if the value changed."""
+        current = self.app.main_df.at[index, column] if column in self.app.main_df.columns else None
+        set_cell(self.app.main_df, index, column, value)
+        if not (isinstance(current, str) and current == value):
+            self.app.autosave.mark_dirty(index, column)
+
     def update_df(self):
         """Explicitly save the currently displayed text to the correct DF column."""
         self.app.save_toggle = False # Assuming this flag indicates unsaved changes
@@ -305,24 +410,35 @@ class DataOperations:
                 # Access text_display via self.app
                 text = self.clean_text(self.app.text_display.get("1.0", END))
                 if current_display in ["Original_Text", "Corrected_Text", "Formatted_Text", "Translation", "Separated_Text"]:
-                    self.app.main_df.loc[self.app.page_counter, current_display] = text
+                    self.store_edit(self.app.page_counter, current_display, text)
 
             # Save relevance
             # Access relevance_var via self.app
             if hasattr(self.app, 'relevance_var') and 'Relevance' in self.app.main_df.columns:
-                self.app.main_df.loc[self.app.page_counter, 'Relevance'] = self.app.relevance_var.get()
+                self.store_edit(self.app.page_counter, 'Relevance', self.app.relevance_var.get())
 
     def apply_collation_dict(self, coll_dict, is_names=True):
         """
         For each row, find-and-replace all variations in the active text column.
+        All variants are compiled once into a single matcher and applied in one
+        pass per text (in a process pool for large projects).
         If is_names=True, we're applying name variants; else place variants.
         """
         if not coll_dict:
              messagebox.showinfo("Info", f"No {'names' if is_names else 'places'} found to replace.")
              return
 
-        modified_count = 0
-        # Access main_df via self.app
+        pattern_str, lookup = build_collation_matcher(coll_dict)
+        if not pattern_str:
+             messagebox.showinfo("Info", f"No {'names' if is_names else 'places'} found to replace.")
+             return
+
+        # Lazily opened projects need every page's text before it is searched
+        self.app.project_io.ensure_text_loaded(["Original_Text", "Corrected_Text", "Formatted_Text", "Translation", "Separated_Text"])
+
+        # Collect the active text of every page that has one
+        targets = [] # (idx, active_col)
+        texts = []
         for idx, row in self.app.main_df.iterrows():
             active_col = row.get('Text_Toggle', None)
             if active_col not in ["Original_Text", "Corrected_Text", "Formatted_Text", "Translation", "Separated_Text"]:
@@ -331,37 +447,33 @@ class DataOperations:
             old_text = row.get(active_col, "") # Use .get for safety
             if not isinstance(old_text, str) or not old_text.strip():
                 continue # Skip if text is empty or not a string
+            targets.append((idx, active_col))
+            texts.append(old_text)
+
+        new_texts = None
+        if len(texts) >= COLLATION_POOL_MIN_ROWS:
+            chunk_size = max(1, len(texts) // ((os.cpu_count() or 1) * 4))
+            chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+            try:
+                with ProcessPoolExecutor() as executor:
+                    results = executor.map(apply_collation_to_texts, [pattern_str] * len(chunks), [lookup] * len(chunks), chunks)
+                    new_texts = [text for chunk in results for text in chunk]
+            except Exception as e:
+                self.app.error_logging(f"Process pool unavailable for collation, running serially: {e}", level="WARNING")
+        if new_texts is None:
+            new_texts = apply_collation_to_texts(pattern_str, lookup, texts)
 
-            new_text = old_text
-            # For each correct spelling => list of variants
-            for correct_term, variants in coll_dict.items():
-                # Create a pattern that matches any of the variants (case-insensitive, whole words)
-                # Ensure variants don't contain problematic regex characters or handle them
-                escaped_variants = [re.escape(var) for var in variants if var] # Escape variants
-                if not escaped_variants: continue # Skip if no valid variants
-
-                # Build regex pattern: \b(var1|var2|var3)\b
-                # Use word boundaries (\b) to avoid partial matches within words.
-                # Sort variants by length descending to match longer variants first
-                escaped_variants.sort(key=len, reverse=True)
-                pattern_str = r'\b(' + '|'.join(escaped_variants) + r')\b'
-                pattern = re.compile(pattern_str, re.IGNORECASE)
-
-                # Debug print for each replacement attempt
-                print(f"DEBUG: Row {idx}, Col '{active_col}': Replacing variants {variants} with '{correct_term}'")
-                print(f"DEBUG: Old text before replacement:\n{old_text}")
-
-                # Replace all occurrences of any variant with the correct term
-                new_text = pattern.sub(correct_term, new_text)
-
-            # Debug print after all replacements for this row
-            if new_text != old_text:
-                print(f"DEBUG: New text after replacement:\n{new_text}")
-
-            # Update DataFrame only if text changed
-            if new_text != old_text:
-                self.app.main_df.at[idx, active_col] = new_text # Update app's main_df
-                modified_count += 1
+        modified_count = 0
+        history_operation = self.app.history.begin(f"Collate {'Names' if is_names else 'Places'}")
+        try:
+            for (idx, active_col), old_text, new_text in zip(targets, texts, new_texts):
+                # Update DataFrame only if text changed
+                if new_text != old_text:
+                    self.app.main_df.at[idx, active_col] = new_text # Update app's main_df
+                    self.app.autosave.mark_dirty(idx, active_col)
+                    modified_count += 1
+        finally:
+            self.app.history.end(history_operation)
 
         # Refresh text display if the current page was modified
         # Access page_counter, main_df, load_text, counter_update, text_display via self.app
@@ -391,6 +503,8 @@ class DataOperations:
             return
 
         try:
+            # Later pages are renumbered, so text still deferred on disk is read first
+            self.app.project_io.ensure_text_loaded()
             current_index = self.app.page_counter
 
             # Get file paths (convert relative to absolute)
@@ -405,6 +519,7 @@ class DataOperations:
 
             # Remove the row from the DataFrame
             self.app.main_df = self.app.main_df.drop(current_index).reset_index(drop=True)
+            self.app.autosave.mark_structure_changed()
 
             # Renumber the remaining entries and rename files
             for idx in range(len(self.app.main_df)):
@@ -433,6 +548,8 @@ class DataOperations:
                     # Rename file
                     if os.path.exists(old_image_path_abs) and old_image_path_abs != new_image_path_abs:
                         os.rename(old_image_path_abs, new_image_path_abs)
+                        self.app.image_files.note_removed(old_image_path_abs)
+                        self.app.image_files.note_written(new_image_path_abs)
                     # Update path in DataFrame
                     self.app.main_df.at[idx, 'Image_Path'] = new_image_path_rel
 
@@ -568,6 +685,8 @@ class DataOperations:
         Uses a clean step-by-step approach to avoid file collisions and maintain proper numbering.
         """
         try:
+            # Pages are renumbered, so text still deferred on disk is read first
+            self.app.project_io.ensure_text_loaded()
             pass_images_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)),
                                         "subs", "pass_images")
 
@@ -652,6 +771,7 @@ class DataOperations:
                 # Copy all reorganized files to project directory
                 for file in os.listdir(temp_reorg_dir):
                     shutil.copy2(os.path.join(temp_reorg_dir, file), os.path.join(project_images_dir, file))
+                self.app.image_files.invalidate()
 
                 # Step 7: Rebuild the DataFrame
                 new_rows = []
@@ -691,6 +811,7 @@ class DataOperations:
 
                 # Replace the DataFrame
                 self.app.main_df = pd.DataFrame(new_rows)
+                self.app.autosave.mark_structure_changed()
 
             finally:
                 # Clean up temporary directory
@@ -734,7 +855,7 @@ class DataOperations:
 
             if messagebox.askyesno("Revert Text", confirmation_msg):
                 # Clear the current version's text
-                self.app.main_df.loc[index, current_selection] = ""
+                self.store_edit(index, current_selection, "")
 
                 # Find the next best version to display
                 fallback_order = ["Separated_Text", "Translation", "Formatted_Text", "Corrected_Text", "Original_Text"]
@@ -752,7 +873,7 @@ class DataOperations:
 
                 # Set the new toggle and variable
                 self.app.text_display_var.set(next_best_version)
-                self.app.main_df.loc[index, 'Text_Toggle'] = next_best_version
+                self.store_edit(index, 'Text_Toggle', next_best_version)
                 # Access load_text via self.app
                 self.app.load_text() # Reload the display
             else:
@@ -774,21 +895,28 @@ class DataOperations:
         # Access messagebox, main_df, text_display_var, load_text, counter_update via self.app
         if messagebox.askyesno("Confirm Revert All",
                             "Are you sure you want to revert ALL pages to their Original Text?\n\n"
-                            "This will permanently remove ALL content in the 'Corrected_Text', 'Formatted_Text', 'Translation', and 'Separated_Text' columns for every page. "
-                            "This action cannot be undone."):
+                            "This will remove ALL content in the 'Corrected_Text', 'Formatted_Text', 'Translation', and 'Separated_Text' columns for every page. "
+                            "It can be reverted from Edit > Version History."):
 
             reverted_cols = ['Corrected_Text', 'Formatted_Text', 'Translation', 'Separated_Text']
-            for col in reverted_cols:
-                 if col in self.app.main_df.columns:
-                     self.app.main_df[col] = "" # Clear the entire column
-
-            # Set toggle for all rows to Original_Text if it exists, otherwise None
-            if 'Original_Text' in self.app.main_df.columns:
-                 self.app.main_df['Text_Toggle'] = "Original_Text"
-                 self.app.text_display_var.set("Original_Text")
-            else:
-                 self.app.main_df['Text_Toggle'] = "None"
-                 self.app.text_display_var.set("None")
+            # The cleared text is kept in the version history, so it is read before being cleared
+            history_operation = self.app.history.begin("Revert All Pages")
+            try:
+                for col in reverted_cols:
+                     if col in self.app.main_df.columns:
+                         self.app.main_df[col] = "" # Clear the entire column
+
+                # Set toggle for all rows to Original_Text if it exists, otherwise None
+                if 'Original_Text' in self.app.main_df.columns:
+                     self.app.main_df['Text_Toggle'] = "Original_Text"
+                     self.app.text_display_var.set("Original_Text")
+                else:
+                     self.app.main_df['Text_Toggle'] = "None"
+                     self.app.text_display_var.set("None")
+            finally:
+                self.app.history.end(history_operation)
+            # Every page changed, so the next save writes the whole project
+            self.app.autosave.mark_structure_changed()
 
             self.app.load_text() # Reload current page display
             self.app.counter_update()
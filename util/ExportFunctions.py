@@ -13,7 +13,10 @@ import pandas as pd
 import asyncio
 import traceback
 import json
-from util.SequentialData import call_sequential_api
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from util.SequentialData import call_sequential_api, build_chunks
+from util.JSONExtraction import extract_json_from_response, item_indices, find_missing_indices
+from util.PageTable import snapshot_page_table
 
 class ExportManager:
     def __init__(self, app):
@@ -27,6 +30,8 @@ class ExportManager:
             export_path (str, optional): Path where the exported file should be saved.
                 If None, a file dialog will be shown.
         """
+        # Exports read every page's text, including text a lazily opened project hasn't read yet
+        self.app.project_io.ensure_text_loaded()
         self.app.toggle_button_state()
         
         try:
@@ -74,6 +79,7 @@ class ExportManager:
             self.app.toggle_button_state()
 
     def export_single_file(self):
+        self.app.project_io.ensure_text_loaded()
         self.app.toggle_button_state()        
         combined_text = ""
 
@@ -110,6 +116,7 @@ class ExportManager:
         if self.app.main_df.empty:
             messagebox.showwarning("No Data", "No documents to export.")
             return
+        self.app.project_io.ensure_text_loaded()
 
         # Ask user for base filename and directory
         save_dir = filedialog.askdirectory(title="Select Directory to Save Text Files")
@@ -172,6 +179,7 @@ class ExportManager:
         if self.app.main_df.empty:
             messagebox.showwarning("No Data", "No documents to export.")
             return
+        self.app.project_io.ensure_text_loaded()
 
         # Ask user for save location
         file_path = filedialog.asksaveasfilename(
@@ -354,6 +362,7 @@ class ExportManager:
         if self.app.main_df.empty:
             messagebox.showwarning("No Data", "No documents to export.")
             return
+        self.app.project_io.ensure_text_loaded()
             
         # Ask user for save location
         file_path = self._get_csv_save_path()
@@ -377,9 +386,9 @@ class ExportManager:
                     source_df = filtered_df # Use the filtered df for the rest of the process
                 else:
                     messagebox.showwarning("Relevance Column Missing", "Relevance column not found. Exporting all pages.")
-                    source_df = self.app.main_df.copy() # Fallback to all pages
+                    source_df = snapshot_page_table(self.app.main_df) # Fallback to all pages
             else:
-                source_df = self.app.main_df.copy() # Use all pages
+                source_df = snapshot_page_table(self.app.main_df) # Use all pages
 
             # Basic Pagination: Each page is its own row in the CSV
             compiled_df = source_df # Use the potentially filtered df
@@ -553,7 +562,7 @@ class ExportManager:
                 )
         
         # Basic Pagination: Each page is its own row in the CSV
-        compiled_df = self.app.main_df.copy()
+        compiled_df = snapshot_page_table(self.app.main_df)
         
         # Make sure we have a Document_Page column
         if 'Document_Page' not in compiled_df.columns:
@@ -600,9 +609,11 @@ class ExportManager:
         
     def _generate_metadata(self, compiled_df, selected_metadata_preset=None, actual_text_source_column=None):
         """Generate metadata for documents using AI."""
-        # Store the original main_df temporarily
-        self._original_df = self.app.main_df.copy()
+        # Keep the original main_df to put back; it is swapped out, not modified, so no copy is needed
+        self._original_df = self.app.main_df
         self.app._is_generating_export_metadata = True # Add flag
+        # The metadata run writes into a stand-in main_df that must not be autosaved
+        self.app.autosave.pause()
 
         try:
             # Make a copy of compiled_df to avoid modifying the original
@@ -634,7 +645,7 @@ class ExportManager:
             print("Metadata generation completed")
 
             # Retrieve the updated dataframe and copy metadata columns back
-            updated_df = self.app.main_df.copy() # This df has index 0, 1, ...
+            updated_df = snapshot_page_table(self.app.main_df) # This df has index 0, 1, ...
 
             # Restore the original index to updated_df so it aligns with compiled_df
             if len(updated_df) == len(temp_df_original_index):
@@ -661,6 +672,7 @@ class ExportManager:
         finally:
             # Restore the original main_df
             self.app.main_df = self._original_df
+            self.app.autosave.resume()
             
             # Refresh the UI display
             self.app.refresh_display()
@@ -1031,13 +1043,12 @@ class ExportManager:
         return date_df
         
     def _run_date_analysis(self, api_handler, date_df, preset_name=None):
-        """Run date analysis using asyncio."""
+        """
+        Run batch date analysis. date_df is split into token-budgeted chunks that are
+        sent concurrently; each chunk's JSON is parsed on its own and merged back by
+        index. Chunks that fail or come back missing entries are retried once, alone.
+        """
         try:
-            import json
-            print("Setting up asyncio event loop for batch date analysis")
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
             # Find the specified preset if provided
             if preset_name:
                 sequence_dates_preset = next((p for p in self.app.settings.sequential_metadata_presets if p.get('name') == preset_name), None)
@@ -1058,30 +1069,19 @@ class ExportManager:
                     required_headers = header_value
                 self.app.error_logging(f"Found required headers in sequence preset: {required_headers}")
 
-            # Build the batch JSON: [{"index": idx, "text": text} ...]
-            batch = []
-            for idx, row in date_df.iterrows():
-                batch.append({"index": int(idx), "text": row["Text"]})
-            batch_json = json.dumps(batch, ensure_ascii=False)
-
-            # Compose the prompt for the model
             system_prompt = sequence_dates_preset["general_instructions"] if sequence_dates_preset else ""
-            # Add explicit instruction for JSON input/output
-            user_prompt = (
-                "You will be given a JSON array of objects, each with an 'index' and 'text'. "
-                "For each object, extract the required fields (" + ', '.join(required_headers) + ") from the text. "
-                "Return a JSON array of objects, each with the same 'index' and the extracted fields as keys.\n"
-                "Input JSON:\n" + batch_json + "\n\nRespond ONLY with the output JSON array."
-            )
             temp = float(sequence_dates_preset.get("temperature", "0.2")) if sequence_dates_preset else 0.2
             model = sequence_dates_preset.get("model", "gemini-2.0-flash-lite") if sequence_dates_preset else "gemini-2.0-flash-lite"
 
-            # Print the prompts for debugging
-            print("\n--- SYSTEM PROMPT ---\n" + system_prompt)
-            print("\n--- USER PROMPT ---\n" + user_prompt)
-
-            # Async API call
-            async def batch_call():
+            async def chunk_call(chunk_df):
+                # Build the batch JSON: [{"index": idx, "text": text} ...]
+                batch = [{"index": int(idx), "text": row["Text"]} for idx, row in chunk_df.iterrows()]
+                user_prompt = (
+                    "You will be given a JSON array of objects, each with an 'index' and 'text'. "
+                    "For each object, extract the required fields (" + ', '.join(required_headers) + ") from the text. "
+                    "Return a JSON array of objects, each with the same 'index' and the extracted fields as keys.\n"
+                    "Input JSON:\n" + json.dumps(batch, ensure_ascii=False) + "\n\nRespond ONLY with the output JSON array."
+                )
                 response, _ = await api_handler.route_api_call(
                     engine=model,
                     system_prompt=system_prompt,
@@ -1095,26 +1095,54 @@ class ExportManager:
                 )
                 return response
 
-            response = loop.run_until_complete(batch_call())
-            loop.close()
-            print("\n--- MODEL RESPONSE ---\n" + str(response) + "\n")
-
-            # Parse the model's JSON response
-            try:
-                parsed = json.loads(response)
-                # Map results back to DataFrame by index
-                for item in parsed:
-                    idx = item.get("index")
-                    for header in required_headers:
-                        if header in item and idx in date_df.index:
-                            date_df.at[idx, header] = item[header]
-                self.app.error_logging(f"Batch date analysis: updated {len(parsed)} rows.")
-            except Exception as e:
-                self.app.error_logging(f"Failed to parse model JSON response: {str(e)}\nResponse was: {response}")
+            def run_chunks(chunks):
+                """Send chunks concurrently, merge what parses and return the rows still missing per chunk."""
+                incomplete = []
+                max_workers = max(1, min(int(getattr(self.app.settings, 'batch_size', 50) or 1), len(chunks)))
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    futures = {executor.submit(asyncio.run, chunk_call(chunk)): chunk for chunk in chunks}
+                    for future in as_completed(futures):
+                        chunk = futures[future]
+                        try:
+                            response = future.result()
+                        except Exception as e:
+                            self.app.error_logging(f"Date analysis chunk {chunk.index[0]}-{chunk.index[-1]} failed: {str(e)}", level="ERROR")
+                            response = None
+
+                        parsed = None
+                        if response and response != "Error":
+                            parsed = extract_json_from_response(response, self.app.error_logging)
+                        items = [item for item in parsed if isinstance(item, dict)] if isinstance(parsed, list) else []
+
+                        # Map results back to DataFrame by index
+                        for item in items:
+                            for idx in item_indices(item, "index"):
+                                if idx not in date_df.index:
+                                    continue
+                                for header in required_headers:
+                                    if header in item:
+                                        date_df.at[idx, header] = item[header]
+
+                        missing = find_missing_indices(items, list(chunk.index), index_key="index")
+                        if missing:
+                            self.app.error_logging(f"Date analysis chunk {chunk.index[0]}-{chunk.index[-1]}: {len(missing)} of {len(chunk)} rows missing from the response.", level="WARNING")
+                            incomplete.append(chunk.loc[missing])
+                return incomplete
+
+            chunks = build_chunks(self.app, date_df, preset_name or "Sequence_Dates")
+            self.app.error_logging(f"Batch date analysis: {len(date_df)} rows in {len(chunks)} chunks.", level="INFO")
+            incomplete = run_chunks(chunks) if chunks else []
+            if incomplete:
+                self.app.error_logging(f"Retrying {len(incomplete)} incomplete date analysis chunks.", level="INFO")
+                incomplete = run_chunks(incomplete)
+            if incomplete:
+                missing_count = sum(len(chunk) for chunk in incomplete)
+                self.app.error_logging(f"Batch date analysis: {missing_count} rows could not be analyzed after retrying.", level="ERROR")
+            self.app.error_logging(f"Batch date analysis: updated {len(date_df) - sum(len(chunk) for chunk in incomplete)} rows.")
 
             return date_df
         except Exception as e:
-            self.app.error_logging(f"Error in batch asyncio loop: {str(e)}")
+            self.app.error_logging(f"Error in batch date analysis: {str(e)}")
             traceback_str = traceback.format_exc()
             self.app.error_logging(f"Traceback: {traceback_str}")
             return None
@@ -0,0 +1,131 @@
+# util/FileCache.py
+
+# This file contains the ImageFileCache class, which is used to answer
+# image file existence and size checks from one directory listing for the application.
+
+import os
+import threading
+
+
+class ImageFileCache:
+    """
+    Existence and size/modification-time lookups for files in the images
+    directory of the open project, answered from a single os.scandir of that
+    directory instead of one stat per call (each of which is a round trip on a
+    network share). Paths outside the images directory are checked on disk as
+    usual.
+
+    The listing is taken on first use and kept current by the app's own writes
+    (note_written / note_removed); invalidate() drops it after bulk changes to
+    the directory and refresh() rescans it straight away. A file the listing
+    doesn't know is still looked for on disk before it is reported missing, so
+    files written by code that doesn't report its writes are found as well.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._lock = threading.Lock()
+        self._directory = None  # normalized images directory the listing belongs to
+        self._entries = None  # normalized file name -> (size, mtime in ns), or None until stat() asks for it
+
+    @staticmethod
+    def _normalize(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def _listing(self, directory):
+        """The cached listing if directory is the images directory, scanning it if needed; else None."""
+        images_directory = getattr(self.app, 'images_directory', None)
+        if not images_directory or directory != self._normalize(images_directory):
+            return None
+        with self._lock:
+            if self._entries is None or self._directory != directory:
+                self._scan(directory)
+            return self._entries
+
+    def _scan(self, directory):
+        entries = {}
+        try:
+            with os.scandir(directory) as iterator:
+                for entry in iterator:
+                    if not entry.is_file():
+                        continue
+                    # Windows returns sizes and times with the listing; elsewhere they cost a stat, so wait until asked
+                    if os.name == "nt":
+                        info = entry.stat()
+                        entries[os.path.normcase(entry.name)] = (info.st_size, info.st_mtime_ns)
+                    else:
+                        entries[os.path.normcase(entry.name)] = None
+        except OSError as e:
+            self.app.error_logging(f"Could not list images directory {directory}: {e}", level="WARNING")
+        self._directory = directory
+        self._entries = entries
+
+    def _split(self, path):
+        path = self._normalize(path)
+        return os.path.dirname(path), os.path.basename(path)
+
+    def exists(self, path):
+        """Whether path is an existing file (or, outside the images directory, any existing path)."""
+        if not isinstance(path, str) or not path.strip():
+            return False
+        directory, name = self._split(path)
+        entries = self._listing(directory)
+        if entries is None:
+            return os.path.exists(path)
+        if name in entries:
+            return True
+        # Not in the listing: written since it was taken, or really missing
+        if os.path.isfile(path):
+            self.note_written(path)
+            return True
+        return False
+
+    def stat(self, path):
+        """
+        Size and modification time of a file.
+
+        Returns:
+            tuple: (size in bytes, mtime in nanoseconds), or None if the file doesn't exist.
+        """
+        if not self.exists(path):
+            return None
+        directory, name = self._split(path)
+        entries = self._listing(directory)
+        if entries is not None and entries.get(name) is not None:
+            return entries[name]
+        try:
+            info = os.stat(path)
+        except OSError:
+            return None
+        if entries is not None:
+            with self._lock:
+                entries[name] = (info.st_size, info.st_mtime_ns)
+        return info.st_size, info.st_mtime_ns
+
+    def note_written(self, path):
+        """Record that the app created or overwrote a file."""
+        directory, name = self._split(path)
+        with self._lock:
+            if self._entries is not None and directory == self._directory:
+                # Size and time are read again the next time they are asked for
+                self._entries[name] = None
+
+    def note_removed(self, path):
+        """Record that the app deleted or renamed away a file."""
+        directory, name = self._split(path)
+        with self._lock:
+            if self._entries is not None and directory == self._directory:
+                self._entries.pop(name, None)
+
+    def invalidate(self):
+        """Drop the listing; the next lookup lists the directory again."""
+        with self._lock:
+            self._directory = None
+            self._entries = None
+
+    def refresh(self):
+        """Rescan the images directory now, e.g. after files were changed outside the app."""
+        self.invalidate()
+        images_directory = getattr(self.app, 'images_directory', None)
+        if images_directory:
+            self._listing(self._normalize(images_directory))
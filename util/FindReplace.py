@@ -289,6 +289,9 @@ class FindReplace:
             # Clear existing highlighting at the start
             self.text_display.tag_remove("highlight", "1.0", tk.END)
 
+            if main_df is None:
+                # Searching covers every page's text
+                self.parent.project_io.ensure_text_loaded(["Original_Text", "Corrected_Text", "Formatted_Text", "Translation", "Separated_Text"])
             self.main_df = self.get_main_df()
             if main_df is not None:
                 self.main_df = main_df
@@ -386,6 +389,7 @@ class FindReplace:
             # Only update DataFrame if a valid text type is selected
             if active_column != "None" and active_column in self.main_df.columns:
                 self.main_df.loc[current_page, active_column] = new_text.strip()
+                self.parent.autosave.mark_dirty(current_page, active_column)
             elif active_column == "None":
                  messagebox.showwarning("Warning", "Cannot save replacement. No text type selected in the main window dropdown.")
             else: # Column not found (should be rare if dropdown is synced)
@@ -400,7 +404,7 @@ class FindReplace:
         """Replace all occurrences of the search term in the document."""
         try:
             if not messagebox.askyesno("Replace All", 
-                "Are you sure you want to replace all occurrences? This action cannot be undone."):
+                "Are you sure you want to replace all occurrences? This can be reverted from Edit > Version History."):
                 return
 
             search_term = self.search_entry.get().strip()
@@ -428,22 +432,27 @@ class FindReplace:
                  messagebox.showerror("Error", f"Cannot perform Replace All. Column '{active_column}' not found in data.")
                  return
 
-            for index, row in self.main_df.iterrows():
-                # Use the globally determined active_column
-                if active_column not in row: # Safety check
-                     continue
-
-                text = row[active_column]
-                if pd.notna(text) and isinstance(text, str):
-                    # Count occurrences using the same pattern
-                    occurrences = len(pattern.findall(text))
-
-                    if occurrences > 0:
-                        # Use the same pattern for replacement
-                        new_text = pattern.sub(replace_term, text)
-                        self.main_df.loc[index, active_column] = new_text
-                        total_replacements += occurrences
-                        pages_affected.add(index)
+            history_operation = self.parent.history.begin(f"Replace All '{search_term}' in {active_column}")
+            try:
+                for index, row in self.main_df.iterrows():
+                    # Use the globally determined active_column
+                    if active_column not in row: # Safety check
+                         continue
+
+                    text = row[active_column]
+                    if pd.notna(text) and isinstance(text, str):
+                        # Count occurrences using the same pattern
+                        occurrences = len(pattern.findall(text))
+
+                        if occurrences > 0:
+                            # Use the same pattern for replacement
+                            new_text = pattern.sub(replace_term, text)
+                            self.main_df.loc[index, active_column] = new_text
+                            self.parent.autosave.mark_dirty(index, active_column)
+                            total_replacements += occurrences
+                            pages_affected.add(index)
+            finally:
+                self.parent.history.end(history_operation)
 
             current_page = self.get_page_counter()
             # Update the text display IF the current page was affected AND the active_column is valid
@@ -127,6 +127,8 @@ class ImageHandler:
                     save_kwargs["exif"] = final_exif
                 
                 rotated.save(current_image_path, format=save_format, **save_kwargs)
+            if self.app:
+                self.app.image_files.note_written(current_image_path)
             
             # Update the display if this image is currently shown
             # Check if app and current_image_path attribute exist and match
@@ -315,6 +317,8 @@ class ImageHandler:
         try:
             if image_path_abs and os.path.exists(image_path_abs):
                 os.remove(image_path_abs)
+                if self.app:
+                    self.app.image_files.note_removed(image_path_abs)
                 deleted_files.append(image_path_abs)
             if text_path_abs and os.path.exists(text_path_abs):
                 os.remove(text_path_abs)
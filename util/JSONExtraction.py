@@ -1,6 +1,69 @@
 import json
 import re
 
+def parse_json_array_incremental(text: str):
+    """
+    Walk the first top-level JSON array in text element by element, keeping every
+    element that is complete. Stops at the first element that can't be decoded,
+    which is where output was cut off (e.g. by max_output_tokens).
+
+    Args:
+        text (str): Text containing a JSON array, possibly truncated.
+
+    Returns:
+        tuple: (list of complete elements, True if the closing ']' was reached)
+    """
+    items = []
+    start = text.find('[') if isinstance(text, str) else -1
+    if start == -1:
+        return items, False
+    decoder = json.JSONDecoder()
+    position = start + 1
+    while True:
+        # Skip whitespace and the separating comma between elements
+        while position < len(text) and text[position] in " \t\r\n,":
+            position += 1
+        if position >= len(text):
+            return items, False
+        if text[position] == ']':
+            return items, True
+        try:
+            item, position = decoder.raw_decode(text, position)
+        except json.JSONDecodeError:
+            return items, False
+        items.append(item)
+
+
+def item_indices(item, index_key=None):
+    """
+    Indices an element covers: the value of index_key (or the element's first key),
+    given either as an int or as a comma/space separated string like "3, 4, 5".
+    """
+    if not isinstance(item, dict) or not item:
+        return []
+    value = item.get(index_key) if index_key else next(iter(item.values()))
+    if isinstance(value, bool):
+        return []
+    if isinstance(value, int):
+        return [value]
+    if isinstance(value, str):
+        return [int(part) for part in re.split(r'[\s,]+', value.strip()) if part.isdigit()]
+    return []
+
+
+def find_missing_indices(items, expected_indices, index_key=None):
+    """
+    Report which expected indices no recovered element covers.
+
+    Returns:
+        list: expected indices (in their original order) that are missing.
+    """
+    covered = set()
+    for item in items:
+        covered.update(item_indices(item, index_key))
+    return [index for index in expected_indices if int(index) not in covered]
+
+
 def extract_json_from_response(response_text: str, error_logging_func=None):
     """
     Attempts to extract and parse JSON data from a string,
@@ -28,6 +91,10 @@ def extract_json_from_response(response_text: str, error_logging_func=None):
     if fence_match:
         cleaned_json = fence_match.group(1).strip()
         error_logging_func("JSON Extraction: Removed markdown fences using regex.", level="DEBUG")
+    elif cleaned_json.startswith("```"):
+        # Truncated output can lose the closing fence; drop the opening one
+        cleaned_json = re.sub(r'^```(?:json)?\s*', '', cleaned_json).strip()
+        error_logging_func("JSON Extraction: Removed unclosed opening markdown fence.", level="DEBUG")
     else:
         # If regex didn't match fences, strip again just in case
         cleaned_json = cleaned_json.strip()
@@ -49,6 +116,14 @@ def extract_json_from_response(response_text: str, error_logging_func=None):
         # Log the exact string that failed initial parsing
         error_logging_func(f"Problematic JSON string for initial parse:\n---\n{cleaned_json[:1000]}...\n---", level="DEBUG")
 
+        # A cut-off array: keep every complete element rather than discarding the response
+        first_structure = re.search(r'[\[{]', cleaned_json)
+        if first_structure and first_structure.group(0) == '[':
+            items, complete = parse_json_array_incremental(cleaned_json[first_structure.start():])
+            if items and not complete:
+                error_logging_func(f"JSON Extraction: Response was truncated; recovered {len(items)} complete array element(s).", level="WARNING")
+                return items
+
         # Attempt to find JSON array or object using regex as a fallback
         # This regex looks for the first '{' or '[' and the last '}' or ']'
         json_match = re.search(r'(\{[\s\S]*\}|\[[\s\S]*\])', cleaned_json, re.DOTALL)
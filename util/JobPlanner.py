@@ -0,0 +1,283 @@
+# util/JobPlanner.py
+
+# This file contains the JobPlanner class, which is used to handle
+# dry-run estimates of AI jobs for the application.
+
+import math
+import os
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+import pandas as pd
+from PIL import Image
+
+# Rough characters-per-token ratio used for text estimates
+CHARS_PER_TOKEN = 4
+# Fallback per-request latency (seconds) when no latency has been recorded for a model
+DEFAULT_LATENCY_SECONDS = 20.0
+# Expected output tokens for jobs whose output is not proportional to their input text
+FIXED_OUTPUT_TOKENS = {
+    "Get_Names_and_Places": 150,
+    "Auto_Rotate": 50,
+}
+# Jobs the planner can estimate, mapped to whether they need a text source
+PLANNABLE_JOBS = {
+    "HTR": False,
+    "HTR_Correct": False,
+    "Correct_Text": True,
+    "Translation": True,
+    "Get_Names_and_Places": False,
+    "Auto_Rotate": False,
+}
+# Estimate fields added up across the volumes of a collection (volumes run one after another)
+SUMMED_ESTIMATE_KEYS = ("pages", "skipped_pages", "stale_skipped_pages", "blank_skipped_pages", "cheap_model_pages",
+                        "duplicate_pages", "locally_oriented_pages", "requests", "images", "input_tokens",
+                        "output_tokens", "wall_seconds")
+
+
+def estimate_text_tokens(text):
+    """Estimate the token count of a string using a fixed characters-per-token ratio."""
+    if not isinstance(text, str) or not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def estimate_image_tokens(engine, image_path):
+    """
+    Estimate the input tokens one image costs for the given engine.
+    Reads only the image header to get its size.
+    """
+    engine = engine.lower()
+    if "gemini" in engine:
+        return 258 # Gemini bills images at a flat rate
+    try:
+        with Image.open(image_path) as img:
+            width, height = img.size
+    except Exception:
+        width, height = 1500, 2000 # Typical scanned page
+    if "claude" in engine:
+        # Claude scales the long edge down to 1568px, then charges ~1 token per 750px
+        scale = min(1.0, 1568 / max(width, height))
+        return min(1600, math.ceil((width * scale) * (height * scale) / 750))
+    # OpenAI high detail: fit in 2048, short side to 768, then 170 tokens per 512px tile
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+class JobPlanner:
+    def __init__(self, app):
+        self.app = app # Store reference to the main application
+
+    def estimate_job(self, ai_job, all_or_one_flag, source_col=None):
+        """
+        Build a dry-run estimate for an AI job without sending any requests. In a
+        multi-volume collection, All Volumes adds up the estimates of every volume.
+
+        Returns:
+            dict: page counts, request count, input/output token estimates and projected wall time.
+        """
+        volumes = self.app.volumes
+        if all_or_one_flag != "All Volumes" or not volumes.is_open():
+            return self._estimate_loaded_pages(ai_job, "All Pages" if all_or_one_flag == "All Volumes" else all_or_one_flag, source_col)
+
+        estimates = []
+        volumes.for_each_volume(lambda: estimates.append(self._estimate_loaded_pages(ai_job, "All Pages", source_col)),
+                                "Estimate", announce=False)
+        if not estimates:
+            return self._estimate_loaded_pages(ai_job, "All Pages", source_col)
+        combined = dict(estimates[0])
+        for estimate in estimates[1:]:
+            for key, value in estimate.items():
+                if key in SUMMED_ESTIMATE_KEYS:
+                    combined[key] += value
+        combined["volumes"] = len(estimates)
+        return combined
+
+    def _estimate_loaded_pages(self, ai_job, all_or_one_flag, source_col=None):
+        """Estimate for the pages of the loaded project (or volume)."""
+        handler = self.app.ai_functions_handler
+        text_source = source_col if PLANNABLE_JOBS.get(ai_job) else None
+        # Estimates measure page text, which a lazily opened project may not have read yet
+        self.app.project_io.ensure_text_loaded(handler.job_text_columns(ai_job, text_source))
+        job_params = handler.setup_job_parameters(ai_job)
+        engine = job_params.get('engine', '')
+        cheap_engine = handler.cheap_model_params(job_params).get('engine', engine)
+
+        # The same page selection ai_function makes, without rotating anything
+        selection = handler.select_pages(ai_job, all_or_one_flag, text_source, dry_run=True)
+        if selection["error"]:
+            raise ValueError(selection["message"])
+        batch_df = selection["batch_df"]
+        cheap_model_indices = selection["cheap_model_indices"]
+        blank_skipped = len(selection["flagged_pages"]) if getattr(self.app.settings, 'blank_page_handling', "Off") == "Skip" else 0
+
+        # Prompt overhead is the same for every request
+        prompt_tokens = estimate_text_tokens(job_params.get('system_prompt', '')) + \
+            estimate_text_tokens(job_params.get('user_prompt', '').replace('{text_to_process}', ''))
+
+        # Typical transcription length, used for jobs that produce text from images only
+        existing_text = self.app.main_df['Original_Text'] if 'Original_Text' in self.app.main_df.columns else pd.Series(dtype=str)
+        existing_lengths = existing_text[existing_text.notna() & (existing_text != '')].str.len()
+        typical_page_tokens = math.ceil(existing_lengths.mean() / CHARS_PER_TOKEN) if not existing_lengths.empty else 500
+
+        image_token_cache = {}
+        image_count = 0
+        input_tokens = 0
+        output_tokens = 0
+
+        for index, row_data in batch_df.iterrows():
+            row_engine = cheap_engine if index in cheap_model_indices else engine
+            # Count the images get_images_for_job would attach, without encoding them
+            image_paths = []
+            if job_params.get('use_images', False):
+                neighbours = list(range(index - int(job_params.get('num_prev_images', 0)), index)) + \
+                    list(range(index + 1, index + 1 + int(job_params.get('num_after_images', 0))))
+                if job_params.get('current_image', "Yes") == "Yes":
+                    neighbours.append(index)
+                for page_index in neighbours:
+                    if 0 <= page_index < len(self.app.main_df):
+                        image_rel = self.app.main_df.loc[page_index].get('Image_Path', "")
+                        image_abs = self.app.get_full_path(image_rel) if image_rel else ""
+                        if image_abs and os.path.exists(image_abs):
+                            image_paths.append(image_abs)
+
+            for image_abs in image_paths:
+                if (row_engine, image_abs) not in image_token_cache:
+                    image_token_cache[(row_engine, image_abs)] = estimate_image_tokens(row_engine, image_abs)
+                input_tokens += image_token_cache[(row_engine, image_abs)]
+            image_count += len(image_paths)
+
+            if PLANNABLE_JOBS.get(ai_job):
+                text_tokens = estimate_text_tokens(row_data.get(source_col, ""))
+            elif ai_job == "Get_Names_and_Places":
+                text_tokens = estimate_text_tokens(self.app.data_operations.find_right_text(index))
+            else:
+                text_tokens = 0
+            input_tokens += prompt_tokens + text_tokens
+
+            if ai_job in FIXED_OUTPUT_TOKENS:
+                output_tokens += FIXED_OUTPUT_TOKENS[ai_job]
+            elif ai_job == "HTR_Correct":
+                output_tokens += typical_page_tokens * 2 # Raw and corrected text
+            elif text_tokens:
+                output_tokens += text_tokens
+            else:
+                output_tokens += typical_page_tokens
+
+        # Project wall time from recorded latency and the job's concurrency
+        request_count = len(batch_df)
+        concurrency = max(1, int(job_params.get('batch_size', 1) or 1))
+        latency_entry = getattr(self.app.settings, 'api_latency_stats', {}).get(engine, {})
+        latency_seconds = float(latency_entry.get('avg_seconds', 0)) or DEFAULT_LATENCY_SECONDS
+        waves = math.ceil(request_count / concurrency) if request_count else 0
+
+        return {
+            "ai_job": ai_job,
+            "engine": engine,
+            "cheap_engine": cheap_engine,
+            "volumes": 1,
+            "pages": request_count,
+            "skipped_pages": selection["skipped_completed"],
+            "stale_skipped_pages": selection["skipped_stale"],
+            "blank_skipped_pages": blank_skipped,
+            "cheap_model_pages": len(cheap_model_indices),
+            "duplicate_pages": len(selection["duplicate_of"]),
+            "locally_oriented_pages": len(selection["locally_oriented"]),
+            "requests": request_count,
+            "images": image_count,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "concurrency": concurrency,
+            "latency_seconds": latency_seconds,
+            "latency_samples": int(latency_entry.get('samples', 0)),
+            "wall_seconds": waves * latency_seconds,
+        }
+
+    def format_estimate(self, estimate):
+        """Render an estimate dict as readable lines for the planner window."""
+        minutes, seconds = divmod(int(round(estimate['wall_seconds'])), 60)
+        hours, minutes = divmod(minutes, 60)
+        latency_note = (f"{estimate['latency_seconds']:.1f}s avg over {estimate['latency_samples']} recorded request(s)"
+                        if estimate['latency_samples'] else f"{estimate['latency_seconds']:.0f}s default (no recorded latency)")
+        lines = [
+            f"Job: {estimate['ai_job'].replace('_', ' ')}",
+            f"Model: {estimate['engine']}",
+            "",
+            f"Pages to process: {estimate['pages']}" + (f" across {estimate['volumes']} volumes" if estimate['volumes'] > 1 else ""),
+            f"Pages skipped (already complete): {estimate['skipped_pages']}",
+        ]
+        # Selection filters that are in use
+        for key, label in [("stale_skipped_pages", "Pages skipped (up to date)"),
+                           ("blank_skipped_pages", "Pages skipped (blank or non-text)"),
+                           ("cheap_model_pages", f"Pages sent to the cheap model ({estimate['cheap_engine']})"),
+                           ("duplicate_pages", "Duplicate pages (results copied)"),
+                           ("locally_oriented_pages", "Pages oriented locally")]:
+            if estimate[key]:
+                lines.append(f"{label}: {estimate[key]}")
+        lines += [
+            f"API requests: {estimate['requests']}",
+            f"Images sent: {estimate['images']}",
+            "",
+            f"Estimated input tokens: {estimate['input_tokens']:,}",
+            f"Estimated output tokens: {estimate['output_tokens']:,}",
+            "",
+            f"Concurrent requests: {estimate['concurrency']}",
+            f"Latency per request: {latency_note}",
+            f"Projected wall time: {hours}h {minutes:02d}m {seconds:02d}s",
+        ]
+        return "\n".join(lines)
+
+    def create_job_plan_window(self):
+        """Window for choosing a job and viewing its dry-run estimate. Sends nothing."""
+        if self.app.main_df.empty:
+            messagebox.showinfo("No Data", "No pages are loaded to plan a job for.")
+            return
+
+        window = tk.Toplevel(self.app)
+        window.title("Estimate AI Job")
+        window.geometry("460x460")
+        window.grab_set()
+
+        options_frame = tk.Frame(window)
+        options_frame.pack(fill="x", padx=10, pady=10)
+
+        tk.Label(options_frame, text="Job:").grid(row=0, column=0, sticky="w", pady=2)
+        job_var = tk.StringVar(value="HTR")
+        job_dropdown = ttk.Combobox(options_frame, textvariable=job_var, values=list(PLANNABLE_JOBS.keys()), state="readonly", width=25)
+        job_dropdown.grid(row=0, column=1, sticky="w", padx=5, pady=2)
+
+        tk.Label(options_frame, text="Text Source:").grid(row=1, column=0, sticky="w", pady=2)
+        source_var = tk.StringVar(value="Original_Text")
+        source_dropdown = ttk.Combobox(options_frame, textvariable=source_var,
+                                       values=["Original_Text", "Corrected_Text", "Formatted_Text", "Translation", "Separated_Text"],
+                                       state="readonly", width=25)
+        source_dropdown.grid(row=1, column=1, sticky="w", padx=5, pady=2)
+
+        tk.Label(options_frame, text=f"Mode: {self.app.process_mode.get()}").grid(row=2, column=0, columnspan=2, sticky="w", pady=2)
+
+        result_text = tk.Text(window, height=16, width=55, wrap="word")
+        result_text.pack(fill="both", expand=True, padx=10, pady=5)
+
+        def refresh_estimate(event=None):
+            ai_job = job_var.get()
+            source_dropdown.config(state="readonly" if PLANNABLE_JOBS.get(ai_job) else "disabled")
+            try:
+                estimate = self.estimate_job(ai_job, self.app.process_mode.get(), source_var.get())
+                text = self.format_estimate(estimate)
+            except Exception as e:
+                self.app.error_logging(f"Error estimating job {ai_job}: {str(e)}", level="ERROR")
+                text = f"Could not estimate this job: {str(e)}"
+            result_text.config(state="normal")
+            result_text.delete("1.0", tk.END)
+            result_text.insert("1.0", text)
+            result_text.config(state="disabled")
+
+        job_dropdown.bind('<<ComboboxSelected>>', refresh_estimate)
+        source_dropdown.bind('<<ComboboxSelected>>', refresh_estimate)
+
+        tk.Button(window, text="Close", command=window.destroy).pack(pady=10)
+
+        refresh_estimate()
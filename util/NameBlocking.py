@@ -0,0 +1,224 @@
+# util/NameBlocking.py
+
+# This file contains the helper functions used to group spelling variants of
+# names and places locally before collation for the application.
+
+import re
+import unicodedata
+
+# Character n-gram length and the Jaccard similarity at which two variants share a block
+NGRAM_SIZE = 3
+NGRAM_SIMILARITY = 0.5
+# Looser similarity for the second pass over variants the first pass left on their own
+LOOSE_NGRAM_SIMILARITY = 0.35
+# N-grams shared by more variants than this are too common to suggest a match
+MAX_NGRAM_POSTINGS = 200
+# Most variants sent to the model in one collation request
+COLLATION_SHARD_MAX_ITEMS = 300
+# Abbreviated forms common in historical records, expanded before keying
+ABBREVIATIONS = {
+    "wm": "william", "jno": "john", "chas": "charles", "thos": "thomas", "geo": "george",
+    "jas": "james", "saml": "samuel", "benj": "benjamin", "richd": "richard", "robt": "robert",
+    "edwd": "edward", "danl": "daniel", "st": "saint", "ste": "sainte", "mt": "mount", "ft": "fort",
+}
+
+_SOUNDEX_CODES = {}
+for _letters, _digit in [("bfpv", "1"), ("cgjkqsxz", "2"), ("dt", "3"), ("l", "4"), ("mn", "5"), ("r", "6")]:
+    for _letter in _letters:
+        _SOUNDEX_CODES[_letter] = _digit
+
+
+def normalize_key(term):
+    """
+    Lowercase, strip accents and punctuation (keeping apostrophes so possessives
+    stay distinct) and collapse whitespace.
+    """
+    text = unicodedata.normalize('NFKD', term)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    text = re.sub(r"[^\w']+", " ", text)
+    return " ".join(text.split())
+
+
+def soundex(word):
+    """Classic four-character Soundex code of a single word ('' if it has no letters)."""
+    letters = [ch for ch in word.lower() if ch.isalpha()]
+    if not letters:
+        return ""
+    code = letters[0].upper()
+    previous = _SOUNDEX_CODES.get(letters[0], "")
+    for ch in letters[1:]:
+        digit = _SOUNDEX_CODES.get(ch, "")
+        if digit and digit != previous:
+            code += digit
+        if ch not in "hw":
+            previous = digit
+    return (code + "000")[:4]
+
+
+def expanded_key(term):
+    """Normalized key with common abbreviations (Wm., Jno., St., ...) written out."""
+    return " ".join(ABBREVIATIONS.get(word, word) for word in normalize_key(term).split())
+
+
+def phonetic_key(term):
+    """Soundex of every word in a term with abbreviations expanded, so word order and count must match."""
+    return " ".join(soundex(word) for word in expanded_key(term).split())
+
+
+def loose_phonetic_key(term):
+    """
+    Soundex digits of every consonant in each word, the first letter included,
+    so spellings that differ in their first letter (Quebec/Kebec) share a key.
+    """
+    codes = []
+    for word in expanded_key(term).split():
+        code = ""
+        previous = ""
+        for ch in word:
+            digit = _SOUNDEX_CODES.get(ch, "")
+            if digit and digit != previous:
+                code += digit
+            if ch not in "hw":
+                previous = digit
+        codes.append(code[:4])
+    return " ".join(codes) if any(codes) else ""
+
+
+def char_ngrams(term, size=NGRAM_SIZE):
+    """Set of character n-grams of the normalized term, padded so short words still match."""
+    padded = f" {normalize_key(term)} "
+    return {padded[i:i + size] for i in range(max(1, len(padded) - size + 1))}
+
+
+def build_blocks(items, key_functions=(normalize_key, expanded_key, phonetic_key), similarity=NGRAM_SIMILARITY):
+    """
+    Group spelling variants into blocks. Two variants share a block when any of
+    key_functions gives them the same key (by default the normalized key, the key
+    with abbreviations expanded and the phonetic key) or their character n-grams
+    reach the similarity threshold. Candidate pairs come from an inverted n-gram
+    index, so the work grows with the number of likely matches rather than with
+    every pair of variants.
+
+    Returns:
+        list: blocks (lists of the original variants), including single-variant
+        blocks that matched nothing.
+    """
+    items = sorted(set(item for item in items if isinstance(item, str) and item.strip()))
+    parent = list(range(len(items)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(a, b):
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    # Exact, expanded and phonetic keys (or whichever were given)
+    for key_function in key_functions:
+        first_by_key = {}
+        for i, item in enumerate(items):
+            key = key_function(item)
+            if key:
+                if key in first_by_key:
+                    union(first_by_key[key], i)
+                else:
+                    first_by_key[key] = i
+
+    # N-gram similarity via an inverted index
+    grams = [char_ngrams(item) for item in items]
+    postings = {}
+    for i, item_grams in enumerate(grams):
+        for gram in item_grams:
+            postings.setdefault(gram, []).append(i)
+    for i, item_grams in enumerate(grams):
+        shared = {}
+        for gram in item_grams:
+            members = postings[gram]
+            if len(members) > MAX_NGRAM_POSTINGS:
+                continue
+            for j in members:
+                if j > i:
+                    shared[j] = shared.get(j, 0) + 1
+        for j, count in shared.items():
+            if count / (len(item_grams) + len(grams[j]) - count) >= similarity:
+                union(i, j)
+
+    blocks = {}
+    for i, item in enumerate(items):
+        blocks.setdefault(find(i), []).append(item)
+    return list(blocks.values())
+
+
+def block_variants(items):
+    """
+    Block variants in two passes: build_blocks as usual, then a looser pass
+    (loose phonetic key, lower n-gram similarity) over the variants the first
+    pass left on their own, so pairs like Quebec/Kebec still meet.
+
+    Returns:
+        list: blocks, each variant in exactly one; variants neither pass
+        matched are single-variant blocks.
+    """
+    blocks = build_blocks(items)
+    leftovers = [block[0] for block in blocks if len(block) == 1]
+    return ([block for block in blocks if len(block) > 1]
+            + build_blocks(leftovers, key_functions=(loose_phonetic_key,), similarity=LOOSE_NGRAM_SIMILARITY))
+
+
+def preferred_form(variants):
+    """
+    Pick the display form among variants that differ only in case, accents or
+    punctuation: mixed case ahead of all caps, then the most capitalised words.
+    """
+    return sorted(variants, key=lambda v: (v.isupper(), -sum(word[:1].isupper() for word in v.split()),
+                                            -sum(not ch.isascii() for ch in v), len(v), v))[0]
+
+
+def split_blocks(blocks):
+    """
+    Separate blocks that can be collated locally from ambiguous blocks that need
+    the model. A single-variant block is its own canonical form and needs no
+    entry; a block whose variants all share a normalized key is resolved to its
+    preferred form; only blocks whose variants' keys differ are ambiguous.
+
+    Returns:
+        tuple: ({correct: [variants]} resolved locally, list of ambiguous blocks)
+    """
+    resolved = {}
+    ambiguous = []
+    for block in blocks:
+        if len(block) < 2:
+            continue
+        if len({normalize_key(item) for item in block}) == 1:
+            correct = preferred_form(block)
+            resolved[correct] = sorted(item for item in block if item != correct)
+        else:
+            ambiguous.append(block)
+    return resolved, ambiguous
+
+
+def shard_blocks(blocks, max_items=COLLATION_SHARD_MAX_ITEMS):
+    """
+    Pack whole blocks into shards of at most max_items variants (an oversized
+    block gets its own shard), so candidate variants are always judged together.
+    """
+    shards = []
+    current = []
+    for block in sorted(blocks, key=len, reverse=True):
+        if current and len(current) + len(block) > max_items:
+            shards.append(current)
+            current = []
+        current.extend(block)
+    if current:
+        shards.append(current)
+    return shards
+
+
+def format_collation_lines(collation_dict):
+    """Render a collation dict in the 'correct = variant1; variant2' form the collation window reads."""
+    lines = [f"{correct} = {'; '.join(variants)}" for correct, variants in sorted(collation_dict.items(), key=lambda kv: kv[0].lower()) if variants]
+    return "Response:\n" + "\n".join(lines) if lines else ""
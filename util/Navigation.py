@@ -18,12 +18,25 @@ class NavigationHandler:
             if current_display_val != "None":
                 text = self.app.data_operations.clean_text(self.app.text_display.get("1.0", tk.END))
                 if current_display_val in ["Original_Text", "Corrected_Text", "Formatted_Text", "Translation", "Separated_Text"]:
-                    self.app.main_df.loc[self.app.page_counter, current_display_val] = text
+                    self.app.data_operations.store_edit(self.app.page_counter, current_display_val, text)
         # --- End Save ---
 
         # Store the current display type before potentially changing the page
         selected_display = self.app.text_display_var.get()
 
+        # In a multi-volume collection, moving past either end of a volume continues in the next one
+        volumes = self.app.volumes
+        if volumes.is_open():
+            if abs(direction) == 2:
+                # Nothing to show when no volume has pages
+                if volumes.total_pages() > 0:
+                    volumes.go_to_global_page(0 if direction < 0 else volumes.total_pages() - 1)
+                return
+            new_counter = self.app.page_counter + direction
+            if not 0 <= new_counter < len(self.app.main_df):
+                volumes.step_volume(direction)
+                return
+
         # Handle navigation logic
         if abs(direction) == 2:
             if direction < 0: self.app.page_counter = 0
@@ -52,7 +65,11 @@ class NavigationHandler:
         else:
             total_images = len(self.app.main_df) - 1 # Index is 0-based
 
-        if total_images >= 0:
+        # In a multi-volume collection the counter shows the page's global position
+        volume_text = self.app.volumes.counter_text(self.app.page_counter, total_images + 1) if hasattr(self.app, 'volumes') else None
+        if volume_text:
+            self.app.page_counter_var.set(volume_text)
+        elif total_images >= 0:
             self.app.page_counter_var.set(f"{self.app.page_counter + 1} / {total_images + 1}")
         else:
             self.app.page_counter_var.set("0 / 0")
@@ -129,10 +146,10 @@ class NavigationHandler:
                 if current_display != "None":
                     text = self.app.data_operations.clean_text(self.app.text_display.get("1.0", tk.END))
                     if current_display in ["Original_Text", "Corrected_Text", "Formatted_Text", "Translation", "Separated_Text"]:
-                        self.app.main_df.loc[self.app.page_counter, current_display] = text
+                        self.app.data_operations.store_edit(self.app.page_counter, current_display, text)
                 # Save relevance
                 if hasattr(self.app, 'relevance_var') and 'Relevance' in self.app.main_df.columns:
-                     self.app.main_df.loc[self.app.page_counter, 'Relevance'] = self.app.relevance_var.get()
+                     self.app.data_operations.store_edit(self.app.page_counter, 'Relevance', self.app.relevance_var.get())
             # --- End Save ---
 
             # Navigate
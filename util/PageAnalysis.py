@@ -0,0 +1,625 @@
+# util/PageAnalysis.py
+
+# This file contains the PageAnalyzer class, which is used to handle
+# local (non-API) analysis of page images for the application.
+
+import hashlib
+import os
+import tkinter as tk
+from concurrent.futures import ProcessPoolExecutor
+from tkinter import ttk, messagebox
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from util.Provenance import hash_file
+
+# Long edge (px) pages are downscaled to before any statistics are taken
+ANALYSIS_MAX_SIDE = 600
+# Fraction of each edge ignored so gutters, shadows and scanner borders don't count as ink
+MARGIN_FRACTION = 0.06
+# Below both of these a page is treated as blank
+BLANK_INK_RATIO = 0.003
+BLANK_EDGE_RATIO = 0.005
+# Above this fraction of strongly saturated foreground pixels a page is treated as a colour chart/plate
+NON_TEXT_COLOUR_RATIO = 0.20
+# Saturation a foreground pixel needs, absolute and above the paper's own (tinted, yellowed or sepia paper is saturated too)
+COLOUR_SATURATION = 90
+COLOUR_SATURATION_ABOVE_BACKGROUND = 60
+# A projection-profile score (see _line_direction_scores) at or above this means the page has text lines
+TEXT_LINE_PROFILE_SCORE = 0.5
+
+# Cache of results keyed on (path, size, mtime) so unchanged images are analysed once
+_content_cache = {}
+
+# Padding (fraction of the long edge) kept around a detected text region
+CONTENT_BOX_PADDING = 0.02
+# Crops that keep more than this fraction of the page area aren't worth sending separately
+CONTENT_BOX_MIN_SAVING = 0.90
+# Cache of content boxes keyed on (path, size, mtime)
+_content_box_cache = {}
+
+# Column holding each page's perceptual hash as "<dhash hex>:<file size>"
+IMAGE_HASH_COLUMN = "Image_Hash"
+# Pages whose 64-bit difference hashes differ in at most this many bits are duplicate candidates
+DUPLICATE_HASH_DISTANCE = 6
+# A candidate pair is only a duplicate if its files are identical or its 256-bit (16x16)
+# difference hashes differ in at most this many bits; forms and ledger pages that share a
+# layout but hold different handwriting pass the coarse hash and fail this one
+DUPLICATE_CONFIRM_HASH_SIZE = 16
+DUPLICATE_CONFIRM_DISTANCE = 2
+
+
+def load_downscaled_image(image_path, max_side=ANALYSIS_MAX_SIDE):
+    """Read an image with OpenCV and shrink it so its long edge is at most max_side."""
+    image = cv2.imread(image_path)
+    if image is None:
+        return None
+    height, width = image.shape[:2]
+    scale = min(1.0, max_side / max(height, width))
+    if scale < 1.0:
+        image = cv2.resize(image, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+    return image
+
+
+def analyze_page_content(image_path):
+    """
+    Compute ink density, edge density and colour saturation on a downscaled page
+    and classify it as text, blank or non-text. Colour is measured only on pixels
+    that stand out from the page background, and a page whose ink forms text lines
+    is never called non-text, so toned paper and sepia scans stay text pages.
+
+    Module-level so it can run in a process pool.
+
+    Returns:
+        dict: {"path", "ink_ratio", "edge_ratio", "colour_ratio", "classification"}
+              where classification is "text", "blank", "non_text" or "unreadable".
+    """
+    result = {"path": image_path, "ink_ratio": 0.0, "edge_ratio": 0.0, "colour_ratio": 0.0, "classification": "unreadable"}
+    image = load_downscaled_image(image_path)
+    if image is None:
+        return result
+
+    height, width = image.shape[:2]
+    margin_y, margin_x = int(height * MARGIN_FRACTION), int(width * MARGIN_FRACTION)
+    image = image[margin_y:height - margin_y, margin_x:width - margin_x]
+    if image.size == 0:
+        return result
+
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    # Paper tone varies between volumes, so measure ink relative to the page's own background
+    background = float(np.median(gray))
+    ink_mask = gray < (background - 50)
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (3, 3), 0), 50, 150)
+    saturation = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)[:, :, 1].astype(np.int16)
+    # Remove the page background: a pixel only counts as colour if it is well above the paper's own saturation
+    background_saturation = float(np.median(saturation))
+    colourful = saturation > max(COLOUR_SATURATION, background_saturation + COLOUR_SATURATION_ABOVE_BACKGROUND)
+
+    result["ink_ratio"] = float(np.count_nonzero(ink_mask)) / ink_mask.size
+    result["edge_ratio"] = float(np.count_nonzero(edges)) / edges.size
+    result["colour_ratio"] = float(np.count_nonzero(colourful)) / colourful.size
+
+    if result["ink_ratio"] < BLANK_INK_RATIO and result["edge_ratio"] < BLANK_EDGE_RATIO:
+        result["classification"] = "blank"
+    elif result["colour_ratio"] > NON_TEXT_COLOUR_RATIO and max(_line_direction_scores(ink_mask.astype(np.uint8))) < TEXT_LINE_PROFILE_SCORE:
+        result["classification"] = "non_text"
+    else:
+        result["classification"] = "text"
+    return result
+
+
+def _line_direction_scores(ink):
+    """
+    Score how strongly ink forms horizontal vs vertical lines.
+    Text lines give a row (or column) projection profile that alternates between
+    ink and gaps, so its coefficient of variation is high along the line direction.
+    """
+    kernel = np.ones(5) / 5
+    scores = []
+    for axis in (1, 0): # axis=1 -> row profile (horizontal lines), axis=0 -> column profile (vertical lines)
+        profile = np.convolve(ink.sum(axis=axis).astype(float), kernel, mode='same')
+        mean = profile.mean()
+        scores.append(float(profile.var() / (mean * mean)) if mean > 0 else 0.0)
+    return scores[0], scores[1]
+
+
+def _hough_direction_weights(ink):
+    """Total length of Hough line segments within 15 degrees of horizontal and of vertical."""
+    # Smear characters into line-like blobs so Hough picks up text lines rather than strokes
+    merged = cv2.dilate(ink, np.ones((3, 3), np.uint8), iterations=1)
+    min_length = max(20, min(ink.shape) // 8)
+    lines = cv2.HoughLinesP(merged, 1, np.pi / 180, threshold=60, minLineLength=min_length, maxLineGap=8)
+    horizontal = vertical = 0.0
+    if lines is not None:
+        # HoughLinesP returns (N, 1, 4) in OpenCV 4 and (N, 4) in later versions
+        for x1, y1, x2, y2 in lines.reshape(-1, 4):
+            angle = abs(np.degrees(np.arctan2(y2 - y1, x2 - x1))) % 180
+            length = float(np.hypot(x2 - x1, y2 - y1))
+            if angle < 15 or angle > 165:
+                horizontal += length
+            elif 75 < angle < 105:
+                vertical += length
+    return horizontal, vertical
+
+
+def _upright_score(ink):
+    """
+    For an image whose text lines run horizontally, compare ink above and below each
+    line's x-height core. Latin scripts have more ascenders and capitals than descenders,
+    so upright text scores positive and upside-down text negative.
+
+    Returns:
+        tuple: (score in [-1, 1], number of text lines measured)
+    """
+    profile = ink.sum(axis=1).astype(float)
+    if profile.max() <= 0:
+        return 0.0, 0
+    in_line = profile > (0.15 * profile.max())
+    above = below = 0.0
+    line_count = 0
+    row = 0
+    while row < len(in_line):
+        if not in_line[row]:
+            row += 1
+            continue
+        start = row
+        while row < len(in_line) and in_line[row]:
+            row += 1
+        band = profile[start:row]
+        if len(band) < 4:
+            continue
+        core = np.where(band > 0.5 * band.max())[0]
+        above += band[:core[0]].sum()
+        below += band[core[-1] + 1:].sum()
+        line_count += 1
+    total = above + below
+    return (float((above - below) / total) if total > 0 else 0.0), line_count
+
+
+def estimate_orientation(image_path):
+    """
+    Estimate the rotation needed to make a page upright using projection profiles
+    and Hough line angles on a downscaled, binarised image.
+
+    Module-level so it can run in a process pool.
+
+    Returns:
+        dict: {"path", "angle", "confidence"} where angle is the counter-clockwise
+              correction (0, 90, -90 or 180, as used by ImageHandler.rotate_image)
+              or None if no estimate could be made, and confidence is in [0, 1].
+    """
+    result = {"path": image_path, "angle": None, "confidence": 0.0}
+    image = load_downscaled_image(image_path, max_side=1000)
+    if image is None:
+        return result
+
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    if np.count_nonzero(ink) / ink.size < BLANK_INK_RATIO:
+        return result # Blank page, nothing to orient by
+    ink = (ink > 0).astype(np.uint8)
+
+    # 1) Are the text lines horizontal or vertical?
+    score_h, score_v = _line_direction_scores(ink)
+    hough_h, hough_v = _hough_direction_weights(ink * 255)
+    lines_horizontal = score_h >= score_v
+    ratio = max(score_h, score_v) / max(min(score_h, score_v), 1e-6)
+    direction_confidence = float(np.clip((ratio - 1.0) / 2.0, 0.0, 1.0))
+    if (hough_h + hough_v) > 0 and (hough_h >= hough_v) != lines_horizontal:
+        direction_confidence *= 0.5 # Profiles and Hough disagree
+
+    # 2) Which way up? Turn vertical lines horizontal first (np.rot90 is counter-clockwise)
+    upright_ink = ink if lines_horizontal else np.rot90(ink, k=1)
+    score, line_count = _upright_score(upright_ink)
+    upright_confidence = float(np.clip(abs(score) / 0.25, 0.0, 1.0))
+    if line_count < 3:
+        upright_confidence *= 0.5 # Too few lines to trust the ascender/descender balance
+
+    if lines_horizontal:
+        result["angle"] = 0 if score >= 0 else 180
+    else:
+        result["angle"] = 90 if score >= 0 else -90
+    result["confidence"] = min(direction_confidence, upright_confidence)
+    return result
+
+
+def _estimate_orientation_or_none(image_path):
+    """
+    estimate_orientation, with any error turned into a no-estimate result (and
+    its message under "error") so the page falls through to the model.
+    Module-level so it can run in a process pool.
+    """
+    try:
+        return estimate_orientation(image_path)
+    except Exception as e:
+        return {"path": image_path, "angle": None, "confidence": 0.0, "error": str(e)}
+
+
+def detect_content_box(image_path):
+    """
+    Find the text region of a page, ignoring margins, book cradles, rulers and
+    colour targets. Like ImageSplitter.crop_to_largest_white_area, the page is
+    taken as the largest bright contour; the box is then tightened to the ink
+    inside it. Detection runs on a downscaled copy and is cached per file version.
+
+    Returns:
+        tuple: (x, y, w, h) in full-resolution pixels, or None if no useful crop was found.
+    """
+    try:
+        stat = os.stat(image_path)
+    except OSError:
+        return None
+    cache_key = (image_path, stat.st_size, stat.st_mtime_ns)
+    if cache_key in _content_box_cache:
+        return _content_box_cache[cache_key]
+
+    box = None
+    image = cv2.imread(image_path)
+    if image is not None:
+        full_height, full_width = image.shape[:2]
+        scale = min(1.0, ANALYSIS_MAX_SIDE / max(full_height, full_width))
+        small = cv2.resize(image, (int(full_width * scale), int(full_height * scale)), interpolation=cv2.INTER_AREA) if scale < 1.0 else image
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        height, width = gray.shape
+
+        # 1) The page: largest bright region
+        _, bright = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        contours, _ = cv2.findContours(bright, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        page_x, page_y, page_w, page_h = 0, 0, width, height
+        if contours:
+            page_x, page_y, page_w, page_h = cv2.boundingRect(max(contours, key=cv2.contourArea))
+
+        # 2) The text: ink inside the page, ignoring a thin border where the page edge casts shadow
+        inset = int(max(page_w, page_h) * MARGIN_FRACTION / 2)
+        page = gray[page_y + inset:page_y + page_h - inset, page_x + inset:page_x + page_w - inset]
+        if page.size:
+            background = float(np.median(page))
+            ink = (page < (background - 50)).astype(np.uint8)
+            # Merge characters into blocks so isolated specks don't stretch the box
+            ink = cv2.morphologyEx(ink, cv2.MORPH_OPEN, np.ones((2, 2), np.uint8))
+            ink = cv2.dilate(ink, np.ones((9, 9), np.uint8), iterations=1)
+            points = cv2.findNonZero(ink)
+            if points is not None:
+                x, y, w, h = cv2.boundingRect(points)
+                x, y = x + page_x + inset, y + page_y + inset
+                pad = int(max(width, height) * CONTENT_BOX_PADDING)
+                x0, y0 = max(0, x - pad), max(0, y - pad)
+                x1, y1 = min(width, x + w + pad), min(height, y + h + pad)
+                if (x1 - x0) * (y1 - y0) < CONTENT_BOX_MIN_SAVING * width * height:
+                    box = (int(x0 / scale), int(y0 / scale),
+                           min(full_width, int((x1 - x0) / scale)), min(full_height, int((y1 - y0) / scale)))
+
+    _content_box_cache[cache_key] = box
+    return box
+
+
+def compute_dhash(image_path, hash_size=8):
+    """
+    64-bit difference hash of an image: compares neighbouring pixels of a tiny
+    greyscale thumbnail, so re-shoots and re-encodes of a page hash (almost) the same.
+
+    Module-level so it can run in a process pool.
+
+    Returns:
+        str: hex hash of hash_size * hash_size bits, or '' if the image cannot be read.
+    """
+    image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        return ""
+    thumb = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (thumb[:, 1:] > thumb[:, :-1]).flatten()
+    return f"{int(''.join('1' if bit else '0' for bit in bits), 2):0{hash_size * hash_size // 4}x}"
+
+
+class PageAnalyzer:
+    def __init__(self, app):
+        self.app = app # Store reference to the main application
+        # index -> analysis result for pages flagged during the last HTR run
+        self.flagged_pages = {}
+
+    def _primary_image_path(self, image_path):
+        """Resolve the first image of a row (documents may hold a list of images)."""
+        if isinstance(image_path, list):
+            image_path = image_path[0] if image_path else ""
+        return self.app.get_full_path(image_path) if isinstance(image_path, str) and image_path.strip() else ""
+
+    def get_content_crop(self, image_path):
+        """
+        Return the path of a cached crop of the page's text region for sending to
+        a vision model. The project image is never modified; if no useful crop is
+        found (or anything fails) the original path is returned.
+        """
+        try:
+            file_info = self.app.image_files.stat(image_path)
+            if file_info is None:
+                return image_path
+            size, mtime_ns = file_info
+            cache_dir = os.path.join(self.app.temp_directory, "crop_cache")
+            key = hashlib.sha1(f"{os.path.abspath(image_path)}|{size}|{mtime_ns}".encode('utf-8')).hexdigest()[:20]
+            crop_path = os.path.join(cache_dir, f"{key}.jpg")
+            if os.path.exists(crop_path):
+                return crop_path
+
+            box = detect_content_box(image_path)
+            if box is None:
+                return image_path
+            x, y, w, h = box
+            with Image.open(image_path) as img:
+                cropped = img.convert("RGB").crop((x, y, x + w, y + h))
+            os.makedirs(cache_dir, exist_ok=True)
+            cropped.save(crop_path, "JPEG", quality=95)
+            return crop_path
+        except Exception as e:
+            self.app.error_logging(f"Could not crop content region of {image_path}: {e}", level="WARNING")
+            return image_path
+
+    def classify_pages(self, batch_df):
+        """
+        Run the local content classifier over every page image in batch_df.
+        Cached results are reused; the rest are analysed in a process pool.
+
+        Returns:
+            dict: index -> analysis result for pages classified as blank or non-text.
+        """
+        results = {}
+        pending = {}
+        for index, row_data in batch_df.iterrows():
+            image_abs = self._primary_image_path(row_data.get('Image_Path', ""))
+            if not image_abs or not self.app.image_files.exists(image_abs):
+                continue
+            stat = os.stat(image_abs)
+            cache_key = (image_abs, stat.st_size, stat.st_mtime_ns)
+            if cache_key in _content_cache:
+                results[index] = _content_cache[cache_key]
+            else:
+                pending[index] = cache_key
+
+        if pending:
+            paths = [cache_key[0] for cache_key in pending.values()]
+            try:
+                with ProcessPoolExecutor() as executor:
+                    analyses = list(executor.map(analyze_page_content, paths, chunksize=8))
+            except Exception as e:
+                # Fall back to in-process analysis if worker processes cannot be started
+                self.app.error_logging(f"Process pool unavailable for page analysis, running serially: {e}", level="WARNING")
+                analyses = [analyze_page_content(path) for path in paths]
+            for (index, cache_key), analysis in zip(pending.items(), analyses):
+                _content_cache[cache_key] = analysis
+                results[index] = analysis
+
+        flagged = {index: analysis for index, analysis in results.items()
+                   if analysis["classification"] in ("blank", "non_text")}
+        self.app.error_logging(f"Local page analysis: {len(flagged)} of {len(results)} pages flagged as blank or non-text", level="INFO")
+        return flagged
+
+    def update_image_hashes(self):
+        """
+        Incrementally fill the Image_Hash column of main_df. Only pages with no hash,
+        or whose image file size changed since it was hashed (e.g. after rotation),
+        are hashed, in a process pool.
+        """
+        df = self.app.main_df
+        if df.empty:
+            return
+        if IMAGE_HASH_COLUMN not in df.columns:
+            df[IMAGE_HASH_COLUMN] = ""
+
+        pending = {}
+        for index, row_data in df.iterrows():
+            image_abs = self._primary_image_path(row_data.get('Image_Path', ""))
+            if not image_abs or not self.app.image_files.exists(image_abs):
+                continue
+            file_size = os.path.getsize(image_abs)
+            stored = str(row_data.get(IMAGE_HASH_COLUMN, "") or "")
+            if stored.rpartition(":")[2] != str(file_size):
+                pending[index] = (image_abs, file_size)
+
+        if not pending:
+            return
+        paths = [image_abs for image_abs, _ in pending.values()]
+        try:
+            with ProcessPoolExecutor() as executor:
+                hashes = list(executor.map(compute_dhash, paths, chunksize=16))
+        except Exception as e:
+            self.app.error_logging(f"Process pool unavailable for image hashing, running serially: {e}", level="WARNING")
+            hashes = [compute_dhash(path) for path in paths]
+        for (index, (_, file_size)), dhash in zip(pending.items(), hashes):
+            df.at[index, IMAGE_HASH_COLUMN] = f"{dhash}:{file_size}" if dhash else ""
+        self.app.error_logging(f"Hashed {len(pending)} page image(s) for duplicate detection", level="INFO")
+
+    def _confirm_duplicate(self, df, first, second, fine_hashes):
+        """
+        Stricter check of a candidate pair found by the coarse hash: identical image
+        files, or fine difference hashes within DUPLICATE_CONFIRM_DISTANCE bits.
+        """
+        paths = [self._primary_image_path(df.at[index, 'Image_Path']) for index in (first, second)]
+        if not all(paths):
+            return False
+        first_info, second_info = (self.app.image_files.stat(path) for path in paths)
+        # Only files of equal size can be identical, so only those are read
+        if first_info and second_info and first_info[0] == second_info[0]:
+            first_file_hash = hash_file(paths[0])
+            if first_file_hash and first_file_hash == hash_file(paths[1]):
+                return True
+        for index, path in zip((first, second), paths):
+            if index not in fine_hashes:
+                fine_hashes[index] = compute_dhash(path, DUPLICATE_CONFIRM_HASH_SIZE)
+        if not fine_hashes[first] or not fine_hashes[second]:
+            return False
+        return bin(int(fine_hashes[first], 16) ^ int(fine_hashes[second], 16)).count("1") <= DUPLICATE_CONFIRM_DISTANCE
+
+    def find_duplicate_groups(self, batch_df=None):
+        """
+        Group near-duplicate pages by perceptual hash. Hashes are split into eight
+        8-bit bands and only pages sharing a band are compared, so this stays fast on
+        large projects while still finding every pair within DUPLICATE_HASH_DISTANCE bits.
+        Each candidate pair must then pass _confirm_duplicate, and every page in a
+        group is confirmed against the group's representative itself.
+
+        Returns:
+            dict: representative index (first page of the group) -> list of duplicate indices.
+        """
+        self.update_image_hashes()
+        df = self.app.main_df if batch_df is None else self.app.main_df.loc[batch_df.index]
+        if df.empty or IMAGE_HASH_COLUMN not in df.columns:
+            return {}
+
+        hashes = {}
+        for index, value in df[IMAGE_HASH_COLUMN].items():
+            dhash = str(value or "").partition(":")[0]
+            if dhash:
+                hashes[index] = int(dhash, 16)
+
+        buckets = {}
+        for index, value in hashes.items():
+            for band in range(8):
+                buckets.setdefault((band, (value >> (band * 8)) & 0xFF), []).append(index)
+
+        # Candidate pairs within the coarse distance threshold
+        candidates = {}
+        for members in buckets.values():
+            for i, first in enumerate(members):
+                for second in members[i + 1:]:
+                    if bin(hashes[first] ^ hashes[second]).count("1") <= DUPLICATE_HASH_DISTANCE:
+                        low, high = min(first, second), max(first, second)
+                        candidates.setdefault(high, set()).add(low)
+
+        # Each page joins the earliest representative it is confirmed against directly,
+        # so a chain of similar pages never links two pages that differ
+        fine_hashes = {}
+        groups = {}
+        representative_of = {}
+        for index in sorted(hashes):
+            for earlier in sorted(candidates.get(index, ())):
+                if earlier in groups and self._confirm_duplicate(df, earlier, index, fine_hashes):
+                    groups[earlier].append(index)
+                    representative_of[index] = earlier
+                    break
+            if index not in representative_of:
+                groups[index] = []
+        return {representative: members for representative, members in groups.items() if members}
+
+    def show_duplicate_pages_window(self):
+        """List groups of near-duplicate pages; double-click a row to view the page."""
+        if self.app.main_df.empty:
+            messagebox.showinfo("No Data", "No pages are loaded.")
+            return
+        groups = self.find_duplicate_groups()
+        if not groups:
+            messagebox.showinfo("Duplicate Pages", "No near-duplicate pages were found.")
+            return
+
+        window = tk.Toplevel(self.app)
+        window.title("Duplicate Pages")
+        window.geometry("420x400")
+
+        duplicate_count = sum(len(members) for members in groups.values())
+        explanation = tk.Label(window,
+                               text=f"{duplicate_count} page(s) look like duplicates of another page. "
+                                    "With duplicate skipping on, AI jobs process the first page of each group and copy its results. "
+                                    "Double-click a page to review it.",
+                               wraplength=380, justify=tk.LEFT)
+        explanation.pack(anchor="w", padx=10, pady=10)
+
+        tree_frame = tk.Frame(window)
+        tree_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        tree = ttk.Treeview(tree_frame, columns=("Page", "Duplicate Of"), show="headings", selectmode="browse")
+        for column, width in [("Page", 120), ("Duplicate Of", 160)]:
+            tree.heading(column, text=column)
+            tree.column(column, width=width)
+        tree.pack(fill="both", expand=True, side="left")
+        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
+        scrollbar.pack(side="right", fill="y")
+        tree.config(yscrollcommand=scrollbar.set)
+
+        for representative in sorted(groups):
+            for index in groups[representative]:
+                tree.insert("", "end", iid=str(index), values=(index + 1, representative + 1))
+
+        def go_to_page(event=None):
+            selection = tree.selection()
+            if selection and int(selection[0]) < len(self.app.main_df):
+                self.app.page_counter = int(selection[0])
+                self.app.current_doc_page_index = 0
+                self.app.refresh_display()
+
+        tree.bind('<Double-1>', go_to_page)
+        tk.Button(window, text="Close", command=window.destroy).pack(pady=(0, 10))
+
+    def estimate_orientations(self, batch_df):
+        """
+        Run the local orientation estimator over the single-image pages in batch_df
+        in a process pool.
+
+        Returns:
+            dict: index -> estimate dict from estimate_orientation.
+        """
+        paths = {}
+        for index, row_data in batch_df.iterrows():
+            image_path = row_data.get('Image_Path', "")
+            if not isinstance(image_path, str) or not image_path.strip():
+                continue # Multi-image documents are left to the LLM
+            image_abs = self.app.get_full_path(image_path)
+            if image_abs and self.app.image_files.exists(image_abs):
+                paths[index] = image_abs
+
+        if not paths:
+            return {}
+        try:
+            with ProcessPoolExecutor() as executor:
+                estimates = list(executor.map(_estimate_orientation_or_none, paths.values(), chunksize=8))
+        except Exception as e:
+            self.app.error_logging(f"Process pool unavailable for orientation estimates, running serially: {e}", level="WARNING")
+            estimates = [_estimate_orientation_or_none(path) for path in paths.values()]
+        for estimate in estimates:
+            if estimate.get("error"):
+                self.app.error_logging(f"Local orientation estimate failed for {estimate['path']}, leaving it to the model: "
+                                       f"{estimate['error']}", level="WARNING")
+        return dict(zip(paths.keys(), estimates))
+
+    def show_flagged_pages_window(self, flagged_pages, handling):
+        """Review list of pages the local classifier flagged; double-click a row to view the page."""
+        if not flagged_pages:
+            return
+
+        window = tk.Toplevel(self.app)
+        window.title("Blank / Non-Text Pages")
+        window.geometry("520x400")
+
+        action_text = "were skipped" if handling == "Skip" else "were sent to the cheap model"
+        explanation = tk.Label(window,
+                               text=f"{len(flagged_pages)} page(s) looked blank or non-text and {action_text}. "
+                                    "Double-click a page to review it; run Recognize Text on the current page to transcribe it anyway.",
+                               wraplength=480, justify=tk.LEFT)
+        explanation.pack(anchor="w", padx=10, pady=10)
+
+        tree_frame = tk.Frame(window)
+        tree_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        tree = ttk.Treeview(tree_frame, columns=("Page", "Classification", "Ink", "Edges"), show="headings", selectmode="browse")
+        for column, width in [("Page", 80), ("Classification", 140), ("Ink", 100), ("Edges", 100)]:
+            tree.heading(column, text=column)
+            tree.column(column, width=width)
+        tree.pack(fill="both", expand=True, side="left")
+        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
+        scrollbar.pack(side="right", fill="y")
+        tree.config(yscrollcommand=scrollbar.set)
+
+        for index in sorted(flagged_pages):
+            analysis = flagged_pages[index]
+            tree.insert("", "end", iid=str(index), values=(
+                index + 1,
+                "Blank" if analysis["classification"] == "blank" else "Non-text (colour)",
+                f"{analysis['ink_ratio'] * 100:.2f}%",
+                f"{analysis['edge_ratio'] * 100:.2f}%"))
+
+        def go_to_page(event=None):
+            selection = tree.selection()
+            if selection and int(selection[0]) < len(self.app.main_df):
+                self.app.page_counter = int(selection[0])
+                self.app.current_doc_page_index = 0
+                self.app.refresh_display()
+
+        tree.bind('<Double-1>', go_to_page)
+        tk.Button(window, text="Close", command=window.destroy).pack(pady=(0, 10))
@@ -0,0 +1,212 @@
+# util/PageTable.py
+
+# This file contains the functions used to keep the in-memory page table (main_df)
+# compact, to take copy-on-write snapshots of it and to report its memory use for the application.
+
+import sys
+import warnings
+import numpy as np
+import pandas as pd
+from util.ProjectStore import LARGE_TEXT_COLUMNS
+
+# Pointer size of one cell of an object column
+_POINTER_BYTES = np.dtype(object).itemsize
+
+# Enumerated columns kept as categoricals, with the values the app writes to them
+# (values found in a project are added to these)
+ENUMERATED_COLUMNS = {
+    "Text_Toggle": ["None", "Original_Text", "Corrected_Text", "Formatted_Text", "Translation", "Separated_Text"],
+    "Relevance": ["", "Relevant", "Partially Relevant", "Irrelevant", "Uncertain"],
+}
+
+
+def _is_missing(value):
+    return value is None or value is pd.NA or (isinstance(value, float) and np.isnan(value))
+
+
+def _holds_python_strings(series):
+    """Whether series stores one Python object per cell: object dtype or a python-backed string dtype."""
+    if series.dtype == object:
+        return True
+    return isinstance(series.dtype, pd.StringDtype) and series.dtype.storage == "python"
+
+
+def compact_column(series):
+    """
+    Return series with equal values sharing one Python object each, or series
+    itself if it has no repeated values, holds unhashable values (such as lists
+    of image paths) or stores its strings in Arrow buffers already. The dtype
+    and the values are unchanged.
+    """
+    if not _holds_python_strings(series) or len(series) < 2:
+        return series
+    try:
+        codes, uniques = pd.factorize(series)
+    except TypeError:
+        return series
+    if len(uniques) == len(series):
+        return series
+    # Missing values (NaN / None) get no code and are kept as they were
+    values = series.to_numpy(dtype=object).copy()
+    present = codes >= 0
+    values[present] = np.asarray(uniques, dtype=object)[codes[present]]
+    return pd.Series(pd.array(values, dtype=series.dtype), index=series.index, name=series.name)
+
+
+def categorical_column(series, known_values=()):
+    """
+    Return series as a categorical whose categories are known_values plus every
+    other value in it, or series itself if it holds anything but strings and
+    missing values (or is categorical already).
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series
+    values = series.to_numpy(dtype=object)
+    found = set()
+    for value in values:
+        if isinstance(value, str):
+            found.add(value)
+        elif not _is_missing(value):
+            return series
+    categories = list(known_values) + sorted(found.difference(known_values))
+    return pd.Series(pd.Categorical(values, categories=categories), index=series.index, name=series.name)
+
+
+def set_cell(df, index, column, value):
+    """
+    Write one cell of df. A string new to a categorical column is added to its
+    categories first; any other value turns the column back into an object
+    column, since categoricals reject values outside their categories.
+    """
+    if column in df.columns and isinstance(df[column].dtype, pd.CategoricalDtype) and not _is_missing(value):
+        categories = df[column].cat.categories
+        if not isinstance(value, str):
+            df[column] = df[column].astype(object)
+        elif value not in categories:
+            df[column] = df[column].cat.add_categories([value])
+    df.loc[index, column] = value
+
+
+def compact_page_table(df, skip_columns=LARGE_TEXT_COLUMNS):
+    """
+    Shrink df's columns in place. Enumerated columns (Text_Toggle, Relevance)
+    become categoricals: a one-byte code per page and one string per value.
+    In the other string columns equal values are made to share one object, so
+    repeated metadata (document types, places, correspondents, dates, empty
+    cells) costs a pointer per page and one string per distinct value; this
+    keeps the dtype that code reading and writing cells relies on. Columns
+    whose strings pandas keeps in Arrow buffers (the default str dtype from
+    pandas 3 with pyarrow) are compact already. Long text columns are skipped;
+    their values are rarely repeated.
+
+    Write enumerated columns through set_cell (DataOperations.store_edit does).
+
+    Returns:
+        list: the columns that were compacted.
+    """
+    compacted = []
+    for column in df.columns:
+        if column in skip_columns:
+            continue
+        series = df[column]
+        if column in ENUMERATED_COLUMNS:
+            compact = categorical_column(series, ENUMERATED_COLUMNS[column])
+            if compact is series:
+                compact = compact_column(series)
+        else:
+            compact = compact_column(series)
+        if compact is not series:
+            df[column] = compact
+            compacted.append(column)
+    return compacted
+
+
+def page_table_bytes(df):
+    """Total of page_table_memory(df), in bytes."""
+    return sum(entry["bytes"] for entry in page_table_memory(df))
+
+
+def enable_copy_on_write():
+    """
+    Turn on pandas copy-on-write (available from pandas 2.0, always on from
+    3.0), under which snapshot_page_table shares data instead of copying it.
+
+    Returns:
+        bool: whether copy-on-write is in effect.
+    """
+    if not copy_on_write_enabled():
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            try:
+                pd.set_option("mode.copy_on_write", True)
+            except (KeyError, AttributeError, ValueError):
+                pass  # pandas before 1.5 has no copy-on-write mode
+    return copy_on_write_enabled()
+
+
+def copy_on_write_enabled():
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    try:
+        return pd.get_option("mode.copy_on_write") is True
+    except (KeyError, AttributeError):
+        return False
+
+
+def snapshot_page_table(df, columns=None):
+    """
+    Point-in-time view of df (or of the given columns of it) for a save, job or
+    export to read while main_df goes on being edited. Under copy-on-write no
+    data is copied up front: each column is shared with df, and a column is
+    only copied when one side writes to it, so changes on either side never
+    reach the other. Without copy-on-write this is an ordinary copy.
+    """
+    if columns is not None:
+        columns = [column for column in columns if column in df.columns]
+    if not copy_on_write_enabled():
+        return df.copy() if columns is None else df[columns].copy()
+    # One block per column, so a write to one column copies that column alone
+    return pd.DataFrame({column: df[column] for column in (df.columns if columns is None else columns)},
+                        index=df.index, copy=False)
+
+
+def _object_bytes(value):
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        size += sum(sys.getsizeof(item) for item in value)
+    return size
+
+
+def page_table_memory(df):
+    """
+    Estimate the memory each column of df holds. Unlike
+    DataFrame.memory_usage(deep=True), an object shared by several cells is
+    counted once, so the figures reflect what compaction saves.
+
+    Returns:
+        list: one dict per column with column, dtype, distinct, filled and bytes.
+    """
+    report = []
+    for column in df.columns:
+        series = df[column]
+        entry = {"column": str(column), "dtype": str(series.dtype), "distinct": 0, "filled": 0, "bytes": 0}
+        if _holds_python_strings(series):
+            seen = {}
+            filled = 0
+            for value in series.to_numpy(dtype=object):
+                if id(value) not in seen:
+                    seen[id(value)] = _object_bytes(value)
+                if not (_is_missing(value) or (isinstance(value, str) and value == "")):
+                    filled += 1
+            entry["bytes"] = len(series) * _POINTER_BYTES + sum(seen.values())
+            entry["filled"] = filled
+            try:
+                entry["distinct"] = int(series.nunique())
+            except TypeError:
+                entry["distinct"] = len(seen)
+        else:
+            entry["bytes"] = int(series.memory_usage(index=False, deep=True))
+            entry["filled"] = int(series.notna().sum())
+            entry["distinct"] = int(series.nunique())
+        report.append(entry)
+    return report
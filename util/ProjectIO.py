@@ -10,11 +10,26 @@ import tkinter as tk
 from tkinter import messagebox, filedialog, simpledialog
 import traceback
 import shutil
+import time
+import ast
+import numpy as np
 from PIL import Image
+from util.ProjectStore import ProjectStore, project_db_path
+from util.ProjectSnapshot import project_snapshot_path, read_snapshot, write_snapshot
+from util.PageTable import compact_page_table, page_table_bytes, snapshot_page_table
+
+def write_csv_atomically(df, file_path):
+    """Write df as CSV to a temporary file beside file_path, then rename it over file_path."""
+    temp_path = f"{file_path}.tmp"
+    df.to_csv(temp_path, index=False, encoding='utf-8')
+    os.replace(temp_path, file_path)
+
 
 class ProjectIO:
     def __init__(self, app):
         self.app = app  # Reference to main app instance
+        self.project_store = None  # Open database project file, if the project uses one
+        self.deferred_text = {}  # column -> set of page indices whose text is still only in the database file
         
     def create_new_project(self):
         if not messagebox.askyesno("New Project", "Creating a new project will reset the current application state. This action cannot be undone. Are you sure you want to proceed?"):
@@ -35,80 +50,10 @@ class ProjectIO:
             return
 
         try:
-            project_name = os.path.basename(self.app.project_directory)
-            project_file = os.path.join(self.app.project_directory, f"{project_name}.pbf")
-
-            # Create a copy of the DataFrame to prevent modifying the original
-            save_df = self.app.main_df.copy()
-            
-            # Convert all paths to relative paths with proper handling of lists
-            for idx, row in save_df.iterrows():
-                # Convert Image_Path to relative path - handle both strings and lists
-                if pd.notna(row['Image_Path']) and row['Image_Path']:
-                    image_path_data = row['Image_Path']
-                    
-                    if isinstance(image_path_data, list):
-                        # Handle list of image paths - convert each to relative
-                        relative_paths = []
-                        for path in image_path_data:
-                            if pd.notna(path) and isinstance(path, str) and path.strip():
-                                # Get filename and construct relative path
-                                image_filename = os.path.basename(str(path))
-                                expected_relative_path = os.path.join("images", image_filename)
-                                relative_paths.append(expected_relative_path)
-                        # Store the list of relative paths
-                        save_df.at[idx, 'Image_Path'] = relative_paths if relative_paths else ""
-                    elif isinstance(image_path_data, str) and image_path_data.strip():
-                        # Handle single image path
-                        image_filename = os.path.basename(str(image_path_data))
-                        expected_relative_path = os.path.join("images", image_filename)
-                        save_df.at[idx, 'Image_Path'] = expected_relative_path
-                    else:
-                        # Handle invalid or empty paths
-                        save_df.at[idx, 'Image_Path'] = ""
-
-                # Convert Text_Path to relative path if it exists
-                if pd.notna(row['Text_Path']) and row['Text_Path']:
-                    # Apply the same logic for Text_Path if it's used and needs similar treatment
-                    text_filename = os.path.basename(str(row['Text_Path']))
-                    # Assuming text files also reside directly in the project root or a specific subdir
-                    # Adjust "textfiles" if they are stored elsewhere relative to the project root
-                    # If Text_Path should always be relative to the project root directly:
-                    expected_text_relative_path = text_filename
-                    # If Text_Path is in a subdirectory like 'texts':
-                    # expected_text_relative_path = os.path.join("texts", text_filename)
-                    save_df.at[idx, 'Text_Path'] = expected_text_relative_path
-
-            # Ensure images directory exists
-            project_images_dir = os.path.join(self.app.project_directory, "images")
-            os.makedirs(project_images_dir, exist_ok=True)
-            
-            # Verify that image files referenced in the DataFrame actually exist in the project
-            missing_images = []
-            for idx, row in save_df.iterrows():
-                image_path_data = row['Image_Path']
-                if pd.notna(image_path_data) and image_path_data:
-                    if isinstance(image_path_data, list):
-                        for path in image_path_data:
-                            if path:  # Check non-empty paths
-                                full_path = os.path.join(self.app.project_directory, path)
-                                if not os.path.exists(full_path):
-                                    missing_images.append(path)
-                    elif isinstance(image_path_data, str) and image_path_data.strip():
-                        full_path = os.path.join(self.app.project_directory, image_path_data)
-                        if not os.path.exists(full_path):
-                            missing_images.append(image_path_data)
-            
-            if missing_images:
-                self.app.error_logging(f"Warning: Some image files referenced in DataFrame are missing from project directory: {missing_images[:5]}", level="WARNING")
-
-            # Save the updated DataFrame with relative paths to the project file
-            save_df.to_csv(project_file, index=False, encoding='utf-8')
-
-            # Update the main DataFrame with the corrected paths to maintain consistency
-            self.app.main_df['Image_Path'] = save_df['Image_Path']
-            if 'Text_Path' in save_df.columns:
-                self.app.main_df['Text_Path'] = save_df['Text_Path']
+            # Snapshot the project here; the file is written on the autosave writer thread
+            self.app.autosave.submit(self.build_save_job(), manual=True)
+            # Keep the page counts of a multi-volume collection's index current
+            self.app.volumes.save_index()
 
             # Refresh the display to ensure consistency with saved state
             self.app.refresh_display()
@@ -117,11 +62,255 @@ class ProjectIO:
             self.app.settings.add_recent_project(self.app.project_directory)
             self.app.update_recent_projects_menu()
 
-            messagebox.showinfo("Success", f"Project saved successfully to {self.app.project_directory}")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save project: {e}")
             self.app.error_logging(f"Failed to save project: {e}")
 
+    def can_autosave(self):
+        """Whether the current project has been saved to a directory of its own (not the temp workspace)."""
+        project_directory = getattr(self.app, 'project_directory', None)
+        if not project_directory or os.path.abspath(project_directory) == os.path.abspath(self.app.temp_directory):
+            return False
+        return self.has_project_file(project_directory)
+
+    def has_project_file(self, project_directory):
+        """Whether a directory holds a project file in any of the supported formats."""
+        # One directory listing rather than a stat per format
+        try:
+            with os.scandir(project_directory) as entries:
+                names = {os.path.normcase(entry.name) for entry in entries}
+        except OSError:
+            return False
+        return any(os.path.normcase(os.path.basename(path)) in names
+                   for path in (self._legacy_project_path(project_directory), project_db_path(project_directory),
+                                project_snapshot_path(project_directory)))
+
+    def _legacy_project_path(self, project_directory):
+        project_name = os.path.basename(project_directory)
+        return os.path.join(project_directory, f"{project_name}.pbf")
+
+    def build_save_job(self, dirty_pages=None):
+        """
+        Snapshot the project for saving and return a callable that writes it, to be run
+        on the autosave writer thread. Given dirty_pages (index -> changed columns) and a
+        database project, only those pages are snapshotted and written; otherwise the
+        whole project is, and main_df takes on the relative paths that were saved.
+        """
+        project_directory = self.app.project_directory
+        store = self._get_project_store(project_directory) if self._uses_project_database(project_directory) else None
+
+        # Text cells that were never read are left untouched in the database file
+        deferred = {column: set(indices) for column, indices in self.deferred_text.items()}
+
+        if dirty_pages is not None and store is not None:
+            rows_df = self.app.main_df.loc[[index for index in dirty_pages if index in self.app.main_df.index]].copy()
+            self._make_paths_relative(rows_df)
+            columns = list(self.app.main_df.columns)
+            return lambda: f"{len(store.save_rows(rows_df, columns, deferred))} changed pages written"
+
+        # Snapshot the DataFrame; the writer thread reads it while editing goes on
+        save_df = snapshot_page_table(self.app.main_df)
+        # Convert all paths to relative paths with proper handling of lists
+        self._make_paths_relative(save_df)
+
+        # Ensure images directory exists
+        os.makedirs(os.path.join(project_directory, "images"), exist_ok=True)
+
+        # Update the main DataFrame with the corrected paths to maintain consistency
+        self.app.main_df['Image_Path'] = save_df['Image_Path']
+        if 'Text_Path' in save_df.columns:
+            self.app.main_df['Text_Path'] = save_df['Text_Path']
+
+        def write():
+            # A database project only writes the pages that changed, so only those are checked
+            if store is not None:
+                written_indices = store.save_dataframe(save_df, deferred)
+            else:
+                self._write_flat_project_file(project_directory, save_df)
+                written_indices = list(save_df.index)
+            self._warn_missing_images(project_directory, save_df.loc[written_indices, 'Image_Path'])
+            return f"{len(written_indices)} pages written"
+        return write
+
+    def _warn_missing_images(self, project_directory, image_paths):
+        """Verify that image files referenced in the DataFrame actually exist in the project"""
+        missing_images = []
+        for image_path_data in image_paths:
+            paths = image_path_data if isinstance(image_path_data, list) else [image_path_data]
+            for path in paths:
+                if isinstance(path, str) and path.strip():
+                    if not self.app.image_files.exists(os.path.join(project_directory, path)):
+                        missing_images.append(path)
+        if missing_images:
+            self.app.error_logging(f"Warning: Some image files referenced in DataFrame are missing from project directory: {missing_images[:5]}", level="WARNING")
+
+    def _relative_image_path(self, image_path_data):
+        """Project-relative form of an Image_Path value (a single path or a list of paths)."""
+        if isinstance(image_path_data, list):
+            # Handle list of image paths - convert each to relative
+            relative_paths = [os.path.join("images", os.path.basename(str(path)))
+                              for path in image_path_data
+                              if pd.notna(path) and isinstance(path, str) and path.strip()]
+            return relative_paths if relative_paths else ""
+        if isinstance(image_path_data, str) and image_path_data.strip():
+            return os.path.join("images", os.path.basename(image_path_data))
+        # Handle invalid or empty paths
+        return ""
+
+    def _make_paths_relative(self, save_df):
+        """Convert Image_Path and Text_Path in save_df to paths relative to the project root."""
+        save_df['Image_Path'] = save_df['Image_Path'].map(self._relative_image_path)
+        if 'Text_Path' in save_df.columns:
+            # Text files reside directly in the project root
+            save_df['Text_Path'] = save_df['Text_Path'].map(
+                lambda path: os.path.basename(str(path)) if pd.notna(path) and path else path)
+
+    def _uses_project_snapshot(self, project_directory):
+        """Whether a project that isn't a database project is saved to the snapshot file rather than the .pbf CSV."""
+        if getattr(self.app.settings, 'project_snapshot', False):
+            return True
+        # A project that only has a snapshot file keeps using it
+        return os.path.exists(project_snapshot_path(project_directory)) and not os.path.exists(self._legacy_project_path(project_directory))
+
+    def _write_flat_project_file(self, project_directory, save_df):
+        """Write the whole of save_df to the project's snapshot or legacy .pbf file."""
+        if self._uses_project_snapshot(project_directory):
+            write_snapshot(save_df, project_snapshot_path(project_directory))
+        else:
+            write_csv_atomically(save_df, self._legacy_project_path(project_directory))
+
+    def create_empty_project(self, project_directory):
+        """Create a project directory with an images folder and a project file without pages, without loading it."""
+        os.makedirs(os.path.join(project_directory, "images"), exist_ok=True)
+        self._write_flat_project_file(project_directory, pd.DataFrame(columns=self.app.main_df.columns))
+
+    def _uses_project_database(self, project_directory):
+        """Whether a project is saved to the database file rather than the legacy .pbf CSV."""
+        return (bool(getattr(self.app.settings, 'project_database', False)) or self.project_store is not None
+                or os.path.exists(project_db_path(project_directory)))
+
+    def _get_project_store(self, project_directory):
+        """Open (or reuse) the database project file of a project directory."""
+        db_path = project_db_path(project_directory)
+        if self.project_store is None or os.path.abspath(self.project_store.db_path) != os.path.abspath(db_path):
+            self.close_project_store()
+            self.project_store = ProjectStore(db_path)
+        return self.project_store
+
+    def close_project_store(self):
+        if self.project_store is not None:
+            # Let queued saves finish with the store before it closes
+            if hasattr(self.app, 'autosave'):
+                self.app.autosave.wait_until_idle()
+            self.project_store.close()
+            self.project_store = None
+        self.deferred_text = {}
+
+    def ensure_text_loaded(self, columns=None, indices=None):
+        """
+        Read text that a lazily opened project left in the database file into
+        main_df: the given columns (default every deferred column), for the given
+        page indices (default every page). Call this before reading text cells
+        other than the displayed page's.
+        """
+        if not self.deferred_text or self.project_store is None:
+            return
+        # main_df is swapped for a temporary frame while export metadata is generated
+        if getattr(self.app, '_is_generating_export_metadata', False):
+            return
+        wanted = {}
+        for column in (list(self.deferred_text) if columns is None else columns):
+            pending = self.deferred_text.get(column)
+            if pending:
+                cells = set(pending) if indices is None else pending.intersection(indices)
+                if cells:
+                    wanted[column] = cells
+        if not wanted:
+            return
+
+        started = time.perf_counter()
+        loaded = self.project_store.read_text(list(wanted), None if indices is None else sorted(set().union(*wanted.values())))
+        for column, cells in wanted.items():
+            values = {index: text for index, text in loaded.get(column, {}).items() if index in cells}
+            if values:
+                self.app.main_df.loc[list(values), column] = list(values.values())
+            self.deferred_text[column] -= cells
+            if not self.deferred_text[column]:
+                del self.deferred_text[column]
+        self.app.error_logging(f"Loaded {sum(len(cells) for cells in wanted.values())} deferred text cells "
+                               f"from {', '.join(wanted)} in {time.perf_counter() - started:.2f}s", level="DEBUG")
+
+    def release_deferred_text(self, columns, indices=None):
+        """
+        Stop deferring cells that were just overwritten (the given columns, on the
+        given page indices or on every page), so saves write main_df's value.
+        """
+        if not self.deferred_text:
+            return
+        for column in ([columns] if isinstance(columns, str) else columns):
+            pending = self.deferred_text.get(column)
+            if not pending:
+                continue
+            if indices is None:
+                pending.clear()
+            else:
+                pending.difference_update(indices)
+            if not pending:
+                del self.deferred_text[column]
+
+    def _write_project_file(self, project_directory, save_df):
+        """
+        Write save_df (already holding relative paths) to the project's database file,
+        snapshot file or legacy .pbf file.
+
+        Returns:
+            list: index labels of the pages written (every page for a snapshot or .pbf file).
+        """
+        if self._uses_project_database(project_directory):
+            return self._get_project_store(project_directory).save_dataframe(save_df)
+        self._write_flat_project_file(project_directory, save_df)
+        return list(save_df.index)
+
+    def _read_project_file(self, project_directory):
+        """Load the project DataFrame from the database file if there is one, else the snapshot or .pbf file."""
+        if os.path.exists(project_db_path(project_directory)):
+            df, self.deferred_text = self._get_project_store(project_directory).load_dataframe(
+                defer_text=bool(getattr(self.app.settings, 'lazy_text_loading', False)))
+            return df
+        self.close_project_store()
+        snapshot_path = project_snapshot_path(project_directory)
+        legacy_path = self._legacy_project_path(project_directory)
+        # With both files present (the format setting was changed), the one saved last is current
+        if os.path.exists(snapshot_path) and (not os.path.exists(legacy_path) or os.path.getmtime(snapshot_path) >= os.path.getmtime(legacy_path)):
+            return read_snapshot(snapshot_path)
+        # Use na_filter=False to prevent pandas from interpreting empty strings as NaN
+        # Keep_default_na=False might also be useful depending on CSV content
+        return pd.read_csv(legacy_path, encoding='utf-8', na_filter=False, keep_default_na=False)
+
+    def export_legacy_project_file(self):
+        """Write the current project as a legacy .pbf CSV file, e.g. to open it in an older version."""
+        self.app.data_operations.update_df()
+        if not getattr(self.app, 'project_directory', None):
+            messagebox.showwarning("No Project", "Save the project before exporting a .pbf project file.")
+            return
+        project_name = os.path.basename(self.app.project_directory)
+        file_path = filedialog.asksaveasfilename(title="Export Legacy Project File",
+                                                 initialdir=self.app.project_directory,
+                                                 initialfile=f"{project_name}.pbf",
+                                                 defaultextension=".pbf",
+                                                 filetypes=[("Project files", "*.pbf")])
+        if not file_path:
+            return
+        try:
+            self.ensure_text_loaded()
+            save_df = snapshot_page_table(self.app.main_df)
+            self._make_paths_relative(save_df)
+            write_csv_atomically(save_df, file_path)
+            messagebox.showinfo("Success", f"Project file exported to {file_path}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to export project file: {e}")
+            self.app.error_logging(f"Failed to export legacy project file: {e}")
+
     def open_project(self):
         # ADD: Save current text before opening using DataOperations
         self.app.data_operations.update_df()
@@ -129,91 +318,88 @@ class ProjectIO:
         if not project_directory:
             return
 
-        project_name = os.path.basename(project_directory)
-        project_file = os.path.join(project_directory, f"{project_name}.pbf")
+        # A multi-volume collection opens the volume that was last in use
+        if self.app.volumes.is_collection(project_directory):
+            self.app.volumes.open_collection(project_directory)
+            return
+        self.app.volumes.close()
+        self.load_project_directory(project_directory)
+
+    def load_project_directory(self, project_directory, start_page=0, announce=True):
+        """
+        Load a project directory into the application and show start_page.
+        announce adds the project to the recent list and confirms the load
+        (off when a volume of a collection is switched to).
+
+        Returns:
+            bool: whether the project was loaded.
+        """
         images_directory = os.path.join(project_directory, "images")
 
-        if not os.path.exists(project_file) or not os.path.exists(images_directory):
+        if not self.has_project_file(project_directory) or not os.path.exists(images_directory):
             messagebox.showerror("Error", "Invalid project directory. Missing project file or images directory.")
-            return
+            return False
 
         try:
-            # Read and process the project CSV file
-            # Use na_filter=False to prevent pandas from interpreting empty strings as NaN
-            # Keep_default_na=False might also be useful depending on CSV content
-            self.app.main_df = pd.read_csv(project_file, encoding='utf-8', na_filter=False, keep_default_na=False)
+            started = time.perf_counter()
+            # Read and process the project file (database or legacy CSV)
+            self.app.main_df = self._read_project_file(project_directory)
+            read_seconds = time.perf_counter() - started
+            self.app.autosave.clear()
+            self.app.history.clear()
 
             # Ensure required text columns exist...
-            for col in ["Original_Text", "Corrected_Text", "Formatted_Text", "Translation", "Separated_Text", "Text_Toggle", "Relevance", "Image_Path"]: # Ensure Image_Path is checked
+            for col in ["Original_Text", "Corrected_Text", "Formatted_Text", "Translation", "Separated_Text", "Text_Toggle", "Relevance", "Image_Path", "Provenance", "Image_Hash"]: # Ensure Image_Path is checked
                 if col not in self.app.main_df.columns:
                     self.app.main_df[col] = ""
                 else:
                     # Explicitly convert columns that should be string/object, handling potential non-string data gracefully
-                    if col in ["Original_Text", "Corrected_Text", "Formatted_Text", "Translation", "Separated_Text", "Text_Toggle", "Relevance", "Image_Path"]:
+                    if col in ["Original_Text", "Corrected_Text", "Formatted_Text", "Translation", "Separated_Text", "Text_Toggle", "Relevance", "Image_Path", "Provenance", "Image_Hash"]:
                         self.app.main_df[col] = self.app.main_df[col].astype('object').fillna('') # Use object and fillna
 
             # Set project directory before resolving paths
             self.app.project_directory = project_directory
             self.app.images_directory = images_directory
+            # List the images directory afresh for this project's existence checks
+            self.app.image_files.invalidate()
 
             # Parse Image_Path fields that might be string representations of lists
             if 'Image_Path' in self.app.main_df.columns:
-                for idx, row in self.app.main_df.iterrows():
-                    image_path_value = row['Image_Path']
-                    if pd.notna(image_path_value) and isinstance(image_path_value, str) and image_path_value.strip():
-                        # Check if it looks like a string representation of a list
-                        if image_path_value.startswith('[') and image_path_value.endswith(']'):
-                            try:
-                                # Safely evaluate the string as a Python literal
-                                import ast
-                                parsed_list = ast.literal_eval(image_path_value)
-                                if isinstance(parsed_list, list):
-                                    self.app.main_df.at[idx, 'Image_Path'] = parsed_list
-                            except (ValueError, SyntaxError) as e:
-                                # If parsing fails, leave as string and log warning
-                                self.app.error_logging(f"Warning: Could not parse Image_Path list at index {idx}: {image_path_value}. Error: {e}", level="WARNING")
+                self.app.main_df['Image_Path'] = self._parse_image_path_lists(self.app.main_df['Image_Path'])
 
             # Update Text_Toggle for each row to show the highest level of populated text
-            for idx, row in self.app.main_df.iterrows():
-                # Check text columns in order of priority (highest to lowest)
-                if pd.notna(row['Separated_Text']) and str(row['Separated_Text']).strip():
-                    self.app.main_df.at[idx, 'Text_Toggle'] = "Separated_Text"
-                elif pd.notna(row['Translation']) and str(row['Translation']).strip():
-                    self.app.main_df.at[idx, 'Text_Toggle'] = "Translation"
-                elif pd.notna(row['Formatted_Text']) and str(row['Formatted_Text']).strip():
-                    self.app.main_df.at[idx, 'Text_Toggle'] = "Formatted_Text"
-                elif pd.notna(row['Corrected_Text']) and str(row['Corrected_Text']).strip():
-                    self.app.main_df.at[idx, 'Text_Toggle'] = "Corrected_Text"
-                elif pd.notna(row['Original_Text']) and str(row['Original_Text']).strip():
-                    self.app.main_df.at[idx, 'Text_Toggle'] = "Original_Text"
-                else:
-                    self.app.main_df.at[idx, 'Text_Toggle'] = "None"
+            self.app.main_df['Text_Toggle'] = self._default_text_toggles(self.app.main_df)
+
+            # Store each distinct value of the enumerated and metadata columns once
+            bytes_before = page_table_bytes(self.app.main_df)
+            compacted = compact_page_table(self.app.main_df)
+            self.app.error_logging(f"Compacted {len(compacted)} page table columns: about {bytes_before / (1024 * 1024):,.1f} MB "
+                                   f"before, {page_table_bytes(self.app.main_df) / (1024 * 1024):,.1f} MB after", level="INFO")
 
             # Initialize highlight toggles based on data presence
             self.initialize_highlight_toggles()
+            deferred_cells = sum(len(indices) for indices in self.deferred_text.values())
+            self.app.error_logging(f"Opened project with {len(self.app.main_df)} pages in {time.perf_counter() - started:.2f}s "
+                                   f"(reading the project file took {read_seconds:.2f}s, {deferred_cells} text cells deferred)", level="INFO")
 
             # Check if any rows have relevance data and show the relevance dropdown if needed
             if 'Relevance' in self.app.main_df.columns:
-                has_relevance = self.app.main_df['Relevance'].apply(
-                    lambda x: pd.notna(x) and str(x).strip() != ""
-                ).any()
-
-                if has_relevance:
+                if self._has_text(self.app.main_df, 'Relevance').any():
                     self.app.show_relevance.set(True)
                     self.app.toggle_relevance_visibility()
                     self.app.error_logging("Enabled relevance dropdown due to existing relevance data")
 
-            # Reset page counter and load the first image and text.
-            self.app.page_counter = 0
+            # Reset page counter and load the first (or requested) image and text.
+            self.app.page_counter = min(max(0, start_page), len(self.app.main_df) - 1) if not self.app.main_df.empty else 0
             if not self.app.main_df.empty:
                 # --- Modified Image Loading ---
-                image_path_rel = self.app.main_df.loc[0, 'Image_Path']
+                image_path_rel = self.app.main_df.loc[self.app.page_counter, 'Image_Path']
 
                 # Check if image_path_rel is a valid, non-empty string
                 if isinstance(image_path_rel, str) and image_path_rel.strip():
                     self.app.current_image_path = self.app.get_full_path(image_path_rel)
                     # Check if the resolved absolute path exists
-                    if self.app.current_image_path and os.path.exists(self.app.current_image_path):
+                    if self.app.current_image_path and self.app.image_files.exists(self.app.current_image_path):
                         try:
                             self.app.image_handler.load_image(self.app.current_image_path)
                         except Exception as img_load_err:
@@ -235,9 +421,9 @@ class ProjectIO:
                     self.app.current_image_path = None
                 # --- End Modified Image Loading ---
 
-                # Set text_display_var to match the Text_Toggle for the first page
-                if 0 in self.app.main_df.index:
-                    current_toggle = self.app.main_df.loc[0, 'Text_Toggle']
+                # Set text_display_var to match the Text_Toggle for the page shown
+                if self.app.page_counter in self.app.main_df.index:
+                    current_toggle = self.app.main_df.loc[self.app.page_counter, 'Text_Toggle']
                     # Ensure current_toggle is a string before setting
                     self.app.text_display_var.set(str(current_toggle) if pd.notna(current_toggle) else "None")
 
@@ -251,17 +437,62 @@ class ProjectIO:
 
             self.app.counter_update()
 
-            # Add project to recent projects list
-            self.app.settings.add_recent_project(project_directory)
-            self.app.update_recent_projects_menu()
+            if announce:
+                # Add project to recent projects list
+                self.app.settings.add_recent_project(project_directory)
+                self.app.update_recent_projects_menu()
 
-            messagebox.showinfo("Success", "Project loaded successfully.")
+                messagebox.showinfo("Success", "Project loaded successfully.")
+            return True
 
         except Exception as e:
             # Detailed error logging including traceback
             tb_str = traceback.format_exc()
             messagebox.showerror("Error", f"Failed to open project: {e}")
             self.app.error_logging(f"Failed to open project: {e}\nTraceback:\n{tb_str}", level="CRITICAL")
+            return False
+
+    def _parse_image_path_lists(self, image_paths):
+        """
+        Turn Image_Path values stored as string representations of lists back into lists.
+        Only values that look like lists are parsed; the rest are returned unchanged.
+        """
+        as_text = image_paths.astype(str).str.strip()
+        looks_like_list = image_paths.map(lambda value: isinstance(value, str)) & as_text.str.startswith('[') & as_text.str.endswith(']')
+        if not looks_like_list.any():
+            return image_paths
+
+        def parse(value):
+            try:
+                # Safely evaluate the string as a Python literal
+                parsed_list = ast.literal_eval(value)
+                if isinstance(parsed_list, list):
+                    return parsed_list
+            except (ValueError, SyntaxError) as e:
+                # If parsing fails, leave as string and log warning
+                self.app.error_logging(f"Warning: Could not parse Image_Path list: {value}. Error: {e}", level="WARNING")
+            return value
+
+        parsed = image_paths.astype('object').copy()
+        parsed[looks_like_list] = image_paths[looks_like_list].map(parse)
+        return parsed
+
+    def _has_text(self, df, column):
+        """Boolean Series: which rows hold non-blank text in column (all False if the column is missing)."""
+        if column not in df.columns:
+            return pd.Series(False, index=df.index)
+        has_text = df[column].notna() & df[column].astype(str).str.strip().ne("")
+        if df is self.app.main_df and self.deferred_text.get(column):
+            # Deferred cells are only stored when they hold text
+            has_text |= df.index.isin(list(self.deferred_text[column]))
+        return has_text
+
+    def _default_text_toggles(self, df):
+        """Text_Toggle showing the highest level of populated text on each row."""
+        # Check text columns in order of priority (highest to lowest)
+        priority = ["Separated_Text", "Translation", "Formatted_Text", "Corrected_Text", "Original_Text"]
+        return pd.Series(np.select([self._has_text(df, column).to_numpy() for column in priority], priority, default="None"),
+                         index=df.index, dtype='object')
 
     def initialize_highlight_toggles(self):
         """Check for existing data in the DataFrame and set highlight toggles accordingly"""
@@ -275,60 +506,29 @@ class ProjectIO:
             self.app.highlight_changes_var.set(False)
             self.app.highlight_errors_var.set(False)
             
+            df = self.app.main_df
+
             # Check for People column data
-            if 'People' in self.app.main_df.columns:
-                has_people = self.app.main_df['People'].apply(
-                    lambda x: pd.notna(x) and str(x).strip() != ""
-                ).any()
-                if has_people:
-                    self.app.highlight_names_var.set(True)
-                    self.app.error_logging("Enabled Names highlighting due to existing People data")
-            
+            if self._has_text(df, 'People').any():
+                self.app.highlight_names_var.set(True)
+                self.app.error_logging("Enabled Names highlighting due to existing People data")
+
             # Check for Places column data
-            if 'Places' in self.app.main_df.columns:
-                has_places = self.app.main_df['Places'].apply(
-                    lambda x: pd.notna(x) and str(x).strip() != ""
-                ).any()
-                if has_places:
-                    self.app.highlight_places_var.set(True)
-                    self.app.error_logging("Enabled Places highlighting due to existing Places data")
-            
+            if self._has_text(df, 'Places').any():
+                self.app.highlight_places_var.set(True)
+                self.app.error_logging("Enabled Places highlighting due to existing Places data")
+
             # Check for Errors column data
-            if 'Errors' in self.app.main_df.columns:
-                has_errors = self.app.main_df['Errors'].apply(
-                    lambda x: pd.notna(x) and str(x).strip() != ""
-                ).any()
-                if has_errors:
-                    self.app.highlight_errors_var.set(True)
-                    self.app.error_logging("Enabled Errors highlighting due to existing Errors data")
-            
-            # Check for Corrected_Text (enables Changes if Original_Text also exists)
-            if 'Corrected_Text' in self.app.main_df.columns and 'Original_Text' in self.app.main_df.columns:
-                has_changes = False
-                
-                # Check if any row has both Original_Text and Corrected_Text
-                for _, row in self.app.main_df.iterrows():
-                    has_original = pd.notna(row['Original_Text']) and row['Original_Text'].strip() != ""
-                    has_Corrected_Text = pd.notna(row['Corrected_Text']) and row['Corrected_Text'].strip() != ""
-                    
-                    if has_original and has_Corrected_Text:
-                        has_changes = True
-                        break
-                        
-                # Also check for Translation or Formatted_Text
-                if not has_changes and 'Translation' in self.app.main_df.columns:
-                    for _, row in self.app.main_df.iterrows():
-                        has_original = pd.notna(row['Original_Text']) and row['Original_Text'].strip() != ""
-                        has_translation = pd.notna(row['Translation']) and row['Translation'].strip() != ""
-                        
-                        if has_original and has_translation:
-                            has_changes = True
-                            break
-                            
-                if has_changes:
-                    self.app.highlight_changes_var.set(True)
-                    self.app.error_logging("Enabled Changes highlighting due to existing draft/translation data")
-                    
+            if self._has_text(df, 'Errors').any():
+                self.app.highlight_errors_var.set(True)
+                self.app.error_logging("Enabled Errors highlighting due to existing Errors data")
+
+            # Changes can be shown where a page has Original_Text and a Corrected_Text or Translation
+            has_original = self._has_text(df, 'Original_Text')
+            if 'Corrected_Text' in df.columns and (has_original & (self._has_text(df, 'Corrected_Text') | self._has_text(df, 'Translation'))).any():
+                self.app.highlight_changes_var.set(True)
+                self.app.error_logging("Enabled Changes highlighting due to existing draft/translation data")
+
         except Exception as e:
             self.app.error_logging(f"Error initializing highlight toggles: {e}")
     
@@ -361,12 +561,11 @@ class ProjectIO:
             return
 
 
-        # Path for the project file (CSV).
-        project_file = os.path.join(project_directory, f"{project_name}.pbf")
-
         try: # Add try/except around the processing loop and saving
-            # Create a copy of the DataFrame to modify paths before saving
-            save_df = self.app.main_df.copy()
+            # The new project file gets every page's text
+            self.ensure_text_loaded()
+            # Snapshot the DataFrame to modify paths before saving
+            save_df = snapshot_page_table(self.app.main_df)
 
             # Iterate over each row in the DataFrame (use the copy's index)
             for index in save_df.index: # Use index from the copy
@@ -429,11 +628,14 @@ class ProjectIO:
             # --- End Loop ---
 
             # Save the modified DataFrame (now containing single, relative image paths)
-            save_df.to_csv(project_file, index=False, encoding='utf-8')
+            self._write_project_file(project_directory, save_df)
+            self.app.autosave.clear()
 
             # Update the app's current project directory references ONLY after successful save
             self.app.project_directory = project_directory
             self.app.images_directory = images_directory
+            # The copy is a standalone project, not a volume of the open collection
+            self.app.volumes.close()
 
             # Update the main DataFrame with the new relative paths to maintain consistency
             self.app.main_df['Image_Path'] = save_df['Image_Path']
@@ -556,6 +758,7 @@ class ProjectIO:
             if new_rows_list:
                  new_rows_df = pd.DataFrame(new_rows_list)
                  self.app.main_df = pd.concat([self.app.main_df, new_rows_df], ignore_index=True)
+                 self.app.autosave.mark_structure_changed()
 
             # Navigate to the first newly added page
             if total_pages > 0:
@@ -564,6 +767,8 @@ class ProjectIO:
                  self.app.page_counter = max(0, len(self.app.main_df) - 1) # Go to last page or 0
 
             self.app.refresh_display() # Refresh display for the new page
+            # Hash the new pages so near-duplicates can be found
+            self.app.page_analyzer.update_image_hashes()
             self.app.progress_bar.close_progress_window()
             messagebox.showinfo("Success", f"PDF processed successfully. {total_pages} pages added.")
 
@@ -0,0 +1,201 @@
+# util/ProjectSnapshot.py
+
+# This file contains the functions used to read and write the compressed
+# columnar project snapshot file (.pbs) for the application.
+
+import json
+import os
+import struct
+import sys
+import zlib
+from array import array
+from itertools import accumulate
+import pandas as pd
+
+# Extension of the snapshot project file (the legacy CSV project file is .pbf)
+SNAPSHOT_EXTENSION = ".pbs"
+SNAPSHOT_MAGIC = b"ASSNAP01"
+SNAPSHOT_FORMAT_VERSION = 1
+# Encoded values are handed to the compressor in blocks of about this many bytes
+_WRITE_BLOCK_BYTES = 1 << 20
+_FOOTER_TRAILER = struct.Struct("<Q8s")  # footer length, magic
+
+
+def project_snapshot_path(project_directory):
+    """Path of the snapshot project file inside a project directory."""
+    project_name = os.path.basename(os.path.normpath(project_directory))
+    return os.path.join(project_directory, f"{project_name}{SNAPSHOT_EXTENSION}")
+
+
+def _encode_json(value):
+    # NaN and None both round-trip as themselves through json ("NaN" / null)
+    if hasattr(value, "item") and not isinstance(value, (list, dict, str)):
+        value = value.item()
+    return json.dumps(value, ensure_ascii=False, default=str).encode("utf-8")
+
+
+class SnapshotWriter:
+    """
+    Streaming writer for a snapshot file. Each column is written as two zlib
+    streams, the concatenated values and their byte lengths, followed by a
+    JSON footer that indexes every column by offset, so a reader can seek
+    straight to the columns it needs. Text columns store raw UTF-8; any other
+    column (numbers, lists such as multi-image Image_Path values, missing
+    values) stores each value as JSON, along with the pandas dtype to restore.
+
+    The file is written beside the target and renamed over it on close, so an
+    interrupted save leaves the previous snapshot intact.
+    """
+
+    def __init__(self, file_path, compression_level=6):
+        self.file_path = file_path
+        self.compression_level = compression_level
+        self._temp_path = f"{file_path}.tmp"
+        self._file = open(self._temp_path, "wb")
+        self._file.write(SNAPSHOT_MAGIC)
+        self._columns = []
+        self._row_count = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def write_column(self, name, values, dtype="object"):
+        """Append one column. values is any iterable of cell values, consumed once."""
+        encoding = "text"
+        values = list(values)
+        if dtype != "object" or not all(isinstance(value, str) for value in values):
+            encoding = "json"
+        if self._row_count is None:
+            self._row_count = len(values)
+        elif len(values) != self._row_count:
+            raise ValueError(f"Column {name} has {len(values)} values, expected {self._row_count}")
+
+        lengths = array("I")
+        data_offset = self._file.tell()
+        compressor = zlib.compressobj(self.compression_level)
+        block = bytearray()
+        raw_size = 0
+        for value in values:
+            encoded = value.encode("utf-8") if encoding == "text" else _encode_json(value)
+            lengths.append(len(encoded))
+            block += encoded
+            if len(block) >= _WRITE_BLOCK_BYTES:
+                raw_size += len(block)
+                self._file.write(compressor.compress(bytes(block)))
+                block.clear()
+        raw_size += len(block)
+        self._file.write(compressor.compress(bytes(block)))
+        self._file.write(compressor.flush())
+        data_length = self._file.tell() - data_offset
+
+        if sys.byteorder != "little":
+            lengths.byteswap()
+        lengths_offset = self._file.tell()
+        self._file.write(zlib.compress(lengths.tobytes(), self.compression_level))
+        self._columns.append({
+            "name": str(name),
+            "dtype": str(dtype),
+            "encoding": encoding,
+            "data": [data_offset, data_length],
+            "lengths": [lengths_offset, self._file.tell() - lengths_offset],
+            "raw_size": raw_size,
+        })
+
+    def close(self):
+        """Write the footer index and move the finished file into place."""
+        footer = json.dumps({
+            "format": SNAPSHOT_FORMAT_VERSION,
+            "rows": self._row_count or 0,
+            "columns": self._columns,
+        }).encode("utf-8")
+        self._file.write(footer)
+        self._file.write(_FOOTER_TRAILER.pack(len(footer), SNAPSHOT_MAGIC))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._temp_path, self.file_path)
+
+    def abort(self):
+        """Discard a partially written snapshot."""
+        self._file.close()
+        if os.path.exists(self._temp_path):
+            os.remove(self._temp_path)
+
+
+def write_snapshot(df, file_path, compression_level=6):
+    """Write df to a snapshot file, one column at a time."""
+    with SnapshotWriter(file_path, compression_level) as writer:
+        for column in df.columns:
+            writer.write_column(column, df[column].tolist(), str(df[column].dtype))
+
+
+def read_snapshot_index(file_path):
+    """Read the footer index of a snapshot file (row count and column layout)."""
+    with open(file_path, "rb") as snapshot_file:
+        return _read_footer(snapshot_file)
+
+
+def _read_footer(snapshot_file):
+    if snapshot_file.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+        raise ValueError("Not a project snapshot file")
+    snapshot_file.seek(-_FOOTER_TRAILER.size, os.SEEK_END)
+    footer_length, magic = _FOOTER_TRAILER.unpack(snapshot_file.read(_FOOTER_TRAILER.size))
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("Project snapshot file is incomplete or damaged")
+    snapshot_file.seek(-(_FOOTER_TRAILER.size + footer_length), os.SEEK_END)
+    footer = json.loads(snapshot_file.read(footer_length).decode("utf-8"))
+    if footer.get("format", 0) > SNAPSHOT_FORMAT_VERSION:
+        raise ValueError("Project snapshot file was written by a newer version")
+    return footer
+
+
+def _read_block(snapshot_file, offset, length):
+    snapshot_file.seek(offset)
+    return zlib.decompress(snapshot_file.read(length))
+
+
+def _decode_column(snapshot_file, entry):
+    data = _read_block(snapshot_file, *entry["data"])
+    lengths = array("I")
+    lengths.frombytes(_read_block(snapshot_file, *entry["lengths"]))
+    if sys.byteorder != "little":
+        lengths.byteswap()
+    ends = list(accumulate(lengths))
+    starts = [0] + ends[:-1]
+    if entry["encoding"] == "text":
+        return [data[start:end].decode("utf-8") for start, end in zip(starts, ends)]
+    return [json.loads(data[start:end]) for start, end in zip(starts, ends)]
+
+
+def read_snapshot(file_path, columns=None):
+    """
+    Read a snapshot file into a DataFrame. columns limits the read to those
+    columns (the others are never decompressed).
+    """
+    with open(file_path, "rb") as snapshot_file:
+        footer = _read_footer(snapshot_file)
+        entries = footer["columns"]
+        if columns is not None:
+            wanted = set(columns)
+            entries = [entry for entry in entries if entry["name"] in wanted]
+        data = {}
+        for entry in entries:
+            values = _decode_column(snapshot_file, entry)
+            series = pd.Series(values, dtype="object")
+            if entry["dtype"] != "object":
+                try:
+                    series = series.astype(entry["dtype"])
+                except (TypeError, ValueError):
+                    pass
+            data[entry["name"]] = series
+    df = pd.DataFrame(data, columns=[entry["name"] for entry in entries])
+    if not entries:
+        df = pd.DataFrame(index=range(footer["rows"]))
+    return df
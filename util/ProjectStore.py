@@ -0,0 +1,271 @@
+# util/ProjectStore.py
+
+# This file contains the ProjectStore class, which is used to handle
+# the SQLite-backed project file for the application.
+
+import json
+import math
+import os
+import sqlite3
+import threading
+import pandas as pd
+
+# Extension of the database project file (the legacy CSV project file is .pbf)
+PROJECT_DB_EXTENSION = ".pbdb"
+# Bumped whenever the table layout changes
+STORE_SCHEMA_VERSION = 2
+# Long text columns, kept in their own table (one row per non-empty cell) so a project
+# can be opened without reading them and individual cells can be read on demand
+LARGE_TEXT_COLUMNS = ("Original_Text", "Corrected_Text", "Formatted_Text", "Translation", "Separated_Text",
+                      "Summary", "Notes", "Data_Analysis", "Temp_Data_Analysis", "Query_Data", "Query_Memory")
+# SQLite limits the number of parameters in one statement
+_QUERY_CHUNK = 500
+
+
+def project_db_path(project_directory):
+    """Path of the database project file inside a project directory."""
+    project_name = os.path.basename(os.path.normpath(project_directory))
+    return os.path.join(project_directory, f"{project_name}{PROJECT_DB_EXTENSION}")
+
+
+def _json_default(value):
+    """Serialize numpy scalars and anything else json can't handle natively."""
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def _clean_value(value):
+    """Store missing values as empty strings, the way the CSV project file reads them back."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    return value
+
+
+def page_payload(record):
+    """JSON text stored for one page (a dict of column -> value), without its long text columns."""
+    return json.dumps({column: _clean_value(value) for column, value in record.items() if column not in LARGE_TEXT_COLUMNS},
+                      ensure_ascii=False, default=_json_default)
+
+
+def _cell_text(value):
+    value = _clean_value(value)
+    return value if isinstance(value, str) else str(value)
+
+
+class ProjectStore:
+    """
+    Project file kept in an embedded SQLite database (WAL mode) with one row per
+    page, and the long text columns in a separate table indexed by column and page.
+    Saving compares each page and text cell with what was last written and only
+    rewrites the ones that changed, in a single transaction, so a crash mid-save
+    leaves the previous state intact.
+
+    Files written before the text table existed keep their text in the page rows;
+    it is read from there and moved to the text table on the next save.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._saved_hashes = {} # row index -> hash of the payload last written
+        self._saved_text_hashes = {} # (column, row index) -> hash of the text last written, None if not read yet
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS pages (row_index INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS page_text (column_name TEXT NOT NULL, row_index INTEGER NOT NULL, "
+                                    "value TEXT NOT NULL, PRIMARY KEY (column_name, row_index))")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS page_text_by_page ON page_text (row_index)")
+            self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+                                    (str(STORE_SCHEMA_VERSION),))
+
+    def close(self):
+        with self._lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+    def _get_meta(self, key, default=None):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_meta(self, key, value):
+        self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def load_dataframe(self, defer_text=False):
+        """
+        Read every page back into a DataFrame, in page order.
+
+        With defer_text, long text cells are left on disk and read as empty; only
+        which cells hold text is read (from the table's index), so opening a
+        project doesn't scale with the amount of text in it.
+
+        Returns:
+            tuple: (DataFrame, dict of column -> set of row indices whose text was deferred)
+        """
+        with self._lock:
+            columns = self._get_meta("columns", [])
+            rows = self.connection.execute("SELECT row_index, data FROM pages ORDER BY row_index").fetchall()
+            indices = [row_index for row_index, _ in rows]
+            contiguous = indices == list(range(len(indices)))
+            # Deferring needs stored indices that match the page positions
+            defer_text = defer_text and contiguous
+            if defer_text:
+                text_rows = self.connection.execute("SELECT column_name, row_index FROM page_text").fetchall()
+            else:
+                text_rows = self.connection.execute("SELECT column_name, row_index, value FROM page_text").fetchall()
+        # Pages written before a column was added don't have it; read those cells as empty
+        df = pd.DataFrame([json.loads(data) for _, data in rows], columns=columns or None).fillna("")
+
+        position = {row_index: position for position, row_index in enumerate(indices)}
+        deferred = {}
+        if defer_text:
+            for column, row_index in text_rows:
+                if column in df.columns and row_index in position:
+                    deferred.setdefault(column, set()).add(position[row_index])
+            self._saved_text_hashes = {(column, index): None for column, cells in deferred.items() for index in cells}
+        else:
+            values = {}
+            for column, row_index, value in text_rows:
+                if column in df.columns and row_index in position:
+                    values.setdefault(column, {})[position[row_index]] = value
+            for column, cells in values.items():
+                df[column] = df[column].astype('object')
+                df.loc[list(cells), column] = list(cells.values())
+            self._saved_text_hashes = ({(column, index): hash(value) for column, cells in values.items() for index, value in cells.items()}
+                                       if contiguous else {})
+
+        if contiguous:
+            self._saved_hashes = {row_index: hash(data) for row_index, data in rows}
+        else:
+            # Gaps in the stored indices: renumber, and the next save rewrites every page
+            self._saved_hashes = {}
+        return df.reset_index(drop=True), deferred
+
+    def read_text(self, columns, indices=None):
+        """
+        Read long text cells from disk: the given columns, for the given row
+        indices (default every page). Cells without text are not returned.
+
+        Returns:
+            dict: column -> {row index: text}
+        """
+        wanted = set(columns)
+        result = {column: {} for column in wanted}
+        with self._lock:
+            if indices is None:
+                for column in wanted:
+                    for row_index, value in self.connection.execute(
+                            "SELECT row_index, value FROM page_text WHERE column_name = ?", (column,)):
+                        result[column][row_index] = value
+            else:
+                indices = [int(index) for index in indices]
+                for start in range(0, len(indices), _QUERY_CHUNK):
+                    chunk = indices[start:start + _QUERY_CHUNK]
+                    placeholders = ", ".join("?" * len(chunk))
+                    for column, row_index, value in self.connection.execute(
+                            f"SELECT column_name, row_index, value FROM page_text WHERE row_index IN ({placeholders})", chunk):
+                        if column in wanted:
+                            result[column][row_index] = value
+            for column, cells in result.items():
+                for row_index, value in cells.items():
+                    self._saved_text_hashes[(column, row_index)] = hash(value)
+        return result
+
+    def save_dataframe(self, df, deferred=None):
+        """
+        Write the pages and text cells of df whose content changed since the last
+        save, and drop pages that no longer exist. deferred (column -> set of row
+        indices) names text cells that were never read, which are left as they are.
+
+        Returns:
+            list: index labels of the pages that were written.
+        """
+        payloads = {}
+        for index, record in zip(df.index, df.to_dict("records")):
+            payload = page_payload(record)
+            if self._saved_hashes.get(index) != hash(payload):
+                payloads[index] = payload
+        # A store that hasn't read the file (or had to renumber it) can't tell which text cells are stale
+        replace_text = not self._saved_hashes
+        text_updates, text_cleared = self._changed_text(df, deferred, compare=not replace_text)
+        removed = [index for index in self._saved_hashes if index not in df.index]
+        # A first save over an existing file may find more pages in it than df has
+        self._write(payloads, df.columns, removed, page_count=len(df) if removed or not self._saved_hashes else None,
+                    text_updates=text_updates, text_cleared=text_cleared, replace_text=replace_text)
+        return sorted(set(payloads) | {index for _, index, _ in text_updates} | {index for _, index in text_cleared})
+
+    def save_rows(self, rows_df, columns, deferred=None):
+        """
+        Write the given pages without comparing them first, e.g. the pages an
+        autosave already knows are dirty. columns is the full project column list.
+
+        Returns:
+            list: index labels of the pages that were written.
+        """
+        payloads = {index: page_payload(record) for index, record in zip(rows_df.index, rows_df.to_dict("records"))}
+        text_updates, text_cleared = self._changed_text(rows_df, deferred, compare=False)
+        self._write(payloads, columns, text_updates=text_updates, text_cleared=text_cleared)
+        return list(payloads)
+
+    def _changed_text(self, df, deferred, compare):
+        """
+        Text cells of df to write, as (column, index, text), and cells that became
+        empty, as (column, index). Deferred cells are skipped.
+        """
+        deferred = deferred or {}
+        updates, cleared = [], []
+        for column in LARGE_TEXT_COLUMNS:
+            if column not in df.columns:
+                continue
+            skip = deferred.get(column, ())
+            for index, value in zip(df.index, df[column]):
+                if index in skip:
+                    continue
+                key = (column, index)
+                text = _cell_text(value)
+                if not text:
+                    if key in self._saved_text_hashes:
+                        cleared.append(key)
+                elif not compare or self._saved_text_hashes.get(key) != hash(text):
+                    updates.append((column, index, text))
+        return updates, cleared
+
+    def _write(self, payloads, columns, removed=(), page_count=None, text_updates=(), text_cleared=(), replace_text=False):
+        """
+        Upsert payloads and text cells and delete removed pages (and any at or past
+        page_count) in one transaction. replace_text drops all stored text first.
+        """
+        with self._lock:
+            with self.connection:
+                if replace_text:
+                    self.connection.execute("DELETE FROM page_text")
+                self.connection.executemany("INSERT OR REPLACE INTO pages (row_index, data) VALUES (?, ?)",
+                                            [(int(index), payload) for index, payload in payloads.items()])
+                self.connection.executemany("INSERT OR REPLACE INTO page_text (column_name, row_index, value) VALUES (?, ?, ?)",
+                                            [(column, int(index), text) for column, index, text in text_updates])
+                self.connection.executemany("DELETE FROM page_text WHERE column_name = ? AND row_index = ?",
+                                            [(column, int(index)) for column, index in text_cleared])
+                if page_count is not None:
+                    self.connection.execute("DELETE FROM pages WHERE row_index >= ?", (page_count,))
+                    self.connection.execute("DELETE FROM page_text WHERE row_index >= ?", (page_count,))
+                self.connection.executemany("DELETE FROM pages WHERE row_index = ?", [(int(index),) for index in removed])
+                self.connection.executemany("DELETE FROM page_text WHERE row_index = ?", [(int(index),) for index in removed])
+                self._set_meta("columns", [str(column) for column in columns])
+            for index in removed:
+                self._saved_hashes.pop(index, None)
+            if replace_text:
+                self._saved_text_hashes = {}
+            elif removed or page_count is not None:
+                gone = set(removed)
+                self._saved_text_hashes = {key: value for key, value in self._saved_text_hashes.items()
+                                           if key[1] not in gone and (page_count is None or key[1] < page_count)}
+            for index, payload in payloads.items():
+                self._saved_hashes[index] = hash(payload)
+            for column, index in text_cleared:
+                self._saved_text_hashes.pop((column, index), None)
+            for column, index, text in text_updates:
+                self._saved_text_hashes[(column, index)] = hash(text)
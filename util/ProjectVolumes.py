@@ -0,0 +1,382 @@
+# util/ProjectVolumes.py
+
+# This file contains the VolumeManager class, which is used to handle
+# multi-volume project collections for the application.
+
+import bisect
+import json
+import os
+import re
+import tkinter as tk
+from itertools import accumulate
+from tkinter import ttk, messagebox, filedialog, simpledialog
+
+# Global page index kept in the root of a collection directory
+VOLUME_INDEX_FILE = "volumes.json"
+VOLUME_INDEX_VERSION = 1
+
+
+class VolumeManager:
+    """
+    A collection is a directory holding a volume index (volumes.json) and any
+    number of volumes, each an ordinary project directory with its own project
+    file and images. Only the active volume is loaded into main_df; the index
+    records every volume's page count, so a global page number maps to a volume
+    and a page within it without opening the others.
+
+    Moving past the first or last page of a volume switches to the neighbouring
+    one, saving the volume that is left first, and batch jobs can be run volume
+    by volume. Version history is kept per volume and starts over on a switch.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.collection_directory = None
+        self.volumes = []  # dicts of name, path (relative to the collection when inside it) and pages
+        self.active = None  # position in volumes of the volume loaded in main_df
+
+    @staticmethod
+    def is_collection(directory):
+        return bool(directory) and os.path.exists(os.path.join(directory, VOLUME_INDEX_FILE))
+
+    def is_open(self):
+        return self.collection_directory is not None and self.active is not None
+
+    def close(self):
+        """Forget the open collection (the loaded volume stays in main_df as a plain project)."""
+        self.collection_directory = None
+        self.volumes = []
+        self.active = None
+
+    # Index file
+
+    def _index_path(self):
+        return os.path.join(self.collection_directory, VOLUME_INDEX_FILE)
+
+    def save_index(self):
+        """Write the volume index beside a temporary file, then rename it over the index."""
+        if self.collection_directory is None:
+            return
+        if self.active is not None:
+            self.volumes[self.active]["pages"] = len(self.app.main_df)
+        index = {
+            "format": VOLUME_INDEX_VERSION,
+            "volumes": self.volumes,
+            "last_volume": self.volumes[self.active]["name"] if self.active is not None else None,
+        }
+        index_path = self._index_path()
+        temp_path = f"{index_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as index_file:
+            json.dump(index, index_file, indent=2)
+        os.replace(temp_path, index_path)
+
+    def volume_directory(self, volume):
+        path = volume["path"]
+        return path if os.path.isabs(path) else os.path.join(self.collection_directory, path)
+
+    # Global page index
+
+    def _offsets(self):
+        """Global number of each volume's first page, plus the total page count at the end."""
+        return [0] + list(accumulate(volume["pages"] for volume in self.volumes))
+
+    def total_pages(self):
+        return self._offsets()[-1]
+
+    def global_page(self, page_counter):
+        """Global (0-based) number of a page of the active volume."""
+        return self._offsets()[self.active] + page_counter
+
+    def locate(self, global_page):
+        """
+        Map a global (0-based) page number to a volume.
+
+        Returns:
+            tuple: (position of the volume, page index within it)
+        """
+        offsets = self._offsets()
+        position = bisect.bisect_right(offsets, global_page) - 1
+        position = min(max(0, position), len(self.volumes) - 1)
+        return position, global_page - offsets[position]
+
+    def counter_text(self, page_counter, page_count):
+        """Page counter label showing the global position, or None outside a collection."""
+        if not self.is_open():
+            return None
+        self.volumes[self.active]["pages"] = page_count
+        if page_count == 0:
+            return f"0 / {self.total_pages()} ({self.volumes[self.active]['name']})"
+        return f"{self.global_page(page_counter) + 1} / {self.total_pages()} ({self.volumes[self.active]['name']})"
+
+    # Opening and switching
+
+    def open_collection(self, directory):
+        """Open a collection at the volume that was last in use."""
+        try:
+            with open(os.path.join(directory, VOLUME_INDEX_FILE), encoding="utf-8") as index_file:
+                index = json.load(index_file)
+            if index.get("format", 0) > VOLUME_INDEX_VERSION:
+                raise ValueError("The volume index was written by a newer version")
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Failed to open collection: {e}")
+            self.app.error_logging(f"Failed to open collection {directory}: {e}")
+            return False
+
+        if not index.get("volumes"):
+            self.app.reset_application()
+        self.collection_directory = directory
+        self.volumes = index.get("volumes", [])
+        self.active = None
+        self.app.settings.add_recent_project(directory)
+        self.app.update_recent_projects_menu()
+
+        if not self.volumes:
+            messagebox.showinfo("Collection", "This collection has no volumes yet. Use File > Volumes to add one.")
+            return True
+        names = [volume["name"] for volume in self.volumes]
+        last_volume = index.get("last_volume")
+        return self.switch_to(names.index(last_volume) if last_volume in names else 0)
+
+    def _save_active_volume(self):
+        """
+        Write the active volume's unsaved changes and wait for them to reach disk.
+
+        Returns:
+            bool: whether the volume has no unsaved changes left.
+        """
+        self.app.data_operations.update_df()
+        autosave = self.app.autosave
+        if autosave.has_unsaved_changes() and self.app.project_io.can_autosave():
+            dirty_pages = None if autosave.structure_changed else dict(autosave.dirty_pages)
+            autosave.submit(self.app.project_io.build_save_job(dirty_pages), manual=True)
+            autosave.wait_until_idle()
+        return not autosave.has_unsaved_changes()
+
+    def switch_to(self, position, page=0):
+        """Make the volume at position the active one, showing page (an index within it)."""
+        if position == self.active:
+            self.app.data_operations.update_df()
+            self.app.page_counter = min(max(0, page), max(0, len(self.app.main_df) - 1))
+            self.app.current_doc_page_index = 0
+            self.app.refresh_display()
+            return True
+
+        if self.active is not None:
+            if not self._save_active_volume():
+                messagebox.showerror("Error", "The current volume could not be saved, so the volume was not switched.")
+                return False
+            self.save_index()
+
+        volume = self.volumes[position]
+        if not self.app.project_io.load_project_directory(self.volume_directory(volume), start_page=page, announce=False):
+            return False
+        self.active = position
+        self.save_index()
+        self.app.counter_update()
+        self.app.error_logging(f"Switched to volume {volume['name']}", level="INFO")
+        return True
+
+    def step_volume(self, direction):
+        """
+        Switch to the next (direction 1) or previous (-1) volume with pages, at its
+        first or last page respectively.
+
+        Returns:
+            bool: whether the volume was switched.
+        """
+        if not self.is_open():
+            return False
+        position = self.active + direction
+        while 0 <= position < len(self.volumes) and self.volumes[position]["pages"] == 0:
+            position += direction
+        if not 0 <= position < len(self.volumes):
+            return False
+        return self.switch_to(position, page=0 if direction > 0 else self.volumes[position]["pages"] - 1)
+
+    def go_to_global_page(self, global_page):
+        """Show a page by its global (0-based) number."""
+        if not self.is_open() or not self.volumes or self.total_pages() == 0:
+            return False
+        position, page = self.locate(global_page)
+        return self.switch_to(position, page)
+
+    def for_each_volume(self, action, label, announce=True):
+        """
+        Run action (a callable taking no arguments) with each volume that has pages
+        loaded in turn, saving each before moving on, then return to the page the
+        user was on. announce shows a message when it has finished.
+        """
+        if not self.is_open():
+            action()
+            return
+        start_position, start_page = self.active, self.app.page_counter
+        completed = 0
+        for position, volume in enumerate(self.volumes):
+            if volume["pages"] == 0:
+                continue
+            if not self.switch_to(position):
+                break
+            self.app.error_logging(f"{label}: processing volume {volume['name']}", level="INFO")
+            action()
+            completed += 1
+        self.switch_to(start_position, start_page)
+        if announce:
+            messagebox.showinfo("Volumes", f"{label} finished on {completed} of {len(self.volumes)} volume(s).")
+
+    # Building collections
+
+    def _unique_volume_name(self, name):
+        taken = {volume["name"] for volume in self.volumes}
+        candidate, number = name, 2
+        while candidate in taken:
+            candidate = f"{name} ({number})"
+            number += 1
+        return candidate
+
+    def create_collection(self):
+        """Create an empty collection directory and open it."""
+        parent_directory = filedialog.askdirectory(title="Select Directory for New Collection")
+        if not parent_directory:
+            return
+        name = simpledialog.askstring("New Collection", "Enter a name for the new collection:")
+        if not name or not name.strip():
+            return
+        directory = os.path.join(parent_directory, re.sub(r'[<>:"/\\|?*]', '_', name.strip()))
+        if self.is_collection(directory):
+            messagebox.showerror("Error", "A collection already exists at that location.")
+            return
+        try:
+            os.makedirs(directory, exist_ok=True)
+            self.app.data_operations.update_df()
+            self.app.autosave.autosave()
+            self.app.autosave.wait_until_idle()
+            self.app.reset_application()
+            self.collection_directory = directory
+            self.volumes = []
+            self.active = None
+            self.save_index()
+            self.app.settings.add_recent_project(directory)
+            self.app.update_recent_projects_menu()
+            messagebox.showinfo("Collection", "Collection created. Use File > Volumes to add volumes to it.")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to create collection: {e}")
+            self.app.error_logging(f"Failed to create collection: {e}")
+
+    def _require_collection(self):
+        if self.collection_directory is None:
+            messagebox.showinfo("Volumes", "Open or create a multi-volume collection first.")
+            return False
+        return True
+
+    def new_volume(self):
+        """Add an empty volume to the collection and switch to it."""
+        if not self._require_collection():
+            return
+        name = simpledialog.askstring("New Volume", "Enter a name for the new volume:")
+        if not name or not name.strip():
+            return
+        name = self._unique_volume_name(name.strip())
+        relative_path = os.path.join("volumes", re.sub(r'[<>:"/\\|?*]', '_', name))
+        directory = os.path.join(self.collection_directory, relative_path)
+        if os.path.exists(directory) and os.listdir(directory):
+            messagebox.showerror("Error", f"The folder for this volume already exists and is not empty:\n{directory}")
+            return
+        try:
+            self.app.project_io.create_empty_project(directory)
+            self.volumes.append({"name": name, "path": relative_path, "pages": 0})
+            self.save_index()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to create volume: {e}")
+            self.app.error_logging(f"Failed to create volume {name}: {e}")
+            return
+        if self.switch_to(len(self.volumes) - 1):
+            self.app.enable_drag_and_drop()
+
+    def add_existing_project(self):
+        """Add an existing project directory to the collection as a volume and switch to it."""
+        if not self._require_collection():
+            return
+        directory = filedialog.askdirectory(title="Select Project Directory to Add as a Volume")
+        if not directory:
+            return
+        if not self.app.project_io.has_project_file(directory) or not os.path.exists(os.path.join(directory, "images")):
+            messagebox.showerror("Error", "Invalid project directory. Missing project file or images directory.")
+            return
+        collection = os.path.abspath(self.collection_directory)
+        directory = os.path.abspath(directory)
+        if any(os.path.abspath(self.volume_directory(volume)) == directory for volume in self.volumes):
+            messagebox.showinfo("Volumes", "That project is already a volume of this collection.")
+            return
+        # Volumes inside the collection are stored relative to it, so the collection can be moved
+        inside = os.path.commonpath([collection, directory]) == collection
+        path = os.path.relpath(directory, collection) if inside else directory
+        self.volumes.append({"name": self._unique_volume_name(os.path.basename(directory)), "path": path, "pages": 0})
+        if not self.switch_to(len(self.volumes) - 1):
+            self.volumes.pop()
+            return
+        self.save_index()
+
+    # Window
+
+    def show_volumes_window(self):
+        """List the volumes of the open collection with their global page ranges."""
+        if not self._require_collection():
+            return
+        window = tk.Toplevel(self.app)
+        window.title("Volumes")
+        window.geometry("520x380")
+
+        tree_frame = tk.Frame(window)
+        tree_frame.pack(fill="both", expand=True, padx=10, pady=10)
+        columns = ("Volume", "Pages", "Global Pages")
+        tree = ttk.Treeview(tree_frame, columns=columns, show="headings", selectmode="browse")
+        for column, width in [("Volume", 260), ("Pages", 70), ("Global Pages", 120)]:
+            tree.heading(column, text=column)
+            tree.column(column, width=width)
+        tree.pack(fill="both", expand=True, side="left")
+        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
+        scrollbar.pack(side="right", fill="y")
+        tree.config(yscrollcommand=scrollbar.set)
+
+        def populate():
+            tree.delete(*tree.get_children())
+            if self.active is not None:
+                self.volumes[self.active]["pages"] = len(self.app.main_df)
+            offsets = self._offsets()
+            for position, volume in enumerate(self.volumes):
+                pages = volume["pages"]
+                page_range = f"{offsets[position] + 1}-{offsets[position] + pages}" if pages else "-"
+                name = f"{volume['name']} (open)" if position == self.active else volume["name"]
+                tree.insert("", "end", iid=str(position), values=(name, pages, page_range))
+
+        def open_selected(event=None):
+            selection = tree.selection()
+            if selection and self.switch_to(int(selection[0])):
+                populate()
+
+        def go_to_page():
+            try:
+                global_page = int(page_entry.get()) - 1
+            except ValueError:
+                messagebox.showerror("Error", "Enter a page number.", parent=window)
+                return
+            if not 0 <= global_page < self.total_pages():
+                messagebox.showerror("Error", f"Enter a page number between 1 and {self.total_pages()}.", parent=window)
+                return
+            if self.go_to_global_page(global_page):
+                populate()
+
+        tree.bind("<Double-1>", open_selected)
+        populate()
+
+        page_frame = tk.Frame(window)
+        page_frame.pack(pady=(0, 5))
+        tk.Label(page_frame, text="Go to global page:").pack(side="left")
+        page_entry = tk.Entry(page_frame, width=8)
+        page_entry.pack(side="left", padx=5)
+        tk.Button(page_frame, text="Go", command=go_to_page).pack(side="left")
+
+        button_frame = tk.Frame(window)
+        button_frame.pack(pady=(0, 10))
+        tk.Button(button_frame, text="Open Volume", command=open_selected).pack(side="left", padx=5)
+        tk.Button(button_frame, text="Close", command=window.destroy).pack(side="left", padx=5)
@@ -0,0 +1,123 @@
+# util/Provenance.py
+
+# This file contains the helper functions used to record and check the
+# provenance of AI-generated text columns for the application.
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+# Column in main_df holding a JSON object per page: {target_column: provenance_record}
+PROVENANCE_COLUMN = "Provenance"
+
+# Target column each tracked job writes; HTR_Correct writes both text columns
+TRACKED_JOB_TARGETS = {
+    "HTR": ["Original_Text"],
+    "HTR_Correct": ["Original_Text", "Corrected_Text"],
+    "Correct_Text": ["Corrected_Text"],
+    "Format_Text": ["Formatted_Text"],
+    "Translation": ["Translation"],
+}
+
+# Cache of image hashes keyed on (path, size, mtime) so unchanged images are read once
+_file_hash_cache = {}
+
+
+def hash_text(text):
+    """Return a short stable hash of a text value (empty string hashes to '')."""
+    if not isinstance(text, str) or not text.strip():
+        return ""
+    return hashlib.sha1(text.strip().encode('utf-8')).hexdigest()[:16]
+
+
+def hash_file(path):
+    """Return a short content hash of a file, or '' if it cannot be read."""
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return ""
+    cache_key = (path, stat.st_size, stat.st_mtime_ns)
+    if cache_key in _file_hash_cache:
+        return _file_hash_cache[cache_key]
+    digest = hashlib.sha1()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+    except OSError:
+        return ""
+    _file_hash_cache[cache_key] = digest.hexdigest()[:16]
+    return _file_hash_cache[cache_key]
+
+
+def hash_prompt(job_params):
+    """Hash everything in job_params that changes what the model is asked to do."""
+    fingerprint = "\x1f".join(str(job_params.get(key, "")) for key in
+                              ["system_prompt", "user_prompt", "temp", "val_text",
+                               "use_images", "current_image", "num_prev_images", "num_after_images"])
+    # Added only when on, so records made before cropping existed keep their hash
+    if job_params.get("crop_to_content"):
+        fingerprint += "\x1fcrop_to_content"
+    return hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:16]
+
+
+def load_provenance(value):
+    """Parse a Provenance cell into a dict, tolerating empty or malformed values."""
+    if isinstance(value, dict):
+        return value
+    if not isinstance(value, str) or not value.strip():
+        return {}
+    try:
+        parsed = json.loads(value)
+        return parsed if isinstance(parsed, dict) else {}
+    except json.JSONDecodeError:
+        return {}
+
+
+def build_record(ai_job, source_hash, job_params):
+    """Create the provenance record stored for one derived cell."""
+    return {
+        "job": ai_job,
+        "source_hash": source_hash,
+        "preset": job_params.get('preset_name_used', ""),
+        "prompt_hash": hash_prompt(job_params),
+        "model": job_params.get('engine', ""),
+    }
+
+
+def record_provenance(main_df, index, ai_job, source_hash, job_params, copied_from=None):
+    """
+    Write provenance records for every column the job produced at this index.
+    copied_from names the page (1-based number) whose results a duplicate page received.
+    """
+    if PROVENANCE_COLUMN not in main_df.columns:
+        main_df[PROVENANCE_COLUMN] = ""
+    provenance = load_provenance(main_df.at[index, PROVENANCE_COLUMN])
+    record = build_record(ai_job, source_hash, job_params)
+    if copied_from is not None:
+        record["copied_from_page"] = copied_from
+    for target_col in TRACKED_JOB_TARGETS.get(ai_job, []):
+        provenance[target_col] = record
+    main_df.at[index, PROVENANCE_COLUMN] = json.dumps(provenance, sort_keys=True)
+
+
+def is_stale(row_data, ai_job, source_hash, job_params):
+    """
+    A page is stale for a job if any target column is empty, has no provenance,
+    or was produced from a different source, preset, prompt or model.
+    """
+    provenance = load_provenance(row_data.get(PROVENANCE_COLUMN, ""))
+    expected = build_record(ai_job, source_hash, job_params)
+    for target_col in TRACKED_JOB_TARGETS.get(ai_job, []):
+        value = row_data.get(target_col, "")
+        if pd.isna(value) or not str(value).strip():
+            return True
+        record = provenance.get(target_col)
+        if not record:
+            return True
+        for key in ["source_hash", "preset", "prompt_hash", "model"]:
+            if record.get(key) != expected[key]:
+                return True
+    return False
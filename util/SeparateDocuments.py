@@ -134,6 +134,9 @@ def apply_document_separation(app):
     if app.main_df.empty:
         messagebox.showinfo("No Documents", "No documents to separate.")
         return
+
+    # main_df is rebuilt from every page's text
+    app.project_io.ensure_text_loaded()
     
     # Check if any text contains the separator
     documents_separated = False
@@ -163,7 +166,7 @@ def apply_document_separation(app):
     
     # Confirm with user
     if not messagebox.askyesno("Warning", 
-                               "This will reorganize your documents based on ***** separators.\n\nThis action cannot be undone!\n\nContinue?"):
+                               "This will reorganize your documents based on ***** separators.\n\nIt can be reverted from Edit > Version History.\n\nContinue?"):
         return
     
     # Use progress bar
@@ -175,8 +178,8 @@ def apply_document_separation(app):
         from util.CompileDocuments import CompileDocuments
         analyzer = CompileDocuments(app)
         
-        # Get a copy of the original dataframe in case we need to restore it
-        original_df = app.main_df.copy()
+        # The original frame is only read while the new one is built (main_df is replaced, not modified)
+        original_df = app.main_df
         
         # Update progress
         app.progress_bar.update_progress(20, 100)
@@ -244,8 +247,10 @@ def apply_document_separation(app):
         app.progress_bar.update_progress(80, 100)
         progress_label.config(text="Finalizing changes...")
         
-        # Replace the main_df with the new one
+        # Keep the frame before separation in the version history, then replace it
+        app.history.checkpoint("Apply Document Separation")
         app.main_df = new_main_df
+        app.autosave.mark_structure_changed()
         
         # Reset page counter
         app.page_counter = 0
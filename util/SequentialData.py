@@ -4,7 +4,16 @@ import pandas as pd
 import math
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import re
-from util.JSONExtraction import extract_json_from_response
+from util.JSONExtraction import extract_json_from_response, find_missing_indices
+from util.JobPlanner import estimate_text_tokens
+
+# Output tokens each analysed entry is expected to produce: a fixed overhead plus an allowance per header
+OUTPUT_TOKENS_PER_ENTRY = 20
+OUTPUT_TOKENS_PER_HEADER = 15
+# Entries per chunk in token-budget mode never exceed this, however short they are
+MAX_ENTRIES_PER_CHUNK = 500
+# How many times a truncated chunk may be halved and retried
+MAX_CHUNK_SPLIT_DEPTH = 4
 
 def df_to_json_array(df, text_column):
     """
@@ -21,8 +30,12 @@ def df_to_json_array(df, text_column):
     return json.dumps(arr, ensure_ascii=False)
 
 
-async def _call_single_chunk_api(app, chunk_df, preset_name, text_column, previous_chunk_data=None):
-    """Helper async function to call API for a single DataFrame chunk."""
+async def _call_single_chunk_api(app, chunk_df, preset_name, text_column, previous_chunk_data=None, context_rows=0):
+    """
+    Helper async function to call API for a single DataFrame chunk.
+    If context_rows > 0, the first context_rows entries of chunk_df repeat the end of
+    the previous chunk so the model can pick up carried-forward fields itself.
+    """
     # Find the preset
     preset = next((p for p in app.settings.sequential_metadata_presets if p.get('name') == preset_name), None)
     if not preset:
@@ -47,18 +60,19 @@ async def _call_single_chunk_api(app, chunk_df, preset_name, text_column, previo
 
     # --- Add context from previous chunk if available ---
     if previous_chunk_data and isinstance(previous_chunk_data, dict):
-        # Extract location or other relevant fields from the previous chunk's last data item
-        # For now, prioritize 'Location', but this could be made more dynamic
-        previous_location = previous_chunk_data.get('Location')
-        if previous_location:
-            context_string = f"\n\nYour analysis starts part way through. The location of the last entry was: {previous_location}"
+        # Carry forward every field the last analysed entry had (Date, Place, Author, ...)
+        carried = [f"{key}: {value}" for key, value in previous_chunk_data.items()
+                   if key != 'index' and value is not None and str(value).strip()]
+        if carried:
+            context_string = ("\n\nYour analysis starts part way through. The last entry before this section had "
+                              + "; ".join(carried) + ". Carry these values forward until the text changes them.")
             user_prompt += context_string
             app.error_logging(f"Added context to prompt: {context_string}", level="INFO")
         else:
-            # Optionally add context even if location is missing, using other fields
-            # context_string = f"\n\nContext from previous entry: {previous_chunk_data}"
-            # user_prompt += context_string
-            app.error_logging(f"Previous chunk data provided, but 'Location' key missing or empty: {previous_chunk_data}", level="INFO")
+            app.error_logging(f"Previous chunk data provided, but every field is empty: {previous_chunk_data}", level="INFO")
+    if context_rows:
+        user_prompt += (f"\n\nYour analysis starts part way through. The first {context_rows} entries repeat the end of the "
+                        f"previous section for context; analyze them as well so the following entries continue from them.")
     # --- End context addition ---
 
     # Print prompts for the first chunk for debugging (optional)
@@ -156,14 +170,130 @@ def _parse_index_string(index_str, app):
     app.error_logging(f"DEBUG _parse_index_string: Returning indices (Exit Point 2).", level="DEBUG")
     return indices
 
-def call_sequential_api(app, df, preset_name):
+def _rows_from_parsed_data(app, parsed_chunk_data):
     """
-    Call the API for sequential data analysis in chunks using the selected preset.
-    - app: main app instance (must have .settings and .api_handler)
-    - df: DataFrame to process
-    - preset_name: name of the sequential metadata preset to use
-    Returns: Combined DataFrame with results from all chunks, or empty DataFrame on error.
+    Turn the parsed JSON list from one chunk into result rows.
+    The first key of each item is taken as the index key (an int or a
+    comma-separated string of indices); all other keys are data.
+
+    Returns:
+        tuple: (list of row dicts with an 'index' key, data dict of the last row for carrying forward)
+    """
+    chunk_results = []
+    last_data = None
+    for item in parsed_chunk_data:
+        if not isinstance(item, dict) or not item:
+            app.error_logging(f"Skipping non-dictionary or empty item in parsed data: {item}", level="WARNING")
+            continue
+        try:
+            item_keys = list(item.keys())
+            index_key_name = item_keys[0]
+            index_value = item[index_key_name]
+            # Collect all other keys and their values as data
+            data_to_apply = {k: v for i, (k, v) in enumerate(item.items()) if i > 0}
+
+            if isinstance(index_value, int):
+                indices = [index_value] # Single index
+            elif isinstance(index_value, str):
+                # Parse the string value (e.g., "0, 1, 2")
+                indices = _parse_index_string(index_value, app)
+            else:
+                app.error_logging(f"Unexpected type for index key '{index_key_name}': {type(index_value)}. Value: {index_value}. Skipping item.", level="WARNING")
+                continue
+
+            if not indices:
+                app.error_logging(f"Could not extract valid indices from key '{index_key_name}' with value '{index_value}'. Skipping item.", level="WARNING")
+                continue
+
+            for idx in indices:
+                row_data = {'index': idx}
+                row_data.update(data_to_apply)
+                chunk_results.append(row_data)
+            last_data = data_to_apply
+        except Exception as item_processing_error:
+            app.error_logging(f"Error processing item based on key order: {item_processing_error}. Item: {item}", level="ERROR")
+            continue
+    return chunk_results, last_data
+
+
+def _run_chunk(app, chunk_df, preset_name, text_column, previous_chunk_data=None, context_rows=0, depth=0):
+    """
+    Call the API for one chunk and parse its rows. Complete items are kept even
+    from truncated output; only the entries no item covers are split in half and
+    re-requested, up to MAX_CHUNK_SPLIT_DEPTH times.
+
+    Returns:
+        tuple: (list of row dicts, last row's data dict or None); ([], None) on failure.
     """
+    raw_response = asyncio.run(_call_single_chunk_api(app, chunk_df, preset_name, text_column, previous_chunk_data, context_rows))
+    chunk_results, last_data = [], None
+    parsed_chunk_data = []
+    if raw_response == "Error":
+        app.error_logging("API call for a chunk returned 'Error'", level="ERROR")
+    elif raw_response:
+        parsed_chunk_data = extract_json_from_response(raw_response, app.error_logging)
+        if isinstance(parsed_chunk_data, list) and parsed_chunk_data:
+            chunk_results, last_data = _rows_from_parsed_data(app, parsed_chunk_data)
+            if not chunk_results:
+                app.error_logging("No valid rows generated from parsed chunk data.", level="WARNING")
+        else:
+            if parsed_chunk_data is not None:
+                app.error_logging(f"Parsed JSON chunk was not a non-empty list: {type(parsed_chunk_data)}", level="WARNING")
+            parsed_chunk_data = []
+
+    # Entries no returned item covers were lost to truncation (or the whole chunk failed)
+    own_df = chunk_df.iloc[context_rows:]
+    missing_df = own_df.loc[find_missing_indices(parsed_chunk_data, list(own_df.index))]
+    if missing_df.empty or depth >= MAX_CHUNK_SPLIT_DEPTH or len(own_df) == 1: # A single entry can't be split further
+        if not missing_df.empty and depth >= MAX_CHUNK_SPLIT_DEPTH:
+            app.error_logging(f"Giving up on {len(missing_df)} entries after {depth} splits (indices {missing_df.index.min()}-{missing_df.index.max()})", level="ERROR")
+        return chunk_results, last_data
+
+    app.error_logging(f"Chunk output incomplete: retrying {len(missing_df)} unanswered entries in smaller chunks", level="WARNING")
+    halves = [missing_df.iloc[:len(missing_df) // 2], missing_df.iloc[len(missing_df) // 2:]] if len(missing_df) > 1 else [missing_df]
+    for half in halves:
+        if half.empty:
+            continue
+        half_results, half_last = _run_chunk(app, half, preset_name, text_column, last_data or previous_chunk_data, 0, depth + 1)
+        chunk_results.extend(half_results)
+        last_data = half_last or last_data
+    return chunk_results, last_data
+
+
+def build_chunks(app, df, preset_name=None):
+    """
+    Split df into consecutive chunks. With a positive sequential_token_budget,
+    each chunk holds as many entries as fit the input budget (entry text) and
+    the output budget (estimated JSON per entry); otherwise chunks are a fixed
+    sequential_batch_size rows.
+    """
+    input_budget = int(getattr(app.settings, 'sequential_token_budget', 0) or 0)
+    if input_budget > 0:
+        output_budget = int(getattr(app.settings, 'sequential_output_token_budget', 0) or 0) or input_budget
+        preset = next((p for p in app.settings.sequential_metadata_presets if p.get('name') == preset_name), {})
+        headers = preset.get('required_headers', "Date;Place")
+        header_count = len(headers) if isinstance(headers, list) else len([h for h in str(headers).split(';') if h.strip()])
+        output_per_entry = OUTPUT_TOKENS_PER_ENTRY + OUTPUT_TOKENS_PER_HEADER * max(1, header_count)
+        use_col = 'Original_Text' if 'Original_Text' in df.columns else 'Text'
+
+        chunks = []
+        start = 0
+        input_tokens = output_tokens = 0
+        for position, text in enumerate(df[use_col] if use_col in df.columns else [""] * len(df)):
+            entry_tokens = estimate_text_tokens(text if isinstance(text, str) else "") + 10 # JSON wrapping
+            full = position > start and (input_tokens + entry_tokens > input_budget
+                                         or output_tokens + output_per_entry > output_budget
+                                         or position - start >= MAX_ENTRIES_PER_CHUNK)
+            if full:
+                chunks.append(df.iloc[start:position])
+                start = position
+                input_tokens = output_tokens = 0
+            input_tokens += entry_tokens
+            output_tokens += output_per_entry
+        if start < len(df):
+            chunks.append(df.iloc[start:])
+        return chunks
+
     chunk_size = 25
     try:
         chunk_size = int(app.settings.sequential_batch_size)
@@ -173,186 +303,132 @@ def call_sequential_api(app, df, preset_name):
     except (ValueError, TypeError):
         app.error_logging(f"Error parsing sequential_batch_size ({app.settings.sequential_batch_size}), defaulting to 25.", level="WARNING")
         chunk_size = 25
-
     num_chunks = math.ceil(len(df) / chunk_size)
-    df_chunks = [df.iloc[i * chunk_size:(i + 1) * chunk_size] for i in range(num_chunks)] # Use iloc for reliable slicing
-    results_dfs = []
-    previous_chunk_last_data = None # Store data from the last item of the previous chunk
-
-    # Determine text column once
-    text_column = 'Original_Text' if 'Original_Text' in df.columns else 'Text' # Simplified
+    return [df.iloc[i * chunk_size:(i + 1) * chunk_size] for i in range(num_chunks)] # Use iloc for reliable slicing
 
-    print(f"Processing sequential data in {num_chunks} chunks of size {chunk_size}...")
 
-    # Process chunks sequentially to pass context
+def _process_chunks_serially(app, df_chunks, preset_name, text_column):
+    """Original mode: run chunks in order, passing the last entry's data forward as context."""
+    results = {}
+    previous_chunk_last_data = None
     for i, chunk in enumerate(df_chunks):
-        print(f"Processing chunk {i+1}/{num_chunks} (Indices: {chunk.index.min()}-{chunk.index.max()})")
+        app.error_logging(f"Processing chunk {i+1}/{len(df_chunks)} (Indices: {chunk.index.min()}-{chunk.index.max()})", level="INFO")
         try:
-            # Call the API for the current chunk, passing data from the previous one
-            raw_response = asyncio.run(_call_single_chunk_api(app, chunk, preset_name, text_column, previous_chunk_last_data))
-
-            # Reset last data for the next iteration in case of failure
-            current_chunk_last_data = None
-
-            if raw_response and raw_response != "Error":
-                # Use the new extraction function directly
-                # It handles cleaning, parsing, regex fallback, and basic error logging
-                parsed_chunk_data = extract_json_from_response(raw_response, app.error_logging)
-
-                # Check if the extraction was successful and returned a non-empty list
-                if isinstance(parsed_chunk_data, list) and parsed_chunk_data:
-                    chunk_results = [] # Initialize list to hold rows for this chunk's DataFrame
-
-                    # Process each item (dictionary) in the parsed list
-                    for item in parsed_chunk_data:
-                        if not isinstance(item, dict) or not item:
-                            app.error_logging(f"Skipping non-dictionary or empty item in parsed data: {item}", level="WARNING")
-                            continue
-
-                        try:
-                            item_keys = list(item.keys())
-                            if not item_keys:
-                                app.error_logging(f"Skipping item with no keys: {item}", level="WARNING")
-                                continue
-
-                            # Assume the first key is the index key
-                            index_key_name = item_keys[0]
-                            index_value = item[index_key_name]
-
-                            # Collect all other keys and their values as data
-                            data_to_apply = {k: v for i, (k, v) in enumerate(item.items()) if i > 0}
-
-                            indices = []
-                            # Determine indices based on the type of the index_value
-                            if isinstance(index_value, int):
-                                indices = [index_value] # Single index
-                            elif isinstance(index_value, str):
-                                # Parse the string value (e.g., "0, 1, 2")
-                                indices = _parse_index_string(index_value, app)
-                                # --- DEBUG: Print parsed indices ---
-                                app.error_logging(f"DEBUG: Parsed indices from '{index_value}': {indices}", level="DEBUG")
-                                # --- END DEBUG ---
-                            else:
-                                app.error_logging(f"Unexpected type for index key '{index_key_name}': {type(index_value)}. Value: {index_value}. Skipping item.", level="WARNING")
-                                continue # Skip this item if index format is wrong
-
-                            if not indices:
-                                app.error_logging(f"Could not extract valid indices from key '{index_key_name}' with value '{index_value}'. Skipping item.", level="WARNING")
-                                continue # Skip if parsing indices failed
-
-                            # Create a row for each index
-                            for idx in indices:
-                                row_data = {'index': idx}
-                                row_data.update(data_to_apply)
-                                chunk_results.append(row_data)
-
-                        except Exception as item_processing_error:
-                            app.error_logging(f"Error processing item based on key order: {item_processing_error}. Item: {item}", level="ERROR")
-                            continue # Skip to the next item on error
-
-                    # After processing all items, check if we gathered any results
-                    if chunk_results:
-                        chunk_df = pd.DataFrame(chunk_results)
-                        
-                        # --- DEBUG: Print head and tail of chunk_df ---
-                        print("\n--- Chunk DF Head (Debug) ---")
-                        print(chunk_df.head(3))
-                        print("\n--- Chunk DF Tail (Debug) ---")
-                        print(chunk_df.tail(3))
-                        print("--- End Chunk DF Debug ---\n")
-                        # --- END DEBUG ---
-                        
-                        # Get the context data from the *last* processed item's data
-                        # Find the last item in the original parsed_chunk_data that was successfully processed
-                        last_processed_original_item = None
-                        if parsed_chunk_data:
-                           # Iterate backwards through original items to find the one corresponding to the last chunk_result
-                           # This assumes indices are unique within the chunk processing
-                           if chunk_results:
-                              last_idx_in_results = chunk_results[-1].get('index')
-                              for original_item in reversed(parsed_chunk_data):
-                                 if isinstance(original_item, dict):
-                                     original_keys = list(original_item.keys())
-                                     if original_keys:
-                                         original_index_key = original_keys[0]
-                                         original_index_val = original_item.get(original_index_key)
-                                         parsed_original_indices = []
-                                         if isinstance(original_index_val, int):
-                                             parsed_original_indices = [original_index_val]
-                                         elif isinstance(original_index_val, str):
-                                             parsed_original_indices = _parse_index_string(original_index_val, app)
-
-                                         if last_idx_in_results in parsed_original_indices:
-                                             last_processed_original_item = original_item
-                                             break # Found the item
-
-                        if last_processed_original_item:
-                            item_keys = list(last_processed_original_item.keys())
-                            # Use the identified item to extract context data (all keys except the first)
-                            current_chunk_last_data = {k: v for i, (k, v) in enumerate(last_processed_original_item.items()) if i > 0}
-                            app.error_logging(f"Set context for next chunk: {current_chunk_last_data}", level="DEBUG")
-                        else:
-                            current_chunk_last_data = None # Reset if context couldn't be determined
-                            app.error_logging("Could not determine context for next chunk from last processed item.", level="WARNING")
-
-                        # Log columns found and append DF
-                        app.error_logging(f"Chunk DF columns: {chunk_df.columns.tolist()}", level="DEBUG")
-                        app.error_logging(f"Chunk DF shape: {chunk_df.shape}, rows processed: {len(chunk_results)}", level="INFO")
-                        results_dfs.append(chunk_df)
-                        app.error_logging(f"Appended chunk_df to results_dfs. Current count: {len(results_dfs)}", level="DEBUG")
-                    else:
-                        app.error_logging("No valid rows generated from parsed chunk data.", level="WARNING")
-                        # Ensure context is reset if no valid rows were generated
-                        current_chunk_last_data = None
+            chunk_results, last_data = _run_chunk(app, chunk, preset_name, text_column, previous_chunk_last_data)
+            for row in chunk_results:
+                results[row['index']] = row
+            previous_chunk_last_data = last_data
+        except Exception as e:
+            app.error_logging(f"Error processing chunk {i+1}: {str(e)}", level="ERROR")
+            previous_chunk_last_data = None # Reset context if a chunk fails
+    return results
 
-                else:
-                     # This else catches cases where parsed_chunk_data is None (extraction failed)
-                     # or it wasn't a non-empty list
-                     if parsed_chunk_data is not None: # Only log if it wasn't None but still invalid
-                         app.error_logging(f"Parsed JSON chunk was not a non-empty list: {type(parsed_chunk_data)}", level="WARNING")
-                     # Error logging for failed parsing is handled within extract_json_from_response
 
-            elif raw_response == "Error":
-                 app.error_logging("API call for a chunk returned 'Error'", level="ERROR")
-            # else: response was None or empty, ignore
+def _process_chunks_in_parallel(app, df_chunks, preset_name, text_column, overlap):
+    """
+    Run every chunk concurrently, each prefixed with the last `overlap` entries of
+    the previous chunk as context. Then reconcile boundaries in order: where a
+    chunk's output for the shared entries disagrees with the previous chunk's
+    (after that chunk's own reconciliation), the leading entries that inherited
+    the disagreeing values are re-run serially with the previous chunk's tail
+    and its settled field values as context.
+    """
+    chunk_inputs = []
+    for i, chunk in enumerate(df_chunks):
+        tail = df_chunks[i - 1].iloc[-overlap:] if i > 0 and overlap > 0 else df_chunks[i].iloc[0:0]
+        chunk_inputs.append((pd.concat([tail, chunk]), len(tail)))
+
+    chunk_results = [[] for _ in df_chunks]
+    max_workers = max(1, min(int(getattr(app.settings, 'batch_size', 50) or 1), len(df_chunks)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_run_chunk, app, chunk_input, preset_name, text_column, None, context_rows): i
+                   for i, (chunk_input, context_rows) in enumerate(chunk_inputs)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                chunk_results[i], _ = future.result()
+            except Exception as e:
+                app.error_logging(f"Error processing chunk {i+1}: {str(e)}", level="ERROR")
 
-            # Update the data for the next chunk's context
-            previous_chunk_last_data = current_chunk_last_data
+    results = {}
+    rerun_count = 0
+    for i, chunk in enumerate(df_chunks):
+        own_indices = list(chunk.index)
+        rows_by_index = {row['index']: row for row in chunk_results[i]}
+
+        boundary = []
+        disagreeing = []
+        previous_row = None
+        if i > 0 and own_indices:
+            # Compare carried-forward fields on the last entry both chunks analysed
+            shared_index = df_chunks[i - 1].index[-1]
+            previous_row = results.get(shared_index)
+            context_row = rows_by_index.get(shared_index)
+            if not chunk_results[i]:
+                boundary = own_indices # Whole chunk failed
+            elif previous_row and context_row:
+                disagreeing = [key for key in previous_row if key != 'index' and key in context_row
+                               and str(previous_row[key]).strip() != str(context_row[key]).strip()]
+                # Leading entries that still carry the context row's values inherited the disagreement
+                for idx in own_indices if disagreeing else []:
+                    row = rows_by_index.get(idx)
+                    if row is None or all(str(row.get(key, "")).strip() == str(context_row[key]).strip() for key in disagreeing):
+                        boundary.append(idx)
+                    else:
+                        break
+
+        if boundary:
+            rerun_count += len(boundary)
+            app.error_logging(f"Reconciling chunk {i+1}: re-running {len(boundary)} boundary entries serially (fields: {disagreeing})", level="INFO")
+            previous_data = {k: v for k, v in previous_row.items() if k != 'index'} if previous_row else None
+            # Re-run with the previous chunk's tail in front, as in the first pass, plus its settled values
+            tail = df_chunks[i - 1].iloc[-overlap:] if overlap > 0 else chunk.iloc[0:0]
+            rerun_rows, _ = _run_chunk(app, pd.concat([tail, chunk.loc[boundary]]), preset_name, text_column,
+                                       previous_data, len(tail))
+            boundary_set = set(boundary)
+            for row in rerun_rows:
+                if row['index'] in boundary_set:
+                    rows_by_index[row['index']] = row
+
+        # Keep only each chunk's own entries; shared entries belong to the previous chunk
+        for idx in own_indices:
+            if idx in rows_by_index:
+                results[idx] = rows_by_index[idx]
+
+    app.error_logging(f"Parallel sequential analysis: {len(df_chunks)} chunks, {rerun_count} boundary entries re-run", level="INFO")
+    return results
 
-        except Exception as e:
-            app.error_logging(f"Error processing chunk {i+1}: {str(e)}", level="ERROR")
-            previous_chunk_last_data = None # Reset context if a chunk fails
 
-    # Concatenate all collected DataFrames
-    if results_dfs:
-        try:
-            # Concatenate, ignoring index to create a fresh one if merging different formats
-            combined_df = pd.concat(results_dfs, ignore_index=True)
-            # Drop duplicates based on 'index' keeping the last occurrence if any overlaps happened
-            # (Unlikely with chunking but safe)
-            if 'index' in combined_df.columns:
-                 combined_df = combined_df.drop_duplicates(subset=['index'], keep='last')
-            
-            print("Last three rows of the combined DataFrame from API results:")
-            print(combined_df.tail(3))
-            # Check if the crucial 'index' column exists before returning
-            if 'index' not in combined_df.columns:
-                 app.error_logging("Combined DataFrame is missing the crucial 'index' column!", level="ERROR")
-                 return pd.DataFrame() # Return empty if index is missing
-
-            # --- Add Debug Logging --- 
-            app.error_logging(f"Final combined_df shape before return: {combined_df.shape}", level="DEBUG")
-            app.error_logging(f"Final combined_df tail before return:\n{combined_df.tail()}", level="DEBUG")
-            # --- End Debug Logging ---
-
-             # Sort by index before returning for consistency
-            combined_df = combined_df.sort_values(by='index') # Keep original index for merging
-            return combined_df
-        except Exception as concat_err:
-             app.error_logging(f"Error during final concatenation or sorting: {concat_err}", level="ERROR")
-             # Log the list of dataframes that failed to concat
-             app.error_logging(f"results_dfs content snippet: {[df.head(1) for df in results_dfs[:2]]}", level="DEBUG")
-             return pd.DataFrame()
+def call_sequential_api(app, df, preset_name):
+    """
+    Call the API for sequential data analysis in chunks using the selected preset.
+    - app: main app instance (must have .settings and .api_handler)
+    - df: DataFrame to process
+    - preset_name: name of the sequential metadata preset to use
+    Returns: Combined DataFrame with results from all chunks, or empty DataFrame on error.
+    """
+    df_chunks = build_chunks(app, df, preset_name)
+
+    # Determine text column once
+    text_column = 'Original_Text' if 'Original_Text' in df.columns else 'Text' # Simplified
+
+    if getattr(app.settings, 'sequential_parallel', True) and len(df_chunks) > 1:
+        overlap = max(0, int(getattr(app.settings, 'sequential_overlap', 3) or 0))
+        app.error_logging(f"Processing sequential data in {len(df_chunks)} parallel chunks with {overlap} entries of overlap", level="INFO")
+        results = _process_chunks_in_parallel(app, df_chunks, preset_name, text_column, overlap)
     else:
-        print("No valid data parsed from any API chunks.")
+        app.error_logging(f"Processing sequential data in {len(df_chunks)} chunks serially", level="INFO")
+        results = _process_chunks_serially(app, df_chunks, preset_name, text_column)
+
+    if not results:
+        app.error_logging("No valid data parsed from any API chunks.", level="WARNING")
         return pd.DataFrame() # Return empty if no data was successfully parsed
+
+    try:
+        combined_df = pd.DataFrame(list(results.values()))
+        app.error_logging(f"Final combined_df shape before return: {combined_df.shape}", level="DEBUG")
+        # Sort by index before returning for consistency
+        return combined_df.sort_values(by='index') # Keep original index for merging
+    except Exception as concat_err:
+        app.error_logging(f"Error during final concatenation or sorting: {concat_err}", level="ERROR")
+        return pd.DataFrame()
@@ -44,6 +44,7 @@ class Settings:
         saved_openai_key = getattr(self, 'openai_api_key', "")
         saved_anthropic_key = getattr(self, 'anthropic_api_key', "")
         saved_google_key = getattr(self, 'google_api_key', "")
+        saved_latency_stats = getattr(self, 'api_latency_stats', {})
         
         self.chunk_text_presets = [
             {
@@ -181,6 +182,19 @@ These are the line numbers where a document separator should be placed immediate
                 'val_text': "Corrected Transcript:",
                 "thinking_budget": "128"
             },
+            {
+                'name': "HTR_Correct",
+                'model': "gemini-2.5-pro",
+                'temperature': "0.3",
+                'general_instructions': '''Your task is to accurately transcribe handwritten historical documents and then produce a corrected, publishable version of your transcription. First, work character by character, word by word, line by line, transcribing the text exactly as it appears on the page, retaining spelling errors, grammar, syntax, punctuation and line breaks. Transcribe all the text on the page including headers, footers, marginalia, insertions, page numbers, catchwords, etc. Then compare your transcription against the handwritten page again and correct any misreadings so that the spelling, syntax, punctuation, numbers and line breaks match the original exactly. Respond only with a JSON object with two keys: "transcription" containing your first-pass transcription and "corrected_text" containing the corrected transcription.''',
+                'specific_instructions': '''Transcribe and then correct this page from an 18th/19th century document. Respond only with a JSON object containing the keys "transcription" and "corrected_text".''',
+                'use_images': True,
+                'current_image': "Yes",
+                'num_prev_images': "0",
+                'num_after_images': "0",
+                'val_text': "",
+                "thinking_budget": "128"
+            },
             {
                 'name': "Identify_Errors",
                 'model': "gemini-2.0-flash",
@@ -508,6 +522,30 @@ Current Diary Entry to Analyze: {text_to_process}''',
 
         self.batch_size = 50
         self.check_orientation = False
+        # Local blank/non-text page detection before HTR: "Off", "Skip" or "Cheap Model"
+        self.blank_page_handling = "Off"
+        self.blank_page_model = "gemini-2.5-flash"
+        # Auto_Rotate: pages the local estimator is at least this confident about skip the API
+        self.local_orientation_detection = True
+        self.local_orientation_confidence = 0.6
+        # AI jobs process one page of each near-duplicate group and copy its results (opt-in)
+        self.skip_duplicate_pages = False
+        # Sequential analysis: run chunks concurrently with this many entries of overlap
+        self.sequential_parallel = True
+        self.sequential_overlap = 3
+        # Sequential chunk sizing by estimated tokens (0 = fixed sequential_batch_size rows)
+        self.sequential_token_budget = 6000
+        self.sequential_output_token_budget = 6000
+        # Save projects to a SQLite database file (.pbdb), rewriting only changed pages
+        self.project_database = False
+        # Otherwise save them as a compressed columnar snapshot file (.pbs) rather than a CSV file (.pbf)
+        self.project_snapshot = False
+        # Background saves of changed pages every autosave_interval seconds or after this many changes
+        self.autosave_enabled = True
+        self.autosave_interval = 60
+        self.autosave_change_threshold = 25
+        # Open database projects without reading long text columns until a page or job needs them
+        self.lazy_text_loading = True
         
         self.model_list = [
             "gpt-4o",
@@ -521,6 +559,9 @@ Current Diary Entry to Analyze: {text_to_process}''',
         # Initialize recent projects list (max 4 projects)
         self.recent_projects = []
 
+        # Recorded per-model API latency, used by the job planner (kept across restores)
+        self.api_latency_stats = saved_latency_stats
+
         # Restore API keys
         self.openai_api_key = saved_openai_key
         self.anthropic_api_key = saved_anthropic_key
@@ -574,6 +615,21 @@ If you don't have information for a heading or don't know, leave it blank.'''
             'model_list': self.model_list,                                              # List of models
             'batch_size': self.batch_size,                                              # Batch size for processing
             'check_orientation': self.check_orientation,                                # Check orientation of text
+            'blank_page_handling': self.blank_page_handling,                            # Blank page detection before HTR
+            'blank_page_model': self.blank_page_model,
+            'local_orientation_detection': self.local_orientation_detection,
+            'local_orientation_confidence': self.local_orientation_confidence,
+            'skip_duplicate_pages': self.skip_duplicate_pages,
+            'sequential_parallel': self.sequential_parallel,
+            'sequential_overlap': self.sequential_overlap,
+            'sequential_token_budget': self.sequential_token_budget,
+            'sequential_output_token_budget': self.sequential_output_token_budget,
+            'project_database': self.project_database,
+            'project_snapshot': self.project_snapshot,
+            'autosave_enabled': self.autosave_enabled,
+            'autosave_interval': self.autosave_interval,
+            'autosave_change_threshold': self.autosave_change_threshold,
+            'lazy_text_loading': self.lazy_text_loading,
             'analysis_presets': self._ensure_image_fields(self.analysis_presets),
             'function_presets': self._ensure_image_fields(self.function_presets),
             'transcription_presets': self._ensure_image_fields(self.transcription_presets),
@@ -599,6 +655,7 @@ If you don't have information for a heading or don't know, leave it blank.'''
             'query_model': self.query_model,
             'sequential_batch_size': self.sequential_batch_size,                     # Sequential Batch Size
             'recent_projects': self.recent_projects,                                 # Recent projects list
+            'api_latency_stats': self.api_latency_stats,                             # Recorded API latency per model
         }
         
         with open(self.settings_file_path, 'w') as f:
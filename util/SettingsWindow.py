@@ -234,6 +234,72 @@ class SettingsWindow:
                                                command=self.update_check_orientation)
         orientation_checkbox.grid(row=2, column=0, columnspan=2, padx=10, pady=5, sticky="w")
 
+        # Local blank/non-text page detection before Recognize Text
+        blank_page_frame = tk.Frame(self.right_frame)
+        blank_page_frame.grid(row=3, column=0, columnspan=2, padx=10, pady=5, sticky="w")
+        tk.Label(blank_page_frame, text="Blank or non-text pages before recognition:").pack(side="left")
+        self.blank_page_handling_var = tk.StringVar(value=self.settings.blank_page_handling)
+        blank_page_dropdown = ttk.Combobox(blank_page_frame, textvariable=self.blank_page_handling_var,
+                                           values=["Off", "Skip", "Cheap Model"], state="readonly", width=12)
+        blank_page_dropdown.pack(side="left", padx=5)
+        blank_page_dropdown.bind("<<ComboboxSelected>>", self.update_blank_page_settings)
+        tk.Label(blank_page_frame, text="Cheap model:").pack(side="left", padx=(10, 0))
+        self.blank_page_model_var = tk.StringVar(value=self.settings.blank_page_model)
+        blank_model_dropdown = ttk.Combobox(blank_page_frame, textvariable=self.blank_page_model_var,
+                                            values=self.settings.model_list, width=25)
+        blank_model_dropdown.pack(side="left", padx=5)
+        blank_model_dropdown.bind("<<ComboboxSelected>>", self.update_blank_page_settings)
+        blank_model_dropdown.bind("<FocusOut>", self.update_blank_page_settings)
+
+        # Near-duplicate pages share one set of AI results
+        self.skip_duplicate_pages_var = tk.BooleanVar(value=self.settings.skip_duplicate_pages)
+        duplicate_checkbox = ttk.Checkbutton(self.right_frame,
+                                             text="Process only one copy of near-duplicate pages and copy its results to the others?",
+                                             variable=self.skip_duplicate_pages_var,
+                                             command=self.update_skip_duplicate_pages)
+        duplicate_checkbox.grid(row=4, column=0, columnspan=2, padx=10, pady=5, sticky="w")
+
+        # Database project file (legacy .pbf projects still open)
+        self.project_database_var = tk.BooleanVar(value=self.settings.project_database)
+        project_database_checkbox = ttk.Checkbutton(self.right_frame,
+                                                    text="Save projects as a database file (.pbdb) that only rewrites changed pages?",
+                                                    variable=self.project_database_var,
+                                                    command=self.update_project_database)
+        project_database_checkbox.grid(row=5, column=0, columnspan=2, padx=10, pady=5, sticky="w")
+
+        # Compressed snapshot project file, used when the database file is off
+        self.project_snapshot_var = tk.BooleanVar(value=self.settings.project_snapshot)
+        project_snapshot_checkbox = ttk.Checkbutton(self.right_frame,
+                                                    text="Otherwise save projects as a compressed snapshot file (.pbs) instead of CSV (.pbf)?",
+                                                    variable=self.project_snapshot_var,
+                                                    command=self.update_project_snapshot)
+        project_snapshot_checkbox.grid(row=6, column=0, columnspan=2, padx=10, pady=5, sticky="w")
+
+        # Background autosave of saved projects
+        autosave_frame = tk.Frame(self.right_frame)
+        autosave_frame.grid(row=7, column=0, columnspan=2, padx=10, pady=5, sticky="w")
+        self.autosave_enabled_var = tk.BooleanVar(value=self.settings.autosave_enabled)
+        ttk.Checkbutton(autosave_frame, text="Autosave every", variable=self.autosave_enabled_var,
+                        command=self.update_autosave_settings).pack(side="left")
+        self.autosave_interval_spinbox = ttk.Spinbox(autosave_frame, from_=5, to=3600, width=6, command=self.update_autosave_settings)
+        self.autosave_interval_spinbox.set(self.settings.autosave_interval)
+        self.autosave_interval_spinbox.pack(side="left", padx=5)
+        self.autosave_interval_spinbox.bind("<FocusOut>", self.update_autosave_settings)
+        tk.Label(autosave_frame, text="seconds or after").pack(side="left")
+        self.autosave_threshold_spinbox = ttk.Spinbox(autosave_frame, from_=0, to=1000, width=6, command=self.update_autosave_settings)
+        self.autosave_threshold_spinbox.set(self.settings.autosave_change_threshold)
+        self.autosave_threshold_spinbox.pack(side="left", padx=5)
+        self.autosave_threshold_spinbox.bind("<FocusOut>", self.update_autosave_settings)
+        tk.Label(autosave_frame, text="changed pages (0 = interval only)").pack(side="left")
+
+        # Lazy loading of long text columns for database projects
+        self.lazy_text_loading_var = tk.BooleanVar(value=self.settings.lazy_text_loading)
+        lazy_text_checkbox = ttk.Checkbutton(self.right_frame,
+                                             text="Open database projects without reading page text until a page or job needs it?",
+                                             variable=self.lazy_text_loading_var,
+                                             command=self.update_lazy_text_loading)
+        lazy_text_checkbox.grid(row=8, column=0, columnspan=2, padx=10, pady=5, sticky="w")
+
         # Bind the text widget to update settings variable
         self.models_text.bind("<KeyRelease>", self.update_model_list)
 
@@ -757,6 +823,11 @@ class SettingsWindow:
         self.analysis_after_images_entry.grid(row=1, column=3, padx=5, pady=5)
         self.bind_entry_update(self.analysis_after_images_entry, self.settings.function_presets, self.selected_function_preset_var, 'num_after_images')
 
+        self.crop_to_content_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.image_settings_frame, text="Send Only Text Region (crop margins)",
+                        variable=self.crop_to_content_var).grid(row=2, column=0, columnspan=4, padx=5, pady=5, sticky="w")
+        self.add_var_trace(self.crop_to_content_var, self.settings.function_presets, self.selected_function_preset_var, 'crop_to_content')
+
         # Instructions and Validation Frame
         instructions_frame = ttk.LabelFrame(self.right_frame, text="Instructions")
         instructions_frame.grid(row=4, column=0, columnspan=2, padx=10, pady=5, sticky="ew")
@@ -877,6 +948,11 @@ class SettingsWindow:
         self.transcription_after_images_entry.grid(row=1, column=3, padx=5, pady=5)
         self.bind_entry_update(self.transcription_after_images_entry, self.settings.transcription_presets, self.selected_transcription_preset_var, 'num_after_images')
 
+        self.transcription_crop_to_content_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.transcription_image_settings_frame, text="Send Only Text Region (crop margins)",
+                        variable=self.transcription_crop_to_content_var).grid(row=2, column=0, columnspan=4, padx=5, pady=5, sticky="w")
+        self.add_var_trace(self.transcription_crop_to_content_var, self.settings.transcription_presets, self.selected_transcription_preset_var, 'crop_to_content')
+
         # Instructions and Validation Frame
         instructions_frame = ttk.LabelFrame(self.right_frame, text="Instructions")
         instructions_frame.grid(row=4, column=0, columnspan=2, padx=10, pady=5, sticky="ew")
@@ -1287,6 +1363,7 @@ class SettingsWindow:
             self.current_image_var.set(preset.get('current_image', "Yes"))
             self.set_entry_text(self.analysis_prev_images_entry, preset.get('num_prev_images', "0"))
             self.set_entry_text(self.analysis_after_images_entry, preset.get('num_after_images', "0"))
+            self.crop_to_content_var.set(preset.get('crop_to_content', False))
             # Instructions
             self.set_text_widget(self.function_general_text, preset.get('general_instructions', ""))
             self.set_text_widget(self.function_specific_text, preset.get('specific_instructions', ""))
@@ -1312,6 +1389,7 @@ class SettingsWindow:
             self.transcription_current_image_var.set(preset.get('current_image', "Yes"))
             self.set_entry_text(self.transcription_prev_images_entry, preset.get('num_prev_images', "0"))
             self.set_entry_text(self.transcription_after_images_entry, preset.get('num_after_images', "0"))
+            self.transcription_crop_to_content_var.set(preset.get('crop_to_content', False))
             # Instructions
             self.set_text_widget(self.transcription_general_text, preset.get('general_instructions', ""))
             self.set_text_widget(self.transcription_specific_text, preset.get('specific_instructions', ""))
@@ -1491,6 +1569,28 @@ class SettingsWindow:
         self.seq_batch_size_entry.bind("<KeyRelease>", self._update_sequential_batch_size)
         self.seq_batch_size_entry.bind("<FocusOut>", self._update_sequential_batch_size)
 
+        # Parallel mode: chunks run concurrently and boundaries are reconciled afterwards
+        self.seq_parallel_var = tk.BooleanVar(value=self.settings.sequential_parallel)
+        ttk.Checkbutton(main_settings_frame, text="Run batches in parallel", variable=self.seq_parallel_var,
+                        command=self._update_sequential_parallel).grid(row=5, column=0, padx=5, pady=5, sticky="w")
+        tk.Label(main_settings_frame, text="Overlap Entries:").grid(row=6, column=0, padx=5, pady=5, sticky="w")
+        self.seq_overlap_spinbox = ttk.Spinbox(main_settings_frame, from_=0, to=10, width=8, command=self._update_sequential_parallel)
+        self.seq_overlap_spinbox.grid(row=6, column=1, padx=5, pady=5, sticky="w")
+        self.seq_overlap_spinbox.set(self.settings.sequential_overlap)
+        self.seq_overlap_spinbox.bind("<FocusOut>", self._update_sequential_parallel)
+
+        # Token budgets per batch; Batch Size is only used when the input budget is 0
+        tk.Label(main_settings_frame, text="Input Tokens per Batch (0 = use Batch Size):").grid(row=7, column=0, padx=5, pady=5, sticky="w")
+        self.seq_token_budget_entry = tk.Entry(main_settings_frame, width=10)
+        self.seq_token_budget_entry.grid(row=7, column=1, padx=5, pady=5, sticky="w")
+        self.seq_token_budget_entry.insert(0, str(self.settings.sequential_token_budget))
+        self.seq_token_budget_entry.bind("<FocusOut>", self._update_sequential_token_budgets)
+        tk.Label(main_settings_frame, text="Output Tokens per Batch:").grid(row=8, column=0, padx=5, pady=5, sticky="w")
+        self.seq_output_budget_entry = tk.Entry(main_settings_frame, width=10)
+        self.seq_output_budget_entry.grid(row=8, column=1, padx=5, pady=5, sticky="w")
+        self.seq_output_budget_entry.insert(0, str(self.settings.sequential_output_token_budget))
+        self.seq_output_budget_entry.bind("<FocusOut>", self._update_sequential_token_budgets)
+
         # Instructions Frame
         instructions_frame = ttk.LabelFrame(self.right_frame, text="Instructions & Headers") # Updated frame title
         instructions_frame.grid(row=2, column=0, columnspan=2, padx=10, pady=5, sticky="ew")
@@ -1598,6 +1698,26 @@ class SettingsWindow:
             self.seq_batch_size_entry.insert(0, str(self.settings.sequential_batch_size))
             messagebox.showwarning("Invalid Value", "Batch size must be an integer.", parent=self.settings_window)
 
+    def _update_sequential_parallel(self, event=None):
+        """Update the sequential parallel-mode settings."""
+        self.settings.sequential_parallel = self.seq_parallel_var.get()
+        try:
+            self.settings.sequential_overlap = max(0, int(self.seq_overlap_spinbox.get()))
+        except ValueError:
+            self.seq_overlap_spinbox.set(self.settings.sequential_overlap)
+        self.settings.save_settings()
+
+    def _update_sequential_token_budgets(self, event=None):
+        """Update the sequential token budget settings."""
+        for entry, attribute in [(self.seq_token_budget_entry, 'sequential_token_budget'),
+                                 (self.seq_output_budget_entry, 'sequential_output_token_budget')]:
+            try:
+                setattr(self.settings, attribute, max(0, int(entry.get())))
+            except ValueError:
+                self.set_entry_text(entry, getattr(self.settings, attribute))
+                messagebox.showwarning("Invalid Value", "Token budgets must be whole numbers.", parent=self.settings_window)
+        self.settings.save_settings()
+
 # Preset Creation Functions
 
     def create_new_function_preset_window(self):
@@ -2749,6 +2869,39 @@ If you don't have information for a heading or don't know, leave it blank.''',
             self.settings.check_orientation = self.check_orientation_var.get()
             self.settings.save_settings()
 
+    def update_blank_page_settings(self, event=None):
+            self.settings.blank_page_handling = self.blank_page_handling_var.get()
+            self.settings.blank_page_model = self.blank_page_model_var.get().strip() or self.settings.blank_page_model
+            self.settings.save_settings()
+
+    def update_skip_duplicate_pages(self):
+            self.settings.skip_duplicate_pages = self.skip_duplicate_pages_var.get()
+            self.settings.save_settings()
+
+    def update_project_database(self):
+            self.settings.project_database = self.project_database_var.get()
+            self.settings.save_settings()
+
+    def update_project_snapshot(self):
+            self.settings.project_snapshot = self.project_snapshot_var.get()
+            self.settings.save_settings()
+
+    def update_lazy_text_loading(self):
+            self.settings.lazy_text_loading = self.lazy_text_loading_var.get()
+            self.settings.save_settings()
+
+    def update_autosave_settings(self, event=None):
+            self.settings.autosave_enabled = self.autosave_enabled_var.get()
+            try:
+                self.settings.autosave_interval = max(5, int(self.autosave_interval_spinbox.get()))
+                self.settings.autosave_change_threshold = max(0, int(self.autosave_threshold_spinbox.get()))
+            except ValueError:
+                pass
+            self.settings.save_settings()
+            # Restart the timer so a new interval takes effect now
+            if hasattr(self.parent, 'autosave'):
+                self.parent.autosave.start()
+
     def update_function_preset_dropdown(self):
         """Update function preset dropdown if it exists."""
         try:
@@ -0,0 +1,391 @@
+# util/VersionHistory.py
+
+# This file contains the VersionHistory class, which is used to handle
+# the per-page version history and reverting of operations for the application.
+
+import json
+import math
+import os
+import time
+import zlib
+import tkinter as tk
+from tkinter import ttk, messagebox
+from util.ProjectSnapshot import read_snapshot, write_snapshot
+from util.PageTable import set_cell
+from util.ProjectStore import LARGE_TEXT_COLUMNS
+
+# Oldest operations are forgotten beyond this many
+MAX_OPERATIONS = 50
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _same_value(old, new):
+    if old is new or (_is_missing(old) and _is_missing(new)):
+        return True
+    try:
+        return type(old) == type(new) and bool(old == new)
+    except (TypeError, ValueError):
+        return False
+
+
+def _json_default(value):
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def _value_hash(value):
+    """Hash used to check that a cell still holds what an operation left in it."""
+    return hash(value if isinstance(value, str) else json.dumps(value, default=_json_default))
+
+
+def _common_prefix_length(a, b):
+    # Binary search over slice comparisons, which run in C
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def text_delta(old, new):
+    """
+    Reverse delta from new back to old: the lengths of the prefix and suffix
+    they share, and the part of old between them.
+    """
+    prefix = _common_prefix_length(old, new)
+    suffix = _common_prefix_length(old[prefix:][::-1], new[prefix:][::-1])
+    return [prefix, suffix, old[prefix:len(old) - suffix]]
+
+
+def apply_text_delta(new, delta):
+    prefix, suffix, old_middle = delta
+    return new[:prefix] + old_middle + new[len(new) - suffix:]
+
+
+class VersionHistory:
+    """
+    Per-page version history. Each recorded operation (an AI run, a replace-all,
+    a revert...) gets an ID and keeps, for every cell it changed, a delta from
+    the new value back to the old one, compressed per operation. Operations that
+    rebuild main_df keep a compressed snapshot of the frame before them in the
+    temp directory instead, so no full DataFrame copy is held in memory.
+
+    A single operation can be reverted on the cells nobody changed since; the
+    whole project can be reverted to its state before any recorded operation.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.operations = []  # oldest first
+        self._next_id = 1
+        self._open = None  # operation being recorded: label, page index and per-column values before it
+
+    def _history_directory(self):
+        directory = os.path.join(self.app.temp_directory, "history")
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def clear(self):
+        """Forget every operation, e.g. when another project is opened."""
+        for operation in self.operations:
+            self._discard(operation)
+        self.operations = []
+        self._open = None
+
+    def _discard(self, operation):
+        snapshot_path = operation.get("snapshot_path")
+        if snapshot_path and os.path.exists(snapshot_path):
+            try:
+                os.remove(snapshot_path)
+            except OSError as e:
+                self.app.error_logging(f"Could not remove history snapshot {snapshot_path}: {e}", level="WARNING")
+
+    def _add(self, operation):
+        self.operations.append(operation)
+        while len(self.operations) > MAX_OPERATIONS:
+            self._discard(self.operations.pop(0))
+
+    # Recording
+
+    def begin(self, label, indices=None, columns=None):
+        """
+        Start recording an operation that edits cells in place. indices limits
+        which pages it may touch: only those pages' deferred text is read, and
+        only those rows are kept and compared at end(). columns limits which
+        text columns it may touch: only those are read from a lazily opened
+        project, and other deferred text columns are left out of the record.
+
+        Returns:
+            object: token for end(), or None when nothing is recorded (nested
+            operations are recorded as part of the outer one).
+        """
+        if self._open is not None or getattr(self.app, '_is_generating_export_metadata', False):
+            return None
+        # Values before the operation must be the real text, not lazy-load placeholders
+        self.app.project_io.ensure_text_loaded(columns, indices=indices)
+        df = self.app.main_df
+        # Text columns the operation doesn't touch may still hold placeholders; leave them out
+        skip_columns = set() if columns is None else set(LARGE_TEXT_COLUMNS).difference(columns)
+        positions = None
+        if indices is not None:
+            positions = sorted({df.index.get_loc(index) for index in indices if index in df.index})
+        # Copies of the columns' object arrays share the cell values, so this costs a pointer per cell
+        self._open = {
+            "label": label,
+            "index": df.index.copy(),
+            "indices": indices,
+            "positions": positions,
+            "skip_columns": skip_columns,
+            "baseline": {column: (df[column].to_numpy(dtype=object, copy=True) if positions is None
+                                  else df[column].to_numpy(dtype=object)[positions].copy())
+                         for column in df.columns if column not in skip_columns},
+        }
+        return self._open
+
+    def end(self, token):
+        """
+        Finish recording: store a delta for every cell that changed (on the
+        pages given to begin(), if any).
+
+        Returns:
+            int: ID of the recorded operation, or None if nothing changed.
+        """
+        if token is None or token is not self._open:
+            return None
+        self._open = None
+        df = self.app.main_df
+        if not df.index.equals(token["index"]):
+            self.app.error_logging(f"Pages were added or removed during '{token['label']}'; its changes were not recorded", level="WARNING")
+            return None
+
+        changes = []
+        pages = set()
+        positions = token["positions"]
+        for column in df.columns:
+            if column in token["skip_columns"]:
+                continue
+            before = token["baseline"].get(column)
+            after = df[column].to_numpy(dtype=object)
+            for baseline_position, position in enumerate(range(len(after)) if positions is None else positions):
+                new = after[position]
+                # Columns created by the operation were empty before it
+                old = before[baseline_position] if before is not None else ""
+                if _same_value(old, new):
+                    continue
+                index = df.index[position]
+                if isinstance(old, str) and isinstance(new, str):
+                    changes.append([int(index), column, "d", text_delta(old, new), _value_hash(new)])
+                else:
+                    changes.append([int(index), column, "v", old, _value_hash(new)])
+                pages.add(int(index))
+        if not changes:
+            return None
+
+        operation = {
+            "id": self._next_id,
+            "label": token["label"],
+            "time": time.time(),
+            "kind": "cells",
+            "changes": zlib.compress(json.dumps(changes, ensure_ascii=False, default=_json_default).encode("utf-8")),
+            "cell_count": len(changes),
+            "page_count": len(pages),
+        }
+        self._next_id += 1
+        self._add(operation)
+        self.app.error_logging(f"History: recorded #{operation['id']} {operation['label']} "
+                               f"({len(changes)} cells on {len(pages)} pages, {len(operation['changes'])} bytes)", level="INFO")
+        return operation["id"]
+
+    def checkpoint(self, label):
+        """
+        Record an operation that rebuilds main_df (pages added, removed or
+        merged) by writing the frame before it to a compressed snapshot file.
+        Call it right before main_df is replaced.
+
+        Returns:
+            int: ID of the recorded operation, or None if the snapshot failed.
+        """
+        if getattr(self.app, '_is_generating_export_metadata', False):
+            return None
+        operation_id = self._next_id
+        snapshot_path = os.path.join(self._history_directory(), f"operation_{operation_id}.pbs")
+        try:
+            self.app.project_io.ensure_text_loaded()
+            write_snapshot(self.app.main_df, snapshot_path)
+        except Exception as e:
+            self.app.error_logging(f"History: could not snapshot the project before '{label}': {e}", level="ERROR")
+            return None
+        self._next_id += 1
+        self._add({
+            "id": operation_id,
+            "label": label,
+            "time": time.time(),
+            "kind": "checkpoint",
+            "snapshot_path": snapshot_path,
+            "cell_count": 0,
+            "page_count": len(self.app.main_df),
+        })
+        self.app.error_logging(f"History: recorded #{operation_id} {label} (snapshot of {len(self.app.main_df)} pages)", level="INFO")
+        return operation_id
+
+    # Reverting
+
+    def _find(self, operation_id):
+        return next((operation for operation in self.operations if operation["id"] == operation_id), None)
+
+    def _revert_cells(self, operation):
+        """
+        Put back the values an operation replaced, on cells that still hold what
+        it left there.
+
+        Returns:
+            tuple: (cells reverted, cells skipped because they changed since)
+        """
+        df = self.app.main_df
+        reverted, conflicts = 0, 0
+        for index, column, kind, payload, new_hash in json.loads(zlib.decompress(operation["changes"]).decode("utf-8")):
+            if column not in df.columns or index not in df.index:
+                conflicts += 1
+                continue
+            current = df.at[index, column]
+            if _value_hash(current) != new_hash:
+                conflicts += 1
+                continue
+            set_cell(df, index, column, apply_text_delta(current, payload) if kind == "d" else payload)
+            self.app.autosave.mark_dirty(index, column)
+            reverted += 1
+        return reverted, conflicts
+
+    def revert_operation(self, operation_id):
+        """Revert one recorded in-place operation. The revert is itself recorded, so it can be reverted too."""
+        operation = self._find(operation_id)
+        if operation is None or operation["kind"] != "cells":
+            return None
+        self.app.data_operations.update_df()
+        token = self.begin(f"Revert #{operation_id} {operation['label']}")
+        try:
+            reverted, conflicts = self._revert_cells(operation)
+        finally:
+            self.end(token)
+        self._refresh()
+        return reverted, conflicts
+
+    def revert_to_before(self, operation_id):
+        """
+        Revert the project to its state before an operation, undoing it and every
+        later operation, newest first. Undone operations leave the history.
+        """
+        if self._find(operation_id) is None:
+            return None
+        self.app.data_operations.update_df()
+        undone = [operation for operation in self.operations if operation["id"] >= operation_id]
+        reverted, conflicts = 0, 0
+        structure_restored = False
+        for operation in reversed(undone):
+            if operation["kind"] == "checkpoint":
+                self.app.main_df = read_snapshot(operation["snapshot_path"])
+                structure_restored = True
+            else:
+                cells_reverted, cells_skipped = self._revert_cells(operation)
+                reverted += cells_reverted
+                conflicts += cells_skipped
+        for operation in undone:
+            self._discard(operation)
+        self.operations = [operation for operation in self.operations if operation["id"] < operation_id]
+        if structure_restored:
+            self.app.autosave.mark_structure_changed()
+        self._refresh()
+        return reverted, conflicts
+
+    def _refresh(self):
+        if self.app.page_counter >= len(self.app.main_df):
+            self.app.page_counter = max(0, len(self.app.main_df) - 1)
+        self.app.refresh_display()
+        self.app.counter_update()
+
+    # Window
+
+    def show_history_window(self):
+        """List recorded operations and offer to revert them."""
+        window = tk.Toplevel(self.app)
+        window.title("Version History")
+        window.geometry("560x420")
+
+        explanation = tk.Label(window,
+                               text="Operations that changed page text or rebuilt the page list. Reverting one operation restores "
+                                    "the cells it changed that were not edited since; reverting the project to before an "
+                                    "operation also undoes everything after it.",
+                               wraplength=520, justify=tk.LEFT)
+        explanation.pack(anchor="w", padx=10, pady=10)
+
+        tree_frame = tk.Frame(window)
+        tree_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        columns = ("ID", "Time", "Operation", "Pages")
+        tree = ttk.Treeview(tree_frame, columns=columns, show="headings", selectmode="browse")
+        for column, width in [("ID", 50), ("Time", 80), ("Operation", 300), ("Pages", 70)]:
+            tree.heading(column, text=column)
+            tree.column(column, width=width)
+        tree.pack(fill="both", expand=True, side="left")
+        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
+        scrollbar.pack(side="right", fill="y")
+        tree.config(yscrollcommand=scrollbar.set)
+
+        def populate():
+            tree.delete(*tree.get_children())
+            for operation in reversed(self.operations):
+                pages = "rebuilt" if operation["kind"] == "checkpoint" else operation["page_count"]
+                tree.insert("", "end", iid=str(operation["id"]),
+                            values=(operation["id"], time.strftime("%H:%M:%S", time.localtime(operation["time"])),
+                                    operation["label"], pages))
+
+        def selected_id():
+            selection = tree.selection()
+            return int(selection[0]) if selection else None
+
+        def revert_selected():
+            operation_id = selected_id()
+            operation = self._find(operation_id) if operation_id is not None else None
+            if operation is None:
+                return
+            if operation["kind"] == "checkpoint":
+                messagebox.showinfo("Version History", "This operation rebuilt the page list. Use 'Revert Project To Before' to undo it.")
+                return
+            reverted, conflicts = self.revert_operation(operation_id)
+            message = f"Reverted {reverted} cell(s)."
+            if conflicts:
+                message += f" {conflicts} cell(s) were changed since and were left as they are."
+            messagebox.showinfo("Version History", message)
+            populate()
+
+        def revert_project():
+            operation_id = selected_id()
+            if operation_id is None:
+                return
+            later = sum(1 for operation in self.operations if operation["id"] >= operation_id)
+            if not messagebox.askyesno("Revert Project",
+                                       f"Revert the project to its state before operation #{operation_id}? "
+                                       f"This undoes {later} operation(s)."):
+                return
+            try:
+                reverted, conflicts = self.revert_to_before(operation_id)
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to revert the project: {e}")
+                self.app.error_logging(f"Failed to revert project to before operation #{operation_id}: {e}")
+                return
+            if conflicts:
+                messagebox.showinfo("Version History", f"{conflicts} cell(s) were edited outside recorded operations and were left as they are.")
+            populate()
+
+        populate()
+        button_frame = tk.Frame(window)
+        button_frame.pack(pady=(0, 10))
+        tk.Button(button_frame, text="Revert This Operation", command=revert_selected).pack(side="left", padx=5)
+        tk.Button(button_frame, text="Revert Project To Before", command=revert_project).pack(side="left", padx=5)
+        tk.Button(button_frame, text="Close", command=window.destroy).pack(side="left", padx=5)